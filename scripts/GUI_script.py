@@ -6,21 +6,42 @@ Updated GUI for single firmware flash (combined stack + app)
 Features:
 - Browse and select your single flash Python script
 - Execute with one click
+- Gang flashing: one slot per XDS110 probe, several at once
 - Real-time output display
-- Progress tracking
+- Progress tracking: per-slot progress bar and time remaining from past phase timings
+- Dashboard tab: units/hour, first-pass yield and probe utilization over the last
+  5 minutes, hour and shift; probes with a cycle time above the median are highlighted
 """
 BG_COLOR = "#2c3e50"
 FG_COLOR = "#ecf0f1"
 BTN_COLOR = "#e74c3c"
 BTN_HOVER = "#c0392b"
+NUM_SLOTS = 4
+OUTPUT_TICK_MS = 50
+LOG_VIEW_LINES = 2000
+HISTORY_PAGE_LINES = 500
+HISTORY_MAX_LINES = 10000
+DASHBOARD_TICK_MS = 1000
+SLOW_PROBE_COLOR = "#f8d7da"
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import subprocess
 import threading
 import os
 import sys
+import time
 from datetime import datetime
 
+from flash_core import (FlashStation, describe_result, ACTIVE_STATES, GOOD_STATES, SLOT_IDLE,
+                        SLOT_RUNNING, SLOT_PASSED, SLOT_FAILED, SLOT_STOPPED, SLOT_SKIPPED)
+from phase_metrics import DEFAULT_METRICS_PORT, MetricsServer
+from output_pipeline import OutputPipeline
+from line_stats import SHIFT, WINDOWS, LineStats
+from log_store import LogStore
+from flash_recipe import package_error
+from package_index import DEFAULT_LIBRARY_ROOT, PackageIndex, describe
+from probe_inventory import ProbeInventory
+
 
 class CC2650SingleFlashGUI:
     """GUI for CC2650 single firmware flash"""
@@ -33,11 +54,43 @@ class CC2650SingleFlashGUI:
         
         # Application state
         self.flash_folder = None
-        self.execution_thread = None
-        self.process = None
+        self.scheduler = None
+        self.slots = {}
+        self.station = FlashStation()
+        self.metrics_server = None
+        self.output_pipeline = OutputPipeline()
+        self.output_store = LogStore(f"output_{os.getpid()}", max_lines=LOG_VIEW_LINES)
+        self.log_store = LogStore(f"activity_{os.getpid()}", max_lines=LOG_VIEW_LINES)
+        self.history_loaded = {}
+        self.slot_progress = {}
+        self.line_stats = LineStats()
+        self.dashboard_rows = {}
+        self.probe_inventory = None
+        self.package_index = PackageIndex(DEFAULT_LIBRARY_ROOT)
         
         # Create GUI
         self.create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(OUTPUT_TICK_MS, self.drain_output)
+        self.root.after(DASHBOARD_TICK_MS, self.tick_dashboard)
+        
+        # Serve per-phase timings for the line's monitoring
+        try:
+            self.metrics_server = MetricsServer(self.station.metrics, DEFAULT_METRICS_PORT)
+            self.log_message(f"Phase metrics at http://127.0.0.1:{self.metrics_server.port}/metrics")
+        except OSError as e:
+            self.log_message(f"Metrics endpoint unavailable: {str(e)}")
+        
+        # Phase timeouts start from the runs this station has already logged
+        try:
+            runs = self.station.learn_timeouts()
+            self.log_message(f"Phase timeouts learned from {runs} earlier run(s)")
+        except Exception as e:
+            self.log_message(f"Flash history unavailable: {str(e)}")
+        
+        # Keep the connected probe list current without blocking the UI; the first
+        # scan (wmic on Windows) runs in the background too
+        threading.Thread(target=self.start_inventory, daemon=True).start()
         
         # Try to auto-detect flash folder
         self.auto_detect_flash_folder()
@@ -78,8 +131,8 @@ class CC2650SingleFlashGUI:
         folder_entry = ttk.Entry(folder_frame, textvariable=self.folder_var, width=70)
         folder_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(0, 10))
         
-        ttk.Button(folder_frame, text="Browse Folder", 
-                  command=self.browse_flash_folder,bg=BTN_COLOR, fg=FG_COLOR,font=('Arial', 10, 'bold'),  # Fixed: missing closing quote and added comma
+        tk.Button(folder_frame, text="Browse Folder", 
+                  command=self.browse_flash_folder,bg=BTN_COLOR, fg=FG_COLOR,font=('Arial', 10, 'bold'),  # tk.Button: ttk buttons reject colour options
           relief='raised', bd=2,
           activebackground=BTN_HOVER,
           activeforeground=FG_COLOR).grid(row=0, column=2)
@@ -89,6 +142,28 @@ class CC2650SingleFlashGUI:
         folder_info_label = ttk.Label(folder_frame, textvariable=self.folder_info_var)
         folder_info_label.grid(row=1, column=0, columnspan=3, pady=(10, 0))
         
+        ttk.Label(folder_frame, text="Lot:", style="Heading.TLabel").grid(row=2, column=0, sticky=tk.W, padx=(0, 5), pady=(10, 0))
+        self.lot_var = tk.StringVar()
+        ttk.Entry(folder_frame, textvariable=self.lot_var, width=20).grid(row=2, column=1, sticky=tk.W, pady=(10, 0))
+        
+        # Package library: pick an indexed package by product and version
+        ttk.Label(folder_frame, text="Product:", style="Heading.TLabel").grid(row=3, column=0, sticky=tk.W, padx=(0, 5), pady=(10, 0))
+        library_row = ttk.Frame(folder_frame)
+        library_row.grid(row=3, column=1, sticky=tk.W, pady=(10, 0))
+        self.product_var = tk.StringVar()
+        self.product_combo = ttk.Combobox(library_row, textvariable=self.product_var,
+                                          state="readonly", width=24)
+        self.product_combo.grid(row=0, column=0, padx=(0, 10))
+        self.product_combo.bind("<<ComboboxSelected>>", self.on_product_selected)
+        ttk.Label(library_row, text="Version:").grid(row=0, column=1, padx=(0, 5))
+        self.version_var = tk.StringVar()
+        self.version_combo = ttk.Combobox(library_row, textvariable=self.version_var,
+                                          state="readonly", width=12)
+        self.version_combo.grid(row=0, column=2)
+        self.version_combo.bind("<<ComboboxSelected>>", self.on_version_selected)
+        ttk.Button(folder_frame, text="Library Root",
+                   command=self.browse_library_root).grid(row=3, column=2, pady=(10, 0))
+        
         # Quick Actions Frame
         actions_frame = ttk.LabelFrame(main_frame, text="Quick Actions", padding="10")
         actions_frame.grid(row=3, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -113,21 +188,75 @@ class CC2650SingleFlashGUI:
         button_frame = ttk.Frame(control_frame)
         button_frame.grid(row=0, column=0, sticky=tk.W)
         
-        self.flash_button = ttk.Button(button_frame, text="Flash Firmware", 
+        self.flash_button = ttk.Button(button_frame, text="Flash All Slots", 
                                      command=self.start_flash, state="disabled")
         self.flash_button.grid(row=0, column=0, padx=(0, 10))
         
-        self.stop_button = ttk.Button(button_frame, text="Stop Flash", 
+        self.stop_button = ttk.Button(button_frame, text="Stop All", 
                                     command=self.stop_flash, state="disabled")
         self.stop_button.grid(row=0, column=1, padx=(0, 10))
         
         ttk.Button(button_frame, text="Refresh", 
                   command=self.refresh_info).grid(row=0, column=2, padx=(0, 10))
         
+        ttk.Label(button_frame, text="Parallel:").grid(row=0, column=3, padx=(10, 5))
+        self.parallel_var = tk.IntVar(value=NUM_SLOTS)
+        ttk.Spinbox(button_frame, from_=1, to=NUM_SLOTS, width=4,
+                    textvariable=self.parallel_var).grid(row=0, column=4)
+        
+        self.skip_identical_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(button_frame, text="Skip if identical",
+                        variable=self.skip_identical_var).grid(row=0, column=5, padx=(10, 0))
+        
+        self.incremental_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(button_frame, text="Changed sectors only",
+                        variable=self.incremental_var).grid(row=0, column=6, padx=(10, 0))
+        
+        self.verify_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(button_frame, text="Readback verify",
+                        variable=self.verify_var).grid(row=0, column=7, padx=(10, 0))
+        
+        self.session_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(button_frame, text="Warm sessions",
+                        variable=self.session_var).grid(row=0, column=8, padx=(10, 0))
+        
+        # Slot grid: one row per probe
+        slots_frame = ttk.Frame(control_frame)
+        slots_frame.grid(row=1, column=0, sticky=tk.W, pady=(10, 0))
+        
+        for column, heading in enumerate(["Slot", "Probe Serial", "Status", "", "", "Progress", "ETA"]):
+            ttk.Label(slots_frame, text=heading, style="Heading.TLabel").grid(
+                row=0, column=column, sticky=tk.W, padx=(0, 10))
+        
+        for slot in range(1, NUM_SLOTS + 1):
+            serial_var = tk.StringVar()
+            status_var = tk.StringVar(value=SLOT_IDLE.upper())
+            
+            ttk.Label(slots_frame, text=f"Slot {slot}").grid(row=slot, column=0, sticky=tk.W, padx=(0, 10))
+            ttk.Entry(slots_frame, textvariable=serial_var, width=16).grid(row=slot, column=1, padx=(0, 10))
+            ttk.Label(slots_frame, textvariable=status_var, width=10).grid(row=slot, column=2, sticky=tk.W, padx=(0, 10))
+            
+            flash_btn = ttk.Button(slots_frame, text="Flash", state="disabled",
+                                   command=lambda s=slot: self.start_slot(s))
+            flash_btn.grid(row=slot, column=3, padx=(0, 5))
+            stop_btn = ttk.Button(slots_frame, text="Stop", state="disabled",
+                                  command=lambda s=slot: self.stop_slot(s))
+            stop_btn.grid(row=slot, column=4, padx=(0, 10))
+            
+            progress_var = tk.DoubleVar(value=0)
+            eta_var = tk.StringVar()
+            ttk.Progressbar(slots_frame, variable=progress_var, maximum=100, length=160).grid(
+                row=slot, column=5, padx=(0, 10))
+            ttk.Label(slots_frame, textvariable=eta_var, width=16).grid(row=slot, column=6, sticky=tk.W)
+            
+            self.slots[slot] = {"serial": serial_var, "status": status_var,
+                                "flash": flash_btn, "stop": stop_btn,
+                                "progress": progress_var, "eta": eta_var, "event": None}
+        
         # Status
         self.status_var = tk.StringVar(value="Ready - Select UniFlash project folder")
         status_label = ttk.Label(control_frame, textvariable=self.status_var)
-        status_label.grid(row=1, column=0, pady=(10, 0), sticky=tk.W)
+        status_label.grid(row=2, column=0, pady=(10, 0), sticky=tk.W)
         
         # Output Frame with tabs
         output_frame = ttk.LabelFrame(main_frame, text="Flash Output", padding="10")
@@ -161,6 +290,40 @@ class CC2650SingleFlashGUI:
                                                 wrap=tk.WORD, font=('Consolas', 9))
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        # Dashboard tab
+        dashboard_tab = ttk.Frame(self.notebook, padding="5")
+        self.notebook.add(dashboard_tab, text="Dashboard")
+        
+        dashboard_tab.columnconfigure(0, weight=1)
+        dashboard_tab.rowconfigure(1, weight=1)
+        
+        self.window_table = ttk.Treeview(dashboard_tab, height=len(WINDOWS) + 1,
+                                         columns=("rate", "fpy", "units", "passed", "failed"))
+        self.window_table.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        for column, heading in (("#0", "Window"), ("rate", "Units/h"), ("fpy", "First-pass yield"),
+                                ("units", "Units"), ("passed", "Passed"), ("failed", "Failed")):
+            self.window_table.heading(column, text=heading)
+            self.window_table.column(column, width=110, anchor=tk.W if column == "#0" else tk.E)
+        
+        probe_columns = ["jobs", "cycle"] + [f"util {name}" for name in self.window_names()]
+        self.probe_table = ttk.Treeview(dashboard_tab, columns=probe_columns)
+        self.probe_table.grid(row=1, column=0, pady=(10, 0), sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.probe_table.heading("#0", text="Probe")
+        self.probe_table.heading("jobs", text="Jobs (1 hour)")
+        self.probe_table.heading("cycle", text="Cycle (1 hour)")
+        for name in self.window_names():
+            self.probe_table.heading(f"util {name}", text=f"Utilization ({name})")
+        for column in ["#0"] + probe_columns:
+            self.probe_table.column(column, width=110, anchor=tk.W if column == "#0" else tk.E)
+        self.probe_table.tag_configure("slow", background=SLOW_PROBE_COLOR)
+        
+        dashboard_controls = ttk.Frame(dashboard_tab)
+        dashboard_controls.grid(row=2, column=0, pady=(10, 0), sticky=tk.W)
+        self.median_var = tk.StringVar(value="Median cycle time: -")
+        ttk.Label(dashboard_controls, textvariable=self.median_var).grid(row=0, column=0, padx=(0, 20))
+        ttk.Button(dashboard_controls, text="New Shift",
+                  command=self.new_shift).grid(row=0, column=1)
+        
         # Output controls
         output_controls = ttk.Frame(output_frame)
         output_controls.grid(row=1, column=0, pady=(10, 0))
@@ -170,7 +333,9 @@ class CC2650SingleFlashGUI:
         ttk.Button(output_controls, text="Save Output", 
                   command=self.save_output).grid(row=0, column=1, padx=(0, 10))
         ttk.Button(output_controls, text="Copy Output", 
-                  command=self.copy_output).grid(row=0, column=2)
+                  command=self.copy_output).grid(row=0, column=2, padx=(0, 10))
+        ttk.Button(output_controls, text="Load Older", 
+                  command=self.load_older).grid(row=0, column=3)
         
         # Initial messages
         self.log_message("CC2650 Single Flash GUI initialized")
@@ -179,7 +344,8 @@ class CC2650SingleFlashGUI:
         # Add info about expected structure
         self.output_message("Expected folder structure:")
         self.output_message("your_uniflash_project/")
-        self.output_message("├── dslite.bat                    ← Main flash script")
+        self.output_message("├── dslite.bat / dslite.sh        ← Launcher (Windows / Linux, macOS)")
+        self.output_message("├── flash_recipe.json             ← Optional: DSLite tool, ccxml, image, settings, options")
         self.output_message("├── user_files/")
         self.output_message("│   ├── configs/")
         self.output_message("│   │   └── cc2650f128.ccxml      ← Device config")
@@ -198,25 +364,80 @@ class CC2650SingleFlashGUI:
         self.output_message("\n" + "="*60 + "\n")
     
     def auto_detect_flash_folder(self):
-        possible_folders = [
-            "single_flash",          # Your current folder
-            ".",                     # Current directory if files are here
-            "cc2650_project",
-            "uniflash_export"
-        ]
-        
-        for folder_name in possible_folders:
-            if os.path.exists(folder_name):
-                dslite_path = os.path.join(folder_name, "dslite.bat")
-                if os.path.exists(dslite_path):
-                    self.flash_folder = os.path.abspath(folder_name)
-                    self.folder_var.set(self.flash_folder)
-                    self.folder_info_var.set(f"[OK] Auto-detected: {folder_name}")
-                    self.flash_button.config(state="normal")
-                    self.log_message(f"Auto-detected UniFlash project: {folder_name}")
-                    return
+        """Refresh the package library in the background and offer its packages"""
+        index = self.package_index
+        
+        def refresh_thread():
+            try:
+                stats = index.refresh()
+            except Exception as e:
+                self.root.after(0, lambda msg=str(e): self.log_message(f"Package library error: {msg}"))
+                return
+            self.root.after(0, lambda: self.show_library(index, stats))
         
-        self.log_message("No UniFlash project folder auto-detected")
+        threading.Thread(target=refresh_thread, daemon=True).start()
+    
+    def show_library(self, index, stats):
+        """Fill the product list once a library refresh finishes"""
+        if index is not self.package_index:
+            return
+        products = index.products()
+        self.product_combo.config(values=products)
+        self.log_message(f"Package library {index.root}: {len(index.packages())} package(s), "
+                         f"{stats['read']} re-read")
+        if not products:
+            self.log_message("No UniFlash project folder auto-detected")
+            return
+        if not self.flash_folder:
+            self.product_var.set(products[0])
+            self.on_product_selected()
+    
+    def on_product_selected(self, event=None):
+        """List the versions of the chosen product and select the newest"""
+        versions = self.package_index.versions(self.product_var.get())
+        self.version_combo.config(values=versions)
+        if versions:
+            self.version_var.set(versions[0])
+            self.on_version_selected()
+    
+    def on_version_selected(self, event=None):
+        """Use the package for the chosen product and version"""
+        package = self.package_index.find(self.product_var.get(), self.version_var.get())
+        if package:
+            self.select_flash_folder(package["path"], package)
+    
+    def browse_library_root(self):
+        """Choose the folder that holds the exported packages"""
+        folder_path = filedialog.askdirectory(title="Select Package Library Folder",
+                                              initialdir=self.package_index.root)
+        if folder_path:
+            self.package_index = PackageIndex(folder_path)
+            self.product_var.set("")
+            self.version_var.set("")
+            self.version_combo.config(values=[])
+            self.auto_detect_flash_folder()
+    
+    def select_flash_folder(self, folder_path, package):
+        """Make a parsed package the flash target"""
+        self.flash_folder = os.path.abspath(folder_path)
+        self.folder_var.set(self.flash_folder)
+        
+        info_text = f"[OK] {describe(package)}\n"
+        info_text += f"Path: {self.flash_folder}"
+        for image in package["images"]:
+            info_text += f"\nImage: {image['name']} ({image['size']} bytes, SHA-256 {image['sha256'][:12]})"
+        for error in package["errors"]:
+            info_text += f"\nWarning: {error}"
+        try:
+            recipe = self.station.recipes.get(self.flash_folder)
+            source = os.path.basename(recipe.source) if recipe.source else "package defaults"
+            info_text += f"\nRecipe: {source}, DSLite: {os.path.basename(recipe.tool[-1])}"
+        except (OSError, ValueError) as e:
+            info_text += f"\nWarning: flash recipe: {e}"
+        
+        self.folder_info_var.set(info_text)
+        self.enable_flash_controls()
+        self.log_message(f"Selected UniFlash project: {describe(package)}")
     
     def browse_flash_folder(self):
         """Browse for UniFlash project folder"""
@@ -226,25 +447,14 @@ class CC2650SingleFlashGUI:
         )
         
         if folder_path:
-            # Check if it contains dslite.bat
-            dslite_path = os.path.join(folder_path, "dslite.bat")
+            # A package is a folder whose flash recipe resolves on this station
+            error = package_error(folder_path, self.station.recipes)
             
-            if os.path.exists(dslite_path):
-                self.flash_folder = folder_path
-                self.folder_var.set(folder_path)
-                
-                # Get folder info
-                folder_name = os.path.basename(folder_path)
-                info_text = f"[OK] Selected: {folder_name}\n"
-                info_text += f"Path: {folder_path}\n"
-                info_text += f"Contains: dslite.bat"
-                
-                self.folder_info_var.set(info_text)
-                self.flash_button.config(state="normal")
-                self.log_message(f"Selected UniFlash project: {folder_name}")
+            if error is None:
+                self.select_flash_folder(folder_path, self.package_index.read_package(folder_path))
             else:
                 messagebox.showerror("Invalid Folder", 
-                    f"Selected folder does not contain dslite.bat\n\n"
+                    f"Selected folder cannot be flashed from this station:\n{error}\n\n"
                     f"Please select a UniFlash standalone project folder.")
                 self.folder_info_var.set("ERROR: Not a valid UniFlash project folder")
     
@@ -274,38 +484,71 @@ class CC2650SingleFlashGUI:
             self.log_message(f"Error opening UniFlash: {str(e)}")
     
     def detect_device(self):
-        """Detect connected CC2650 device"""
-        self.log_message("Checking for connected CC2650 device...")
+        """Report connected XDS110 probes from the probe inventory"""
+        if not self.probe_inventory:
+            messagebox.showwarning("No Device", "Probe inventory is not available on this station.")
+            return
         
-        def detect_thread():
-            try:
-                # Try to run a simple detection command
-                result = subprocess.run(
-                    ["wmic", "path", "Win32_PnPEntity", "where", 
-                     'Name like "%XDS110%" or Name like "%LaunchPad%"', 
-                     "get", "Name"],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                
-                if "XDS110" in result.stdout or "LaunchPad" in result.stdout:
-                    self.root.after(0, lambda: self.log_message("Device detected: CC2650 LaunchPad found"))
-                    self.root.after(0, lambda: messagebox.showinfo("Device Found", 
-                        "CC2650 LaunchPad detected!\nReady for programming."))
-                else:
-                    self.root.after(0, lambda: self.log_message("No CC2650 device detected"))
-                    self.root.after(0, lambda: messagebox.showwarning("No Device", 
-                        "No CC2650 LaunchPad detected.\n\n"
-                        "Please check:\n"
-                        "• USB connection\n"
-                        "• Device drivers\n"
-                        "• Power LED on LaunchPad"))
-                        
-            except Exception as e:
-                self.root.after(0, lambda: self.log_message(f"Device detection error: {str(e)}"))
+        probes = self.probe_inventory.probes()
+        if not probes:
+            self.log_message("No XDS110 probe detected")
+            messagebox.showwarning("No Device", 
+                "No CC2650 LaunchPad detected.\n\n"
+                "Please check:\n"
+                "• USB connection\n"
+                "• Device drivers\n"
+                "• Power LED on LaunchPad")
+            return
         
-        threading.Thread(target=detect_thread, daemon=True).start()
+        for probe in probes:
+            self.log_message(f"Probe detected: {probe.describe()}")
+        self.assign_probes()
+        messagebox.showinfo("Device Found", 
+            f"{len(probes)} XDS110 probe(s) detected:\n\n"
+            + "\n".join(probe.serial for probe in probes))
+    
+    def start_inventory(self):
+        """Build the probe inventory off the UI thread and hand it over"""
+        try:
+            inventory = ProbeInventory(on_change=self.on_probes_changed, scan=False)
+            inventory.refresh()
+            inventory.start()
+        except Exception as e:
+            self.root.after(0, lambda msg=str(e): self.log_message(f"Probe inventory unavailable: {msg}"))
+            return
+        self.root.after(0, lambda: self.inventory_ready(inventory))
+    
+    def inventory_ready(self, inventory):
+        """Start using the probe inventory once its first scan is done"""
+        self.probe_inventory = inventory
+        self.station.inventory = inventory
+        if self.scheduler:
+            self.scheduler.inventory = inventory
+        self.log_message(f"{len(inventory.serials())} XDS110 probe(s) connected")
+        self.assign_probes()
+    
+    def on_probes_changed(self, added, removed):
+        """Hotplug callback from the inventory thread"""
+        self.root.after(0, lambda: self.update_probes(added, removed))
+    
+    def update_probes(self, added, removed):
+        """Log hotplug changes and fill empty slots with new probes"""
+        for probe in added:
+            self.log_message(f"Probe connected: {probe.describe()}")
+        for probe in removed:
+            self.log_message(f"Probe disconnected: {probe.describe()}")
+        if self.probe_inventory:
+            self.assign_probes()
+    
+    def assign_probes(self):
+        """Put connected probes into slots that have no serial yet"""
+        current = {slot: widgets["serial"].get().strip() or None
+                   for slot, widgets in self.slots.items()}
+        assignment = self.probe_inventory.assign_slots(sorted(self.slots), current)
+        for slot, serial in assignment.items():
+            if serial and not current[slot]:
+                self.slots[slot]["serial"].set(serial)
+                self.log_message(f"Slot {slot}: probe {serial}")
     
     def test_connection(self):
         """Test connection to CC2650"""
@@ -318,113 +561,183 @@ class CC2650SingleFlashGUI:
             "Connection test will be implemented.\n\n"
             "For now, use 'Detect Device' to check if LaunchPad is connected.")
     
+    def enable_flash_controls(self):
+        """Enable Flash buttons once a valid project folder is selected"""
+        self.flash_button.config(state="normal")
+        for widgets in self.slots.values():
+            if widgets["status"].get().lower() not in ACTIVE_STATES:
+                widgets["flash"].config(state="normal")
+    
+    def get_scheduler(self):
+        """Return the gang scheduler, rebuilding it if the parallel limit or session mode changed"""
+        try:
+            parallel = int(self.parallel_var.get())
+        except (tk.TclError, ValueError):
+            parallel = NUM_SLOTS
+        
+        sessions = self.session_var.get()
+        if (self.scheduler and not self.scheduler.busy()
+                and (self.scheduler.max_parallel != parallel
+                     or (self.scheduler.sessions is not None) != sessions)):
+            self.scheduler.shutdown()
+            self.scheduler = None
+        
+        if self.scheduler is None:
+            self.scheduler = self.station.scheduler(parallel, sessions,
+                                                    on_output=self.on_slot_output,
+                                                    on_status=self.on_slot_status,
+                                                    on_progress=self.on_slot_progress)
+        return self.scheduler
+    
     def start_flash(self):
-        """Start firmware flashing"""
+        """Start firmware flashing on every slot with a probe serial"""
         if not self.flash_folder or not os.path.exists(self.flash_folder):
             messagebox.showerror("Error", "Please select a valid UniFlash project folder first")
             return
         
-        if self.execution_thread and self.execution_thread.is_alive():
+        if self.scheduler and self.scheduler.busy():
             messagebox.showwarning("Warning", "Flash operation is already running")
             return
         
+        slots = [slot for slot, widgets in self.slots.items() if widgets["serial"].get().strip()]
+        if not slots:
+            # Single probe without a serial: DSLite uses the first probe it finds
+            slots = [1]
+        
         # Clear output
         self.clear_output()
         
-        # Start flashing in thread
-        self.execution_thread = threading.Thread(target=self.flash_thread)
-        self.execution_thread.daemon = True
-        self.execution_thread.start()
+        for slot in slots:
+            self.start_slot(slot)
     
-    def flash_thread(self):
-        """Flash firmware in separate thread"""
+    def start_slot(self, slot):
+        """Queue a flash job for one slot"""
+        if not self.flash_folder or not os.path.exists(self.flash_folder):
+            messagebox.showerror("Error", "Please select a valid UniFlash project folder first")
+            return
+        
+        serial = self.slots[slot]["serial"].get().strip() or None
         try:
-            # Update UI
-            self.root.after(0, lambda: self.flash_button.config(state="disabled"))
-            self.root.after(0, lambda: self.stop_button.config(state="normal"))
-            self.root.after(0, lambda: self.status_var.set("Flashing CC2650 firmware..."))
-            
-            folder_name = os.path.basename(self.flash_folder)
-            
-            self.root.after(0, lambda: self.log_message(f"Starting flash: {folder_name}"))
-            self.root.after(0, lambda: self.output_message(f"Flashing CC2650 from: {folder_name}"))
-            self.root.after(0, lambda: self.output_message("=" * 60))
-            
-            # Change to flash folder and execute dslite.bat
-            original_dir = os.getcwd()
-            os.chdir(self.flash_folder)
-            
-            self.process = subprocess.Popen(
-                ["dslite.bat"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                universal_newlines=True,
-                bufsize=1,
-                shell=True
-            )
-            
-            # Read output line by line
-            for line in iter(self.process.stdout.readline, ''):
-                if line:
-                    clean_line = line.rstrip('\r\n')
-                    if clean_line:
-                        self.root.after(0, lambda msg=clean_line: self.output_message(msg))
-                
-                if self.process.poll() is not None:
-                    break
-            
-            # Change back to original directory
-            os.chdir(original_dir)
-            
-            # Wait for process to complete
-            self.process.wait()
-            return_code = self.process.returncode
-            
-            # Update UI with results
-            if return_code == 0:
-                self.root.after(0, lambda: self.status_var.set("CC2650 flash completed successfully"))
-                self.root.after(0, lambda: self.log_message("CC2650 flash completed successfully"))
-                self.root.after(0, lambda: self.output_message("\n" + "=" * 60))
-                self.root.after(0, lambda: self.output_message("SUCCESS: CC2650 FIRMWARE FLASHED"))
-                self.root.after(0, lambda: messagebox.showinfo("Success", 
-                    "CC2650 firmware flashed successfully!\n\n"
-                    "Your device is ready to use."))
-            else:
-                self.root.after(0, lambda: self.status_var.set(f"CC2650 flash failed (exit code: {return_code})"))
-                self.root.after(0, lambda: self.log_message(f"CC2650 flash failed with exit code: {return_code}"))
-                self.root.after(0, lambda: self.output_message("\n" + "=" * 60))
-                self.root.after(0, lambda: self.output_message(f"FAILED: FLASH FAILED (Exit Code: {return_code})"))
-                self.root.after(0, lambda: messagebox.showerror("Failed", 
-                    f"CC2650 flash failed with exit code: {return_code}\n\n"
-                    f"Check the output for details."))
-            
-        except Exception as e:
-            error_msg = f"Flash error: {str(e)}"
-            self.root.after(0, lambda: self.status_var.set("Flash error"))
-            self.root.after(0, lambda: self.log_message(f"ERROR: {error_msg}"))
-            self.root.after(0, lambda: self.output_message(f"\nERROR: {error_msg}"))
-            self.root.after(0, lambda: messagebox.showerror("Error", error_msg))
-        
-        finally:
-            # Reset UI
-            self.root.after(0, lambda: self.flash_button.config(state="normal"))
-            self.root.after(0, lambda: self.stop_button.config(state="disabled"))
-            self.process = None
+            self.get_scheduler().submit(slot, self.flash_folder, serial=serial,
+                                        skip_identical=self.skip_identical_var.get(),
+                                        incremental=self.incremental_var.get(),
+                                        verify=self.verify_var.get(),
+                                        lot=self.lot_var.get().strip() or None)
+        except RuntimeError as e:
+            messagebox.showwarning("Warning", str(e))
+            return
+        
+        folder_name = os.path.basename(self.flash_folder)
+        probe = f"probe {serial}" if serial else "first available probe"
+        self.log_message(f"Slot {slot}: queued flash of {folder_name} ({probe})")
+        self.flash_button.config(state="disabled")
+        self.stop_button.config(state="normal")
+    
+    def on_slot_output(self, slot, line):
+        """Output callback from scheduler worker threads"""
+        self.output_pipeline.push(f"[{slot}] {line}")
+    
+    def on_slot_progress(self, slot, event):
+        """Progress callback from scheduler worker threads; the output tick shows it"""
+        self.slot_progress[slot] = event
+    
+    def on_slot_status(self, slot, status, job):
+        """Status callback from scheduler worker threads"""
+        self.root.after(0, lambda: self.update_slot(slot, status, job))
+    
+    def update_slot(self, slot, status, job):
+        """Reflect a slot status change in the UI"""
+        widgets = self.slots[slot]
+        widgets["status"].set(status.upper())
+        active = status in ACTIVE_STATES
+        widgets["flash"].config(state="disabled" if active else "normal")
+        widgets["stop"].config(state="normal" if active else "disabled")
+        
+        widgets["event"] = None
+        widgets["eta"].set("")
+        if not active:
+            self.line_stats.record_job(job)
+        if active:
+            widgets["progress"].set(0)
+        elif status in GOOD_STATES:
+            widgets["progress"].set(100)
+        
+        if status == SLOT_RUNNING:
+            self.status_var.set("Flashing CC2650 firmware...")
+            self.output_message(f"[{slot}] Flashing CC2650 from: {os.path.basename(job.flash_folder)}")
+        elif status == SLOT_PASSED:
+            self.log_message(f"Slot {slot}: CC2650 {describe_result(job)}")
+            self.output_message(f"[{slot}] SUCCESS: CC2650 FIRMWARE FLASHED")
+        elif status == SLOT_SKIPPED:
+            self.log_message(f"Slot {slot}: {describe_result(job)}")
+            self.output_message(f"[{slot}] SKIPPED: IMAGE ALREADY ON DEVICE")
+        elif status == SLOT_FAILED:
+            if job.recovery_seconds is not None:
+                self.log_message(f"Slot {slot}: hung job killed, slot recovered "
+                                 f"{job.recovery_seconds:.1f}s after its last output")
+            self.log_message(f"Slot {slot}: CC2650 {describe_result(job)}")
+            self.output_message(f"[{slot}] FAILED: {describe_result(job)}")
+        elif status == SLOT_STOPPED:
+            self.log_message(f"Slot {slot}: flash stopped by user")
+            self.output_message(f"[{slot}] STOPPED: FLASH OPERATION STOPPED BY USER")
+        
+        if not active and not self.scheduler.busy():
+            self.finish_batch()
+    
+    def finish_batch(self):
+        """Summarize once every queued slot has finished"""
+        self.flash_button.config(state="normal")
+        self.stop_button.config(state="disabled")
+        
+        results = self.scheduler.snapshot()
+        passed = [slot for slot, status in results.items() if status in GOOD_STATES]
+        failed = [slot for slot, status in results.items() if status == SLOT_FAILED]
+        
+        self.output_message("\n" + "=" * 60)
+        stats = self.output_pipeline.stats()
+        if stats["dropped"] or stats["coalesced"]:
+            self.log_message(f"Output: {stats['dropped']} line(s) dropped, "
+                             f"{stats['coalesced']} coalesced under load")
+        if failed:
+            self.status_var.set(f"CC2650 flash failed on slot(s): {', '.join(map(str, failed))}")
+            messagebox.showerror("Failed", 
+                f"CC2650 flash failed on slot(s): {', '.join(map(str, failed))}\n\n"
+                f"Check the output for details.")
+        elif passed:
+            self.status_var.set("CC2650 flash completed successfully")
+            messagebox.showinfo("Success", 
+                f"CC2650 firmware flashed successfully on {len(passed)} slot(s)!\n\n"
+                "Your devices are ready to use.")
+        else:
+            self.status_var.set("Flash operation stopped")
+    
+    def stop_slot(self, slot):
+        """Stop the flashing process on one slot"""
+        if self.scheduler and self.scheduler.stop(slot):
+            self.log_message(f"Slot {slot}: stop requested")
     
     def stop_flash(self):
-        """Stop the flashing process"""
-        if self.process:
+        """Stop every flashing process"""
+        if self.scheduler:
             try:
-                self.process.terminate()
+                self.scheduler.stop_all()
                 self.log_message("Flash operation stopped by user")
-                self.output_message("\nSTOPPED: FLASH OPERATION STOPPED BY USER")
                 self.status_var.set("Flash operation stopped")
             except Exception as e:
                 self.log_message(f"Error stopping flash: {str(e)}")
-        
-        self.flash_button.config(state="normal")
-        self.stop_button.config(state="disabled")
+    
+    def on_close(self):
+        """Stop running jobs before closing the window"""
+        if self.scheduler:
+            self.scheduler.shutdown()
+        if self.probe_inventory:
+            self.probe_inventory.close()
+        self.station.close()
+        self.output_store.close()
+        self.log_store.close()
+        if self.metrics_server:
+            self.metrics_server.close()
+        self.root.destroy()
     
     def refresh_info(self):
         """Refresh information"""
@@ -432,20 +745,148 @@ class CC2650SingleFlashGUI:
         self.log_message("Information refreshed")
     
     def output_message(self, message):
-        """Add message to output display"""
-        self.output_text.insert(tk.END, message + "\n")
-        self.output_text.see(tk.END)
-        self.root.update_idletasks()
+        """Queue message for the output display"""
+        self.output_pipeline.push(message)
+    
+    def drain_output(self):
+        """Insert everything queued since the last tick in one batch"""
+        lines = self.output_pipeline.drain()
+        if lines:
+            self.append_view(self.output_text, self.output_store, lines)
+        self.update_progress()
+        self.root.after(OUTPUT_TICK_MS, self.drain_output)
+    
+    def window_names(self):
+        """Dashboard window names, shortest first"""
+        return [name for name, _seconds, _buckets in WINDOWS] + [SHIFT]
+    
+    def tick_dashboard(self):
+        """Refresh the dashboard once a second"""
+        self.refresh_dashboard()
+        self.root.after(DASHBOARD_TICK_MS, self.tick_dashboard)
+    
+    def refresh_dashboard(self):
+        """Redraw the dashboard from the rolling-window totals"""
+        snapshot = self.line_stats.snapshot()
+        for name in self.window_names():
+            summary = snapshot[name]
+            rate = summary["units_per_hour"]
+            fpy = summary["first_pass_yield"]
+            self.set_row(self.window_table, name, (
+                f"{rate:.0f}" if rate is not None else "-",
+                f"{100 * fpy:.1f}%" if fpy is not None else "-",
+                summary["units"], summary["passed"], summary["failed"]))
+        
+        # Cycle times and the slow flag come from the last hour
+        hour = snapshot[WINDOWS[-1][0]]
+        probes = set(snapshot[SHIFT]["probes"]) | set(hour["probes"])
+        for probe in sorted(probes):
+            recent = hour["probes"].get(probe)
+            utilization = []
+            for name in self.window_names():
+                entry = snapshot[name]["probes"].get(probe)
+                share = entry["utilization"] if entry else 0.0
+                utilization.append(f"{100 * (share or 0.0):.0f}%")
+            self.set_row(self.probe_table, probe, (
+                recent["jobs"] if recent else 0,
+                f"{recent['cycle_s']:.1f}s" if recent else "-",
+                *utilization), ("slow",) if recent and recent["slow"] else ())
+        for probe in [key for (table, key) in self.dashboard_rows
+                      if table is self.probe_table and key not in probes]:
+            self.probe_table.delete(probe)
+            del self.dashboard_rows[(self.probe_table, probe)]
+        
+        median = hour["median_cycle_s"]
+        self.median_var.set(f"Median cycle time (1 hour): {median:.1f}s" if median is not None
+                            else "Median cycle time: -")
+    
+    def set_row(self, table, key, values, tags=()):
+        """Insert or update a dashboard row, touching Tk only when it changed"""
+        row = (tuple(values), tuple(tags))
+        previous = self.dashboard_rows.get((table, key))
+        if previous == row:
+            return
+        if previous is None:
+            table.insert("", tk.END, iid=key, text=key, values=row[0], tags=row[1])
+        else:
+            table.item(key, values=row[0], tags=row[1])
+        self.dashboard_rows[(table, key)] = row
+    
+    def new_shift(self):
+        """Restart the shift totals"""
+        self.line_stats.new_shift()
+        self.log_message("New shift started on the dashboard")
+        self.refresh_dashboard()
+    
+    def update_progress(self):
+        """Show the latest progress event per slot and count its ETA down"""
+        while self.slot_progress:
+            slot, event = self.slot_progress.popitem()
+            widgets = self.slots[slot]
+            if widgets["status"].get().lower() == SLOT_RUNNING:
+                widgets["event"] = event
+                widgets["progress"].set(100 * event.fraction)
+        now = time.monotonic()
+        for widgets in self.slots.values():
+            event = widgets["event"]
+            if event is not None:
+                remaining = event.remaining(now)
+                eta = f"{remaining:.0f}s left" if remaining is not None else ""
+                text = f"{event.kind} {eta}".strip()
+                if widgets["eta"].get() != text:
+                    widgets["eta"].set(text)
     
     def log_message(self, message):
         """Add message to log"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        log_entry = f"[{timestamp}] {message}\n"
-        self.log_text.insert(tk.END, log_entry)
-        self.log_text.see(tk.END)
+        self.append_view(self.log_text, self.log_store, [f"[{timestamp}] {message}"])
+    
+    def view_line_count(self, widget):
+        """Number of text lines currently shown in a view"""
+        return int(widget.index("end-1c").split(".")[0]) - 1
+    
+    def append_view(self, widget, store, lines):
+        """Append lines to a view, keeping only the newest lines in the widget"""
+        lines = "\n".join(lines).split("\n")
+        store.extend(lines)
+        widget.insert(tk.END, "\n".join(lines) + "\n")
+        
+        limit = LOG_VIEW_LINES + self.history_loaded.get(widget, 0)
+        excess = self.view_line_count(widget) - limit
+        if excess > 0:
+            widget.delete("1.0", f"{excess + 1}.0")
+        widget.see(tk.END)
+    
+    def load_older(self):
+        """Page older history from the log store back into the selected view"""
+        if self.notebook.index("current") == 0:
+            widget, store = self.output_text, self.output_store
+        else:
+            widget, store = self.log_text, self.log_store
+        
+        loaded = self.history_loaded.get(widget, 0)
+        if loaded >= HISTORY_MAX_LINES:
+            self.status_var.set(f"{loaded} older lines shown; use Save Output for the full log")
+            return
+        
+        view_start = store.total - self.view_line_count(widget)
+        start = max(store.first_available,
+                    view_start - min(HISTORY_PAGE_LINES, HISTORY_MAX_LINES - loaded))
+        lines = store.lines_between(start, view_start)
+        if not lines:
+            self.status_var.set("No older history available")
+            return
+        
+        widget.insert("1.0", "\n".join(lines) + "\n")
+        self.history_loaded[widget] = loaded + len(lines)
+        widget.see("1.0")
     
     def clear_output(self):
         """Clear output displays"""
+        self.output_pipeline.clear()
+        self.output_store.clear()
+        self.log_store.clear()
+        self.history_loaded.clear()
         self.output_text.delete(1.0, tk.END)
         self.log_text.delete(1.0, tk.END)
         self.log_message("Output cleared")
@@ -462,9 +903,9 @@ class CC2650SingleFlashGUI:
             try:
                 with open(file_path, 'w') as f:
                     f.write("=== CC2650 SINGLE FLASH OUTPUT ===\n")
-                    f.write(self.output_text.get("1.0", tk.END))
+                    self.output_store.write_to(f)
                     f.write("\n=== ACTIVITY LOG ===\n")
-                    f.write(self.log_text.get("1.0", tk.END))
+                    self.log_store.write_to(f)
                 
                 self.log_message(f"Output saved to: {file_path}")
                 messagebox.showinfo("Saved", f"Flash output saved to:\n{file_path}")
@@ -475,7 +916,7 @@ class CC2650SingleFlashGUI:
     def copy_output(self):
         """Copy output to clipboard"""
         try:
-            output_content = self.output_text.get("1.0", tk.END)
+            output_content = self.output_store.text()
             self.root.clipboard_clear()
             self.root.clipboard_append(output_content)
             self.log_message("Output copied to clipboard")
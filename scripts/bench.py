@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+CC2650 Flash Benchmarks
+Drives the flash tools against the fake DSLite stand-in, no LaunchPad required
+
+Benchmarks:
+- single:      flash_single_firmware, one unit after another
+- gang:        GangScheduler with several fake probes in parallel
+- gui:         headless CC2650SingleFlashGUI (needs a display, e.g. xvfb-run)
+- incremental: simulated full vs changed-sector flash on FakeBackend
+- session:     per-unit DSLite launches vs warm per-probe sessions (GangScheduler)
+- hang:        time for a hung unit to free its slot under learned phase timeouts
+               and under the stall watchdog
+- provision:   per-unit serial/MAC patching, checksums and chunk files (no flashing)
+- pipeline:    one probe flashing back to back with slow per-unit bookkeeping
+               (--post seconds) inline vs on a PostPipeline
+- dashboard:   line statistics cost per finished job and per dashboard refresh
+               over a simulated shift
+- recipe:      resolving the package per unit vs the cached flash recipe, and
+               launching DSLite through the package launcher vs directly from the recipe
+- imports:     start-up cost of importing each front-end's modules (subprocess,
+               median of several runs, minus a bare interpreter)
+
+Reports units/hour, UI event-loop latency, memory growth and CPU per job.
+Station state (history, records, logs) goes to a temporary home directory.
+
+Usage:
+    python bench.py --units 16 --parallel 4 --latency 0.5 --lines 200
+    xvfb-run python bench.py --only gui --json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_HOME = tempfile.mkdtemp(prefix="cc2650_bench_")
+os.environ["HOME"] = BENCH_HOME
+os.environ["USERPROFILE"] = BENCH_HOME
+
+import fake_dslite  # noqa: E402
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+UI_PROBE_MS = 10
+IMPORT_MODULES = ("flash_core", "gang_scheduler", "flasher", "GUI_script")
+IMPORT_RUNS = 7
+
+
+def rss_bytes():
+    """Resident set size of this process, or None if unknown"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource:
+        # ru_maxrss is KB on Linux, bytes on macOS; only used as a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return None
+
+
+def child_cpu_seconds():
+    """CPU time used by finished child processes"""
+    if not resource:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Measurement:
+    """Wall time, CPU and memory around one benchmark"""
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        self.child_cpu = child_cpu_seconds()
+        self.rss = rss_bytes()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self.wall
+        self.cpu = time.process_time() - self.cpu
+        child_cpu = child_cpu_seconds()
+        self.child_cpu = child_cpu - self.child_cpu if child_cpu is not None else None
+        rss = rss_bytes()
+        self.rss_growth = rss - self.rss if rss is not None and self.rss is not None else None
+
+    def report(self, units, **extra):
+        """Standard result fields for a run of units"""
+        result = {
+            "units": units,
+            "wall_s": round(self.wall, 3),
+            "units_per_hour": round(units * 3600 / self.wall, 1) if self.wall else None,
+            "host_cpu_ms_per_job": round(1000 * self.cpu / units, 2) if units else None,
+            "flasher_cpu_ms_per_job": (round(1000 * self.child_cpu / units, 2)
+                                       if units and self.child_cpu is not None else None),
+            "rss_growth_kb": self.rss_growth // 1024 if self.rss_growth is not None else None,
+        }
+        result.update(extra)
+        return result
+
+
+def bench_single(package, units):
+    """flash_single_firmware back to back"""
+    from flasher import flash_single_firmware
+
+    passed = 0
+    with Measurement() as m:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(units):
+                passed += bool(flash_single_firmware(package))
+    return m.report(units, passed=passed)
+
+
+def bench_gang(package, units, parallel):
+    """GangScheduler with one fake probe per slot"""
+    from gang_scheduler import GangScheduler, SLOT_PASSED
+
+    lines = [0]
+    scheduler = GangScheduler(max_parallel=parallel,
+                              on_output=lambda slot, line: lines.__setitem__(0, lines[0] + 1))
+    passed = 0
+    with Measurement() as m:
+        done = 0
+        while done < units:
+            batch = min(parallel, units - done)
+            for slot in range(1, batch + 1):
+                scheduler.submit(slot, package, serial=f"FAKE{slot:02d}")
+            scheduler.wait()
+            passed += sum(1 for job in scheduler.jobs.values() if job.status == SLOT_PASSED)
+            done += batch
+    scheduler.shutdown()
+    return m.report(units, passed=passed, output_lines=lines[0])
+
+
+def bench_gui(package, units):
+    """Headless GUI flashing every slot, probing event-loop latency meanwhile"""
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return {"skipped": f"no display ({e})"}
+    root.withdraw()
+
+    import GUI_script
+    from probe_inventory import ProbeInventory
+    for name in ("showinfo", "showwarning", "showerror"):
+        setattr(GUI_script.messagebox, name, lambda *args, **kwargs: None)
+    slots = min(GUI_script.NUM_SLOTS, units)
+    sysfs = fake_dslite.make_sysfs(os.path.join(BENCH_HOME, "sysfs"),
+                                   [f"FAKE{slot:02d}" for slot in range(1, slots + 1)])
+    GUI_script.ProbeInventory = lambda **kwargs: ProbeInventory(sysfs, **kwargs)
+
+    app = GUI_script.CC2650SingleFlashGUI(root)
+    app.flash_folder = package
+    app.enable_flash_controls()
+    app.parallel_var.set(slots)
+
+    lateness = []
+    expected = [time.perf_counter() + UI_PROBE_MS / 1000]
+
+    def probe():
+        now = time.perf_counter()
+        lateness.append(max(0.0, now - expected[0]))
+        expected[0] = now + UI_PROBE_MS / 1000
+        root.after(UI_PROBE_MS, probe)
+
+    root.after(UI_PROBE_MS, probe)
+
+    flashed = 0
+    with Measurement() as m:
+        while flashed < units:
+            app.start_flash()
+            while app.scheduler.busy():
+                root.update()
+                time.sleep(0.001)
+            flashed += slots
+        deadline = time.perf_counter() + 0.2
+        while time.perf_counter() < deadline:
+            root.update()
+
+    stats = app.output_pipeline.stats()
+    app.on_close()
+
+    lateness.sort()
+    pick = lambda q: round(1000 * lateness[min(len(lateness) - 1, int(q * len(lateness)))], 2)
+    return m.report(flashed,
+                    ui_latency_p50_ms=pick(0.5) if lateness else None,
+                    ui_latency_p99_ms=pick(0.99) if lateness else None,
+                    ui_latency_max_ms=round(1000 * lateness[-1], 2) if lateness else None,
+                    lines_dropped=stats["dropped"],
+                    lines_coalesced=stats["coalesced"])
+
+
+def bench_session(package, units, parallel):
+    """Same gang run with a launch per unit and with warm sessions"""
+    from flash_session import SessionPool
+    from gang_scheduler import GangScheduler, SLOT_PASSED
+    from image_staging import ImageCache
+
+    results = {}
+    for mode in ("launch", "session"):
+        sessions = SessionPool() if mode == "session" else None
+        scheduler = GangScheduler(max_parallel=parallel, image_cache=ImageCache(),
+                                  sessions=sessions)
+        passed = 0
+        with Measurement() as m:
+            done = 0
+            while done < units:
+                batch = min(parallel, units - done)
+                for slot in range(1, batch + 1):
+                    scheduler.submit(slot, package, serial=f"FAKE{slot:02d}")
+                scheduler.wait()
+                passed += sum(1 for job in scheduler.jobs.values() if job.status == SLOT_PASSED)
+                done += batch
+        scheduler.shutdown()
+        if sessions:
+            sessions.close_all()
+        results[mode] = m.report(units, passed=passed,
+                                 sessions_started=sessions.started if sessions else 0)
+
+    launch, session = results["launch"]["wall_s"], results["session"]["wall_s"]
+    results["saved_pct"] = round(100.0 * (1 - session / launch), 1) if launch else None
+    return results
+
+
+def bench_hang(package, units):
+    """Learn phase timeouts from passing runs, then time how long a hung unit holds its slot"""
+    from failure_policy import DEFAULT_PHASE_TIMEOUT, MIN_SAMPLES
+    from gang_scheduler import GangScheduler
+    from phase_metrics import PhaseMetrics
+    from stall_watchdog import StallWatchdog
+
+    metrics = PhaseMetrics()
+    scheduler = GangScheduler(max_parallel=1, metrics=metrics, retry_policies={})
+    warmup = max(units, MIN_SAMPLES)
+    for _ in range(warmup):
+        scheduler.submit(1, package, serial="FAKE01")
+        scheduler.wait()
+
+    # Same hang caught by the stall watchdog instead, with no learned timeouts
+    watched = GangScheduler(max_parallel=1, metrics=PhaseMetrics(), retry_policies={},
+                            watchdog=StallWatchdog(stall_seconds=1.0, interval=0.25))
+
+    os.environ["FAKE_DSLITE_HANG"] = "1"
+    try:
+        with Measurement() as m:
+            job = scheduler.submit(1, package, serial="FAKE01")
+            scheduler.wait()
+        with Measurement() as w:
+            watched_job = watched.submit(1, package, serial="FAKE01")
+            watched.wait()
+    finally:
+        os.environ["FAKE_DSLITE_HANG"] = "0"
+    scheduler.shutdown()
+    watched.shutdown()
+    return {"warmup_units": warmup, "timeouts": scheduler.timeouts.describe("FAKE01"),
+            "hung_slot_freed_s": round(m.wall, 3), "failure": job.failure,
+            "fixed_timeout_s": DEFAULT_PHASE_TIMEOUT,
+            "watchdog_slot_freed_s": round(w.wall, 3),
+            "watchdog_recovery_s": round(watched_job.recovery_seconds or 0, 3)}
+
+
+def _interpreter_seconds(code, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def bench_imports(runs=IMPORT_RUNS):
+    """Median milliseconds to import each front-end module in a fresh interpreter"""
+    bare = _interpreter_seconds("pass", runs)
+    result = {"interpreter_ms": round(1000 * bare, 1)}
+    for module in IMPORT_MODULES:
+        seconds = _interpreter_seconds(f"import {module}", runs)
+        result[f"{module}_ms"] = round(1000 * (seconds - bare), 1)
+    return result
+
+
+def bench_provision(units):
+    """Units per hour the provisioning stage alone can stamp"""
+    from unit_provisioning import benchmark
+    return benchmark(max(units, 1000))
+
+
+def bench_pipeline(package, units, post_seconds):
+    """Units/hour of one probe when each unit's bookkeeping is inline or pipelined"""
+    from gang_scheduler import ACTIVE_STATES, GangScheduler, SLOT_PASSED
+    from post_pipeline import PostPipeline
+
+    results = {}
+    for mode in ("inline", "pipelined"):
+        pipeline = PostPipeline() if mode == "pipelined" else None
+        free = threading.Event()
+
+        def on_status(slot, status, job):
+            if status not in ACTIVE_STATES:
+                free.set()
+
+        scheduler = GangScheduler(max_parallel=1, pipeline=pipeline, on_status=on_status,
+                                  on_finished=lambda slot, status, job: time.sleep(post_seconds))
+        passed = 0
+        with Measurement() as m:
+            for _ in range(units):
+                free.clear()
+                job = scheduler.submit(1, package, serial="FAKE01")
+                free.wait()
+                passed += job.status == SLOT_PASSED
+            scheduler.wait()
+        scheduler.shutdown()
+        extra = {}
+        if pipeline:
+            extra = {"queue_high_water": pipeline.stats()["high_water"],
+                     "backpressure_s": pipeline.stats()["blocked_s"]}
+            pipeline.close()
+        results[mode] = m.report(units, passed=passed, **extra)
+
+    inline, pipelined = results["inline"]["wall_s"], results["pipelined"]["wall_s"]
+    results["saved_pct"] = round(100.0 * (1 - pipelined / inline), 1) if inline else None
+    return results
+
+
+def bench_dashboard():
+    """Rolling-window statistics over a simulated shift of 100k jobs"""
+    from line_stats import benchmark
+    return benchmark()
+
+
+def bench_recipe(package, runs=20):
+    """Per-unit command build and launch cost, through the launcher script and direct"""
+    from flash_recipe import PACKAGE_LAUNCHERS, RecipeCache, ResolvedRecipe, launch, resolve
+
+    cache = RecipeCache()
+    result = {}
+    for name, get in (("resolve_per_unit_us", resolve), ("cached_per_unit_us", cache.get)):
+        started = time.perf_counter()
+        for _ in range(1000):
+            get(package).command()
+        result[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    env = dict(os.environ, FAKE_DSLITE_LATENCY="0", FAKE_DSLITE_LINES="0", FAKE_DSLITE_STARTUP="0")
+    launcher = ResolvedRecipe.from_package(package, {"tool": PACKAGE_LAUNCHERS[0]})
+    launchers = (("launcher_script_ms", launcher),
+                 ("direct_ms", resolve(package)))
+    for name, recipe in launchers:
+        command = recipe.command()
+        started = time.perf_counter()
+        for _ in range(runs):
+            launch(command, BENCH_HOME, env, stdout=subprocess.DEVNULL).wait()
+        result[name] = round((time.perf_counter() - started) * 1000 / runs, 1)
+    return result
+
+
+def bench_incremental():
+    """Simulated full vs incremental flash time"""
+    from incremental_flash import benchmark
+    return benchmark()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CC2650 flash benchmarks on a fake DSLite")
+    parser.add_argument("--units", type=int, default=8, help="units flashed per benchmark")
+    parser.add_argument("--parallel", type=int, default=4, help="gang scheduler concurrency")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake seconds per flash")
+    parser.add_argument("--lines", type=int, default=64, help="fake progress lines per flash")
+    parser.add_argument("--startup", type=float, default=0.5,
+                        help="fake tool start-up seconds per launch (once per warm session)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fake failure probability")
+    parser.add_argument("--post", type=float, default=0.3,
+                        help="simulated bookkeeping/upload seconds per unit (pipeline benchmark)")
+    parser.add_argument("--only", choices=["single", "gang", "gui", "incremental", "session", "hang",
+                                           "provision", "pipeline", "dashboard", "recipe",
+                                           "imports"],
+                        action="append", help="run only these benchmarks")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    os.environ["FAKE_DSLITE_LATENCY"] = str(args.latency)
+    os.environ["FAKE_DSLITE_LINES"] = str(args.lines)
+    os.environ["FAKE_DSLITE_STARTUP"] = str(args.startup)
+    os.environ["FAKE_DSLITE_FAIL_RATE"] = str(args.fail_rate)
+    package = fake_dslite.make_package(os.path.join(BENCH_HOME, "fake_package"))
+
+    selected = args.only or ["single", "gang", "gui", "incremental", "session", "hang", "provision",
+                                 "pipeline", "dashboard", "recipe", "imports"]
+    results = {}
+    for name in selected:
+        if name == "single":
+            results[name] = bench_single(package, args.units)
+        elif name == "gang":
+            results[name] = bench_gang(package, args.units, args.parallel)
+        elif name == "gui":
+            results[name] = bench_gui(package, args.units)
+        elif name == "incremental":
+            results[name] = bench_incremental()
+        elif name == "session":
+            results[name] = bench_session(package, args.units, args.parallel)
+        elif name == "hang":
+            results[name] = bench_hang(package, args.units)
+        elif name == "provision":
+            results[name] = bench_provision(args.units)
+        elif name == "pipeline":
+            results[name] = bench_pipeline(package, args.units, args.post)
+        elif name == "dashboard":
+            results[name] = bench_dashboard()
+        elif name == "recipe":
+            results[name] = bench_recipe(package)
+        elif name == "imports":
+            results[name] = bench_imports()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for name, result in results.items():
+        print(f"[{name}]")
+        for key, value in result.items():
+            print(f"  {key:24} {value}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+// CC2650 warm flash session for TI Debug Server Scripting (DSS)
+//
+// Started once per probe by flash_session.py:
+//     dss.bat dss_flash_session.js <ccxml> [name=value ...]
+// The name=value pairs are the package's flash settings and recipe options,
+// applied to the debug session before the first unit.
+// Keeps the debug server open and flashes one unit per "program" command;
+// every file is read back and compared before the target is reset.
+// Protocol: see flash_session.py (tab-separated commands, "DONE <code>" replies).
+
+importPackage(Packages.com.ti.debug.engine.scripting);
+importPackage(Packages.com.ti.ccstudio.scripting.environment);
+importPackage(Packages.java.lang);
+importPackage(Packages.java.io);
+
+var out = System.out;
+var env = ScriptingEnvironment.instance();
+env.traceSetConsoleLevel(TraceLevel.OFF);
+
+var debugServer;
+var session;
+try {
+    debugServer = env.getServer("DebugServer.1");
+    debugServer.setConfig(arguments[0]);
+    session = debugServer.openSession(".*Cortex_M3.*");
+} catch (e) {
+    out.println("ERROR cannot open debug session: " + e);
+    throw e;
+}
+
+function setOption(name, value) {
+    if (value == "true" || value == "false") {
+        session.options.setBoolean(name, value == "true");
+    } else if (/^-?(0x[0-9a-fA-F]+|[0-9]+)$/.test(value)) {
+        session.options.setNumeric(name, parseInt(value));
+    } else {
+        session.options.setString(name, value);
+    }
+}
+
+for (var i = 1; i < arguments.length; i++) {
+    var split = arguments[i].indexOf("=");
+    var name = arguments[i].substring(0, split);
+    try {
+        setOption(name, arguments[i].substring(split + 1));
+    } catch (e) {
+        // generated.ufsettings also holds UniFlash-only entries the debugger does not know
+        out.println("warning: option " + name + " not applied: " + e);
+    }
+}
+out.println("READY");
+out.flush();
+
+function readFile(path) {
+    var file = new File(path);
+    var data = java.lang.reflect.Array.newInstance(java.lang.Byte.TYPE, file.length());
+    var stream = new DataInputStream(new FileInputStream(file));
+    try {
+        stream.readFully(data);
+    } finally {
+        stream.close();
+    }
+    return data;
+}
+
+function verify(path, address) {
+    var expected = readFile(path);
+    var actual = session.memory.readData(0, address, 8, expected.length);
+    for (var i = 0; i < expected.length; i++) {
+        if ((actual[i] & 0xFF) != (expected[i] & 0xFF)) {
+            throw "Verification failed: Values at address 0x" + (address + i).toString(16) +
+                  " do not match";
+        }
+    }
+}
+
+function program(files) {
+    session.target.connect();
+    try {
+        out.println("info: Cortex_M3_0: Erasing Flash....");
+        session.flash.erase();
+        out.println("info: Cortex_M3_0: Programming Flash....");
+        for (var i = 0; i + 1 < files.length; i += 2) {
+            session.memory.loadRaw(0, parseInt(files[i + 1], 16), files[i], 32, false);
+        }
+        out.println("info: Cortex_M3_0: Verifying Flash....");
+        for (var i = 0; i + 1 < files.length; i += 2) {
+            verify(files[i], parseInt(files[i + 1], 16));
+        }
+        out.println("info: Cortex_M3_0: Program verification successful");
+        session.target.reset();
+    } finally {
+        session.target.disconnect();
+    }
+}
+
+function readback(path, address, length) {
+    session.target.connect();
+    try {
+        session.memory.saveRaw(0, address, path, Math.ceil(length / 4), 32, false);
+    } finally {
+        session.target.disconnect();
+    }
+}
+
+var input = new BufferedReader(new InputStreamReader(System["in"]));
+var line;
+while ((line = input.readLine()) != null) {
+    var fields = String(line).split("\t");
+    if (fields[0] == "quit") {
+        break;
+    }
+    var code = 0;
+    try {
+        if (fields[0] == "program") {
+            program(fields.slice(1));
+            out.println("Success");
+        } else if (fields[0] == "readback") {
+            readback(fields[1], parseInt(fields[2], 16), parseInt(fields[3], 16));
+        } else {
+            out.println("error: unknown session command " + fields[0]);
+            code = 2;
+        }
+    } catch (e) {
+        out.println("error: " + e);
+        code = 1;
+    }
+    out.println("DONE " + code);
+    out.flush();
+}
+
+session.terminate();
+debugServer.stop();
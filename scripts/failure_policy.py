@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+CC2650 Flash Failure Policy
+Failure classes from DSLite output, per-class retry policies and adaptive phase timeouts
+
+Features:
+- FailureClassifier: reads output lines as they stream and names the failure:
+  probe not found, connect failure, erase error, verify mismatch or timeout
+- RetryPolicy per failure class: how often to retry, after what delay, and
+  which step to repeat (the whole flash run, or only the readback verify)
+- AdaptiveTimeouts: per-phase budgets of p99 x margin from PhaseMetrics, so a
+  hung unit frees its slot in seconds once the station has seen normal runs;
+  erase, program and verify are learned per job kind, so a burst of sector
+  patches never shrinks the budget of the next full flash
+- PhaseDeadline: re-armed on every phase change, fires when a phase overruns
+- seed_metrics: warms PhaseMetrics from passed runs in the flash history
+
+Usage:
+    python failure_policy.py --log run.log --exit-code 1
+    python failure_policy.py --timeouts
+"""
+
+import argparse
+import re
+import sys
+import threading
+
+from phase_metrics import JOB_KINDS, KIND_PHASES, PhaseMetrics, PhaseTracker
+
+FAIL_PROBE = "probe_not_found"
+FAIL_CONNECT = "connect"
+FAIL_ERASE = "erase"
+FAIL_VERIFY = "verify_mismatch"
+FAIL_TIMEOUT = "timeout"
+FAIL_UNKNOWN = "unknown"
+
+FAILURE_NAMES = {
+    FAIL_PROBE: "probe not found",
+    FAIL_CONNECT: "connect failure",
+    FAIL_ERASE: "erase error",
+    FAIL_VERIFY: "verify mismatch",
+    FAIL_TIMEOUT: "timeout",
+    FAIL_UNKNOWN: "unclassified failure",
+}
+
+# Steps a retry can repeat
+STEP_FLASH = "flash"
+STEP_VERIFY = "verify"
+
+# First matching line decides the class; later errors are usually consequences
+FAILURE_PATTERNS = (
+    (FAIL_PROBE, re.compile(
+        r"error -260\b|no (?:debug )?probe|(?:probe|xds110|emulator)\S* (?:was )?not (?:found|connected)"
+        r"|(?:cannot|could not|unable to) (?:find|open) (?:the )?(?:probe|xds110|emulator)",
+        re.IGNORECASE)),
+    (FAIL_CONNECT, re.compile(
+        r"error connecting|(?:unable|failed) to connect|connection (?:failed|error)"
+        r"|unable to access the dap|target (?:is )?not responding|error -(?:151|2062|2131)\b",
+        re.IGNORECASE)),
+    (FAIL_ERASE, re.compile(r"eras\w* (?:\w+ )?(?:failed|error)|(?:failed|error)\w* (?:to |while |during )?eras",
+                            re.IGNORECASE)),
+    (FAIL_VERIFY, re.compile(r"verification (?:failed|error)|verify (?:failed|error)"
+                             r"|data verification error|do not match", re.IGNORECASE)),
+)
+
+# Cheap substring test so ordinary progress lines skip the patterns
+# (an IGNORECASE regex alternation costs several times more per line)
+_HINT_WORDS = ("error", "fail", "not ", "unable", "cannot", "match")
+
+# Phase a run died in, for failures without a recognised message
+_PHASE_FAILURES = {"connect": FAIL_CONNECT, "erase": FAIL_ERASE, "verify": FAIL_VERIFY}
+
+DEFAULT_PHASE_TIMEOUT = 300.0
+DEFAULT_MARGIN = 3.0
+DEFAULT_QUANTILE = 0.99
+MIN_SAMPLES = 20
+MIN_PHASE_TIMEOUT = 5.0
+
+TIMEOUT_PHASES = ("connect", "erase", "program", "verify")
+
+
+class RetryPolicy:
+    """How one failure class is retried"""
+
+    def __init__(self, attempts=1, delay=0.0, step=STEP_FLASH):
+        self.attempts = attempts
+        self.delay = delay
+        self.step = step
+
+    def __repr__(self):
+        return f"RetryPolicy(attempts={self.attempts}, delay={self.delay}, step={self.step!r})"
+
+
+DEFAULT_RETRY_POLICIES = {
+    # USB re-enumeration after a replug takes a moment
+    FAIL_PROBE: RetryPolicy(attempts=2, delay=2.0),
+    # Nothing was written yet; a clean reconnect usually works
+    FAIL_CONNECT: RetryPolicy(attempts=2, delay=0.5),
+    FAIL_ERASE: RetryPolicy(attempts=1),
+    # The data is on the device; read it back instead of programming again
+    FAIL_VERIFY: RetryPolicy(attempts=1, step=STEP_VERIFY),
+    FAIL_TIMEOUT: RetryPolicy(attempts=1),
+    FAIL_UNKNOWN: RetryPolicy(attempts=0),
+}
+
+
+def describe_failure(failure):
+    """Operator-facing name of a failure class"""
+    return FAILURE_NAMES.get(failure, failure or "")
+
+
+def _hinted(lower):
+    for word in _HINT_WORDS:
+        if word in lower:
+            return True
+    return False
+
+
+class FailureClassifier:
+    """Names the failure of one flash run from its output, line by line"""
+
+    def __init__(self):
+        self.failure = None
+        self.line = None
+
+    def feed(self, line):
+        """Inspect one output line; returns the failure class once one is recognised"""
+        if self.failure is None and _hinted(line.lower()):
+            for failure, pattern in FAILURE_PATTERNS:
+                if pattern.search(line):
+                    self.failure = failure
+                    self.line = line
+                    break
+        return self.failure
+
+    def classify(self, return_code, timed_out=False, phase=None):
+        """Failure class of the finished run, or None if it passed"""
+        if timed_out:
+            return FAIL_TIMEOUT
+        if return_code == 0:
+            return None
+        return self.failure or _PHASE_FAILURES.get(phase, FAIL_UNKNOWN)
+
+
+class AdaptiveTimeouts:
+    """Per-phase timeouts from the observed phase durations"""
+
+    def __init__(self, metrics=None, margin=DEFAULT_MARGIN, quantile=DEFAULT_QUANTILE,
+                 min_samples=MIN_SAMPLES, minimum=MIN_PHASE_TIMEOUT,
+                 default=DEFAULT_PHASE_TIMEOUT):
+        self.metrics = metrics
+        self.margin = margin
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.minimum = minimum
+        self.default = default
+
+    def phase(self, phase, probe=None, kind=None):
+        """Seconds a phase may take; the fixed default until enough runs were seen
+
+        With a job kind, erase, program and verify only learn from runs of that
+        kind; runs of other kinds never stand in for them.
+        """
+        if self.metrics is None:
+            return self.default
+        kind = kind if phase in KIND_PHASES else None
+        for key in (probe, None) if probe else (None,):
+            if self.metrics.samples(phase, key, kind) >= self.min_samples:
+                observed = self.metrics.quantile(phase, self.quantile, key, kind)
+                return min(self.default, max(self.minimum, observed * self.margin))
+        return self.default
+
+    def total(self, probe=None, kind=None):
+        """Budget for a whole run"""
+        return sum(self.phase(phase, probe, kind) for phase in TIMEOUT_PHASES)
+
+    def describe(self, probe=None, kind=None):
+        """One-line summary of the current budgets"""
+        return ", ".join(f"{phase} {self.phase(phase, probe, kind):.1f}s"
+                         for phase in TIMEOUT_PHASES)
+
+
+class PhaseDeadline:
+    """Calls on_expire(phase, seconds) when the current phase outlives its budget"""
+
+    def __init__(self, timeouts, probe=None, on_expire=None, kind=None):
+        self.timeouts = timeouts
+        self.probe = probe
+        self.kind = kind
+        self.on_expire = on_expire
+        self.expired = None
+        self._lock = threading.Lock()
+        self._timer = None
+        self._armed = 0
+
+    def start(self, phase="connect"):
+        """Arm for the first phase"""
+        self.enter(phase)
+
+    def enter(self, phase):
+        """Re-arm for a new phase"""
+        seconds = self.timeouts.phase(phase, self.probe, self.kind)
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            if self.expired:
+                return
+            self._armed += 1
+            self._timer = threading.Timer(seconds, self._expire, (self._armed, phase, seconds))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self):
+        """Disarm"""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            self._armed += 1
+
+    def _expire(self, armed, phase, seconds):
+        with self._lock:
+            # A timer that fired while being re-armed or cancelled is stale
+            if armed != self._armed:
+                return
+            self.expired = phase
+            self._timer = None
+        if self.on_expire:
+            self.on_expire(phase, seconds)
+
+
+def seed_metrics(metrics, history, limit=500):
+    """Feed the latest passed runs from the flash history into PhaseMetrics;
+    returns the number of runs read"""
+    columns = ", ".join(f"{phase}_s" for phase in TIMEOUT_PHASES)
+    rows = history.query(
+        f"SELECT probe_id, kind, {columns} FROM flash_runs WHERE status = 'passed' "
+        f"ORDER BY started_at DESC LIMIT ?", (limit,))
+    for row in reversed(rows):
+        metrics.observe_run(row["probe_id"], {phase: row[f"{phase}_s"] for phase in TIMEOUT_PHASES
+                                              if row[f"{phase}_s"] is not None}, row["kind"])
+    return len(rows)
+
+
+def classify_log(path, return_code):
+    """Failure class of a saved raw output log"""
+    classifier = FailureClassifier()
+    tracker = PhaseTracker()
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            tracker.feed(line)
+            classifier.feed(line)
+    return classifier.classify(return_code, phase=tracker.phase), classifier.line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify CC2650 flash failures")
+    parser.add_argument("--log", help="raw DSLite output log to classify")
+    parser.add_argument("--exit-code", type=int, default=1, help="exit code of the logged run")
+    parser.add_argument("--timeouts", action="store_true",
+                        help="print the phase timeouts learned from the flash history")
+    args = parser.parse_args()
+
+    if args.log:
+        failure, line = classify_log(args.log, args.exit_code)
+        print(describe_failure(failure) or "passed")
+        if line:
+            print(f"    {line}")
+        return 0
+    if args.timeouts:
+        from flash_history import FlashHistory
+
+        metrics = PhaseMetrics()
+        history = FlashHistory()
+        runs = seed_metrics(metrics, history)
+        history.close()
+        timeouts = AdaptiveTimeouts(metrics)
+        print(f"{runs} passed run(s)")
+        for kind in JOB_KINDS:
+            print(f"  {kind}: {timeouts.describe(kind=kind)}")
+        return 0
+    parser.print_help()
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
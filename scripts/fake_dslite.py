@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Fake DSLite
+Stand-in for the UniFlash DSLite flasher so the jig can be exercised without a LaunchPad
+
+Behaviour is set by command-line options or FAKE_DSLITE_* environment variables
+(environment is used when the package launcher runs the package defaults):
+- FAKE_DSLITE_LATENCY    total seconds per flash, split over connect/erase/program/verify
+- FAKE_DSLITE_LINES      extra "Writing Flash" progress lines printed while programming
+- FAKE_DSLITE_FAIL_RATE  probability (0-1) that a run fails
+- FAKE_DSLITE_FAIL_KIND  how it fails: verify (default), probe, connect or erase
+- FAKE_DSLITE_HANG       probability (0-1) that a run stops producing output and never exits
+- FAKE_DSLITE_STARTUP    seconds of tool start-up paid per launch (once per warm session)
+
+Any real DSLite arguments (flash -c ... -f -v image) are accepted and ignored.
+With --session it speaks the flash_session.py line protocol instead
+(the package's session launcher starts it that way).
+make_sysfs() builds a fake /sys/bus/usb/devices tree of XDS110 probes for
+ProbeInventory.
+
+Usage:
+    python fake_dslite.py --make-package some_folder
+    python fake_dslite.py --make-sysfs some_folder --probe L1000001 --probe L1000002
+"""
+
+import argparse
+import json
+import os
+import random
+import stat
+import sys
+import time
+
+IMAGE_SIZE = 128 * 1024
+
+PHASE_SPLIT = (("connect", 0.15), ("erase", 0.15), ("program", 0.55), ("verify", 0.15))
+
+# Phase a failure kind stops in, and the DSLite error lines it prints
+FAILURES = {
+    "probe": ("connect", (
+        "error: Error initializing emulator: (Error -260 @ 0x0) An attempt to connect to the "
+        "XDS110 failed. The cause may be one or more of: no XDS110 is connected, invalid "
+        "firmware update, invalid XDS110 serial number, or faulty USB cable.",)),
+    "connect": ("connect", (
+        "error: CORTEX_M3_0: Error connecting to the target: (Error -2131 @ 0x0) Unable to "
+        "access the DAP. Reset the device, and retry the operation.",)),
+    "erase": ("erase", (
+        "error: CORTEX_M3_0: Flash Programmer: Erase failed. Flash sector at 0x00000000 "
+        "could not be erased.",)),
+    "verify": ("verify", (
+        "error: CORTEX_M3_0: File Loader: Verification failed: Values at address "
+        "0x00001000 do not match Please verify target memory and memory map.",
+        "Failed: File: user_files/images/firmware: a data verification error occurred, "
+        "file load failed.")),
+}
+
+CCXML = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<configurations XML_version="1.2" id="configurations_0">
+  <configuration XML_version="1.2" id="configuration_0">
+    <instance XML_version="1.2" desc="Texas Instruments XDS110 USB Debug Probe" href="connections/TIXDS110_Connection.xml" id="Texas Instruments XDS110 USB Debug Probe" xml="TIXDS110_Connection.xml" xmlpath="connections"/>
+    <connection XML_version="1.2" id="Texas Instruments XDS110 USB Debug Probe">
+      <instance XML_version="1.2" href="drivers/tixds510cs_dap.xml" id="drivers" xml="tixds510cs_dap.xml" xmlpath="drivers"/>
+      <platform XML_version="1.2" id="platform_0">
+        <instance XML_version="1.2" desc="CC2650F128" href="devices/cc2650f128.xml" id="CC2650F128" xml="cc2650f128.xml" xmlpath="devices"/>
+      </platform>
+    </connection>
+  </configuration>
+</configurations>
+"""
+
+
+def env_float(name, default):
+    """Float from the environment, or default"""
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def emit(line):
+    """Print one line immediately, like DSLite's unbuffered console output"""
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+
+def run_flash(latency, lines, fail_rate, hang_rate, rng, fail_kind="verify"):
+    """Emulate one DSLite flash run; returns the exit code"""
+    emit("Executing the following command:")
+    emit("> DSLite flash -c user_files/configs/cc2650f128.ccxml -e -f -v user_files/images/firmware")
+    emit("")
+    emit("For more details and examples, please refer to the UniFlash Quick Start guide.")
+    emit("")
+
+    hang = rng.random() < hang_rate
+    fail_phase, fail_lines = FAILURES[fail_kind]
+    fail = rng.random() < fail_rate
+
+    for phase, share in PHASE_SPLIT:
+        duration = latency * share
+        if phase == "erase":
+            emit("info: CORTEX_M3_0: Erasing Flash....")
+        elif phase == "program":
+            emit("info: CORTEX_M3_0: Programming Flash....")
+        elif phase == "verify":
+            emit("info: CORTEX_M3_0: Verifying Flash....")
+
+        if phase == "program" and lines:
+            block = IMAGE_SIZE // lines
+            for index in range(lines):
+                time.sleep(duration / lines)
+                emit(f"info: CORTEX_M3_0: Writing Flash @ Address 0x{index * block:08x} "
+                     f"of length 0x{block:08x}")
+        else:
+            time.sleep(duration)
+
+        if hang and phase == "program":
+            while True:
+                time.sleep(3600)
+
+        if fail and phase == fail_phase:
+            for line in fail_lines:
+                emit(line)
+            return 1
+
+    emit("info: CORTEX_M3_0: Program verification successful")
+    emit("Success")
+    return 0
+
+
+def run_session(startup, latency, lines, fail_rate, hang_rate, rng, fail_kind="verify"):
+    """Warm session: start up once, then flash one unit per "program" command"""
+    time.sleep(startup)
+    emit("READY")
+    flash = bytearray(b"\xff" * IMAGE_SIZE)
+    for line in sys.stdin:
+        fields = line.rstrip("\r\n").split("\t")
+        if fields[0] == "quit":
+            break
+        code = 0
+        if fields[0] == "program":
+            code = run_flash(latency, lines, fail_rate, hang_rate, rng, fail_kind)
+            # A failed verify still leaves the data on the device
+            if code == 0 or fail_kind == "verify":
+                flash[:] = b"\xff" * IMAGE_SIZE
+                for path, address in zip(fields[1::2], fields[2::2]):
+                    with open(path, "rb") as f:
+                        data = f.read()
+                    address = int(address, 16)
+                    flash[address:address + len(data)] = data
+        elif fields[0] == "readback":
+            address, length = int(fields[2], 16), int(fields[3], 16)
+            with open(fields[1], "wb") as f:
+                f.write(flash[address:address + length])
+        else:
+            emit(f"error: unknown session command {fields[0]}")
+            code = 2
+        emit(f"DONE {code}")
+    return 0
+
+
+def make_package(folder, image_size=IMAGE_SIZE):
+    """Create a UniFlash-style package folder whose flash recipe and launchers run this stand-in
+
+    The launchers are the ones this platform starts: dslite.bat and
+    dslite_session.bat on Windows, executable dslite.sh and dslite_session.sh elsewhere.
+    """
+    for sub in ("configs", "settings", "images"):
+        os.makedirs(os.path.join(folder, "user_files", sub), exist_ok=True)
+
+    with open(os.path.join(folder, "user_files", "configs", "cc2650f128.ccxml"), "w") as f:
+        f.write(CCXML)
+    with open(os.path.join(folder, "user_files", "images", "combined_firmware.bin"), "wb") as f:
+        f.write(bytes((i * 7) & 0xFF for i in range(image_size)))
+
+    script = os.path.abspath(__file__)
+    suffix = ".bat" if os.name == "nt" else ".sh"
+    for name, extra in (("dslite", ""), ("dslite_session", " --session")):
+        launcher = os.path.join(folder, name + suffix)
+        with open(launcher, "w") as f:
+            if os.name == "nt":
+                f.write(f'@echo off\r\n"{sys.executable}" "{script}"{extra} %*\r\n')
+            else:
+                f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}"{extra} "$@"\n')
+        os.chmod(launcher, os.stat(launcher).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    # Flash runs start the interpreter directly, no launcher script in between
+    with open(os.path.join(folder, "flash_recipe.json"), "w") as f:
+        json.dump({"tool": [sys.executable, script]}, f, indent=2)
+    return os.path.abspath(folder)
+
+
+def make_sysfs(folder, serials, bus=1):
+    """Create a fake /sys/bus/usb/devices tree with one XDS110 per serial"""
+    os.makedirs(folder, exist_ok=True)
+    attrs = {"idVendor": "0451", "idProduct": "bef3", "manufacturer": "Texas Instruments",
+             "product": "XDS110 (03.00.00.13) Embed with CMSIS-DAP"}
+    for port, serial in enumerate(serials, start=1):
+        device_dir = os.path.join(folder, f"{bus}-{port}")
+        os.makedirs(device_dir, exist_ok=True)
+        for name, value in dict(attrs, serial=serial, devnum=str(port + 1)).items():
+            with open(os.path.join(device_dir, name), "w") as f:
+                f.write(value + "\n")
+        os.makedirs(os.path.join(folder, f"{bus}-{port}:1.0"), exist_ok=True)
+    return os.path.abspath(folder)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake DSLite for jig testing", allow_abbrev=False)
+    parser.add_argument("--make-package", metavar="FOLDER",
+                        help="create a package folder that uses this fake DSLite")
+    parser.add_argument("--latency", type=float,
+                        default=env_float("FAKE_DSLITE_LATENCY", 2.0))
+    parser.add_argument("--lines", type=int,
+                        default=int(env_float("FAKE_DSLITE_LINES", 32)))
+    parser.add_argument("--fail-rate", type=float,
+                        default=env_float("FAKE_DSLITE_FAIL_RATE", 0.0))
+    parser.add_argument("--fail-kind", choices=sorted(FAILURES),
+                        default=os.environ.get("FAKE_DSLITE_FAIL_KIND", "verify"))
+    parser.add_argument("--hang-rate", type=float,
+                        default=env_float("FAKE_DSLITE_HANG", 0.0))
+    parser.add_argument("--make-sysfs", metavar="FOLDER",
+                        help="create a fake USB sysfs tree with the --probe serials")
+    parser.add_argument("--probe", action="append", default=[], help="probe serial for --make-sysfs")
+    parser.add_argument("--startup", type=float,
+                        default=env_float("FAKE_DSLITE_STARTUP", 0.0))
+    parser.add_argument("--session", action="store_true",
+                        help="run as a warm session (flash_session.py protocol)")
+    parser.add_argument("--seed", type=int, default=None)
+    args, _ = parser.parse_known_args()
+
+    if args.make_package:
+        print(make_package(args.make_package))
+        return 0
+    if args.make_sysfs:
+        print(make_sysfs(args.make_sysfs, args.probe))
+        return 0
+
+    rng = random.Random(args.seed)
+    if args.session:
+        return run_session(args.startup, args.latency, args.lines, args.fail_rate,
+                           args.hang_rate, rng, args.fail_kind)
+    time.sleep(args.startup)
+    return run_flash(args.latency, args.lines, args.fail_rate, args.hang_rate, rng,
+                     args.fail_kind)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
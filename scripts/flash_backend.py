@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+CC2650 Flash Backends
+Device access used by the flash tools besides the plain dslite.bat flash run
+
+Backends:
+- DSLiteBackend:  talks to the device with the DSLite command of the package's flash recipe
+- SessionBackend: uses a warm per-probe flash session, falling back to DSLiteBackend
+- FakeBackend:    in-memory stand-in for testing without a LaunchPad
+"""
+
+import os
+import subprocess
+import tempfile
+
+from flash_recipe import launch, resolve
+from flash_session import SessionError
+from stall_watchdog import kill_tree
+from uniflash_package import write_serial_ccxml
+
+FLASH_BASE = 0x00000000
+
+
+class DSLiteBackend:
+    """Device access through a UniFlash standalone package"""
+
+    name = "dslite"
+
+    def __init__(self, flash_folder, timeout=120, recipe=None):
+        self.flash_folder = os.path.abspath(flash_folder)
+        self.timeout = timeout
+        self.recipe = recipe
+
+    def readback(self, serial, start, length):
+        """Read device flash; returns bytes, or None if readback is not possible"""
+        try:
+            if self.recipe is None:
+                self.recipe = resolve(self.flash_folder)
+        except (OSError, ValueError):
+            return None
+        ccxml = self.recipe.ccxml
+
+        with tempfile.TemporaryDirectory(prefix="cc2650_readback_") as workdir:
+            if serial:
+                slot_ccxml = os.path.join(workdir, os.path.basename(ccxml))
+                write_serial_ccxml(ccxml, slot_ccxml, serial)
+                ccxml = slot_ccxml
+            output = os.path.join(workdir, "readback.bin")
+            try:
+                cmd = self.recipe.readback_command(ccxml, start, length, output)
+                process = launch(cmd, workdir, self.recipe.env, stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT, text=True)
+            except OSError:
+                return None
+            try:
+                process.communicate(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                # Take DSLite down with everything it started so the probe is free again
+                kill_tree(process)
+                process.communicate()
+                return None
+            if process.returncode != 0 or not os.path.exists(output):
+                return None
+            with open(output, "rb") as f:
+                return f.read()
+
+
+class SessionBackend:
+    """Device access through a SessionPool, with per-call DSLite launches as fallback"""
+
+    name = "session"
+
+    def __init__(self, sessions, flash_folder, timeout=120):
+        self.sessions = sessions
+        self.flash_folder = os.path.abspath(flash_folder)
+        self.fallback = DSLiteBackend(flash_folder, timeout)
+
+    def readback(self, serial, start, length):
+        """Read device flash; returns bytes, or None if readback is not possible"""
+        try:
+            session = self.sessions.get(self.flash_folder, serial)
+            with tempfile.TemporaryDirectory(prefix="cc2650_readback_") as workdir:
+                output = os.path.join(workdir, "readback.bin")
+                if session.readback(output, start, length) != 0 or not os.path.exists(output):
+                    return None
+                with open(output, "rb") as f:
+                    return f.read()
+        except SessionError:
+            return self.fallback.readback(serial, start, length)
+
+
+class FakeBackend:
+    """In-memory device flash, one image per serial, with a simulated time model"""
+
+    name = "fake"
+
+    # Rough XDS110 / CC2650F128 timings used for simulated durations
+    CONNECT_SECONDS = 2.0
+    ERASE_SECONDS_PER_SECTOR = 0.02
+    PROGRAM_BYTES_PER_SECOND = 10 * 1024
+    VERIFY_BYTES_PER_SECOND = 40 * 1024
+
+    def __init__(self, flash_size=128 * 1024, sector_size=4 * 1024):
+        self.flash_size = flash_size
+        self.sector_size = sector_size
+        self.devices = {}
+        self.readbacks = 0
+
+    def flash(self, serial, image, chunks=None):
+        """Erase and program a device; returns the simulated duration in seconds
+
+        Without chunks the whole flash is erased and the image programmed.
+        chunks is a list of (address, bytes) limited to those sectors.
+        """
+        if chunks is None:
+            self.erase(serial)
+            chunks = [(FLASH_BASE, image)]
+            erased_sectors = self.flash_size // self.sector_size
+        else:
+            erased_sectors = sum(-(-len(data) // self.sector_size) for _, data in chunks)
+
+        programmed = 0
+        for address, data in chunks:
+            self.program(serial, data, address - FLASH_BASE)
+            programmed += len(data)
+
+        return (self.CONNECT_SECONDS
+                + erased_sectors * self.ERASE_SECONDS_PER_SECTOR
+                + programmed / self.PROGRAM_BYTES_PER_SECOND
+                + programmed / self.VERIFY_BYTES_PER_SECOND)
+
+    def program(self, serial, data, start=FLASH_BASE):
+        """Write data into the fake device's flash"""
+        flash = self.devices.setdefault(serial, bytearray(b"\xff" * self.flash_size))
+        flash[start:start + len(data)] = data
+
+    def erase(self, serial):
+        """Return the fake device to blank flash"""
+        self.devices[serial] = bytearray(b"\xff" * self.flash_size)
+
+    def readback_seconds(self, length):
+        """Simulated duration of one readback: its own connect plus the transfer"""
+        return self.CONNECT_SECONDS + length / self.VERIFY_BYTES_PER_SECOND
+
+    def readback(self, serial, start, length):
+        """Read the fake device's flash, or None if it was never seen"""
+        self.readbacks += 1
+        flash = self.devices.get(serial)
+        if flash is None:
+            return None
+        return bytes(flash[start:start + length])
+
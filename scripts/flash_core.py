@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+CC2650 Flashing Core
+Tk-free job model, flash runner, output parser and results shared by every front-end
+
+Features:
+- Job model: FlashJob and the slot states
+- Output parser: OutputParser turns streamed DSLite lines into phases, a failure
+  class and typed progress events (connecting, erasing, programming with bytes
+  done/total, verifying, done, error) with an ETA from past phase timings; a
+  line costs a fixed number of pattern checks however verbose the tool is
+- Backend runner: run_process() starts the argv from the package's flash recipe
+  directly (no shell) in the job's cwd and own process group, and streams its
+  output line by line
+- Results: job_result() and describe_result() for the GUI, flasher.py and worker events
+- FlashStation: the station state (flash records, last images, staged image cache,
+  unit provisioning, resolved flash recipes, history, phase metrics, warm sessions) and the schedulers
+  that run jobs on it; a finished unit's bookkeeping runs on the station's
+  post-processing pipeline while its probe programs the next unit
+- Never imports tkinter; the scheduler, staging, history and session modules load
+  when a FlashStation first needs them, so `import flash_core` costs milliseconds
+  (python bench.py --only imports)
+
+Usage:
+    from flash_core import FlashStation
+    station = FlashStation()
+    job = station.flash("single_flash", on_output=lambda slot, line: print(line))
+    print(describe_result(job))
+    station.close()
+"""
+
+import os
+import re
+import sys
+import time
+
+from failure_policy import FailureClassifier, describe_failure
+from phase_metrics import KIND_FULL, KIND_INCREMENTAL, KIND_PROVISIONED, PHASES, PhaseTracker
+
+# Slot states
+SLOT_IDLE = "idle"
+SLOT_QUEUED = "queued"
+SLOT_RUNNING = "running"
+SLOT_PASSED = "passed"
+SLOT_FAILED = "failed"
+SLOT_STOPPED = "stopped"
+SLOT_SKIPPED = "skipped"
+
+ACTIVE_STATES = (SLOT_QUEUED, SLOT_RUNNING)
+GOOD_STATES = (SLOT_PASSED, SLOT_SKIPPED)
+
+# Progress event kinds
+EVENT_CONNECTING = "connecting"
+EVENT_ERASING = "erasing"
+EVENT_PROGRAMMING = "programming"
+EVENT_VERIFYING = "verifying"
+EVENT_DONE = "done"
+EVENT_ERROR = "error"
+
+PHASE_EVENTS = {"connect": EVENT_CONNECTING, "erase": EVENT_ERASING,
+                "program": EVENT_PROGRAMMING, "verify": EVENT_VERIFYING}
+
+# Phase weights for progress and ETA until the station has timings of its own
+DEFAULT_PHASE_SECONDS = {"connect": 2.0, "erase": 1.5, "program": 6.0, "verify": 1.5}
+
+# info: CORTEX_M3_0: Writing Flash @ Address 0x00017000 of length 0x00001000
+_WRITE_BLOCK = re.compile(r"@ address 0x[0-9a-f]+ of length 0x([0-9a-f]+)", re.IGNORECASE)
+
+
+class FlashJob:
+    """One flash job bound to a probe slot"""
+
+    def __init__(self, slot, flash_folder, serial=None, workdir=None,
+                 skip_identical=False, incremental=False, unit_serial=None, lot=None,
+                 verify=False, dump_path=None, provision=None):
+        self.slot = slot
+        self.flash_folder = os.path.abspath(flash_folder)
+        self.serial = serial or None
+        self.unit_serial = unit_serial or None
+        self.lot = lot or None
+        self.output_path = None
+        self.phases = {}
+        self.workdir = workdir
+        self.skip_identical = skip_identical
+        self.incremental = incremental
+        self.verify = verify
+        self.dump_path = dump_path
+        self.provision = provision
+        self.unit_image = None
+        self.recipe = None
+        self.verify_result = None
+        self.plan = None
+        self.staged = None
+        self.digest = None
+        self.skipped = False
+        self.status = SLOT_QUEUED
+        self.return_code = None
+        self.error = None
+        self.failure = None
+        self.timed_out = False
+        self.attempts = 0
+        self.recovery_seconds = None
+        self.started = None
+        self.finished = None
+        self.process = None
+        self.stop_requested = False
+
+    @property
+    def kind(self):
+        """What the job writes: a sector patch, a provisioned unit image or a full image"""
+        if self.plan:
+            return KIND_INCREMENTAL
+        if self.unit_image:
+            return KIND_PROVISIONED
+        return KIND_FULL
+
+    @property
+    def duration(self):
+        """Wall-clock seconds spent flashing, or None if not finished"""
+        if self.started and self.finished:
+            return (self.finished - self.started).total_seconds()
+        return None
+
+    def prepare(self):
+        """Create the job's private working directory"""
+        os.makedirs(self.workdir, exist_ok=True)
+
+    def program_bytes(self):
+        """Bytes the flash tool will write, or None if unknown"""
+        if self.plan:
+            return self.plan.total_bytes
+        if self.unit_image:
+            return self.unit_image.size
+        if self.staged:
+            return self.staged.size
+        return None
+
+    def command(self):
+        """Build the DSLite argv for this job from the package's flash recipe"""
+        from incremental_flash import ERASE_SETTING
+        from uniflash_package import write_serial_ccxml
+
+        if self.recipe is None:
+            from flash_recipe import resolve
+
+            self.recipe = resolve(self.flash_folder)
+        recipe = self.recipe
+
+        ccxml = None
+        if self.serial:
+            ccxml = os.path.join(self.workdir, os.path.basename(recipe.ccxml))
+            write_serial_ccxml(recipe.ccxml, ccxml, self.serial)
+
+        if self.plan:
+            return recipe.command(ccxml, files=self.plan.write_chunks(self.workdir),
+                                  settings=[ERASE_SETTING])
+        if self.unit_image:
+            # Shared template chunks plus this unit's patched sectors; every sector is written
+            return recipe.command(ccxml, files=self.unit_image.flash_files(self.workdir),
+                                  settings=[ERASE_SETTING])
+        if self.staged and self.staged.converted:
+            return recipe.command(ccxml, image=self.staged.flash_arg())
+        return recipe.command(ccxml)
+
+
+class ProgressEvent:
+    """Typed progress of one flash run; eta counts from `at` (monotonic seconds)"""
+
+    __slots__ = ("kind", "phase", "bytes_done", "bytes_total", "fraction", "eta", "at",
+                 "message")
+
+    def __init__(self, kind, phase, bytes_done=0, bytes_total=None, fraction=0.0, eta=None,
+                 at=None, message=None):
+        self.kind = kind
+        self.phase = phase
+        self.bytes_done = bytes_done
+        self.bytes_total = bytes_total
+        self.fraction = fraction
+        self.eta = eta
+        self.at = at
+        self.message = message
+
+    @property
+    def percent(self):
+        return int(100 * self.fraction)
+
+    def remaining(self, now=None):
+        """Seconds left at now, counting down from the event, or None"""
+        if self.eta is None:
+            return None
+        return max(0.0, self.eta - ((now or time.monotonic()) - self.at))
+
+    def describe(self):
+        """Short text, e.g. programming 61% 65536/131072 bytes, 3s left"""
+        text = f"{self.kind} {self.percent}%"
+        if self.kind == EVENT_PROGRAMMING and self.bytes_total:
+            text += f" {self.bytes_done}/{self.bytes_total} bytes"
+        if self.eta is not None and self.kind not in (EVENT_DONE, EVENT_ERROR):
+            text += f", {self.remaining():.0f}s left"
+        return text
+
+
+class OutputParser:
+    """Phase, failure class and progress of one flash run, fed one output line at a time
+
+    expected maps phases to typical seconds (PhaseMetrics.typical()); on_progress
+    gets a ProgressEvent on every phase change, error and whole percent of
+    programming progress.
+    """
+
+    def __init__(self, expected=None, total_bytes=None, on_progress=None,
+                 clock=time.monotonic):
+        self.clock = clock
+        self.tracker = PhaseTracker(clock=clock)
+        self.classifier = FailureClassifier()
+        self.lines = 0
+        self.total_bytes = total_bytes
+        self.bytes_done = 0
+        self._next_bytes = 0
+        self.on_progress = on_progress
+        self.event = None
+        self.expected = dict(DEFAULT_PHASE_SECONDS)
+        self.expected.update(expected or {})
+        # Expected seconds before each phase starts, and in total
+        self._before = {}
+        elapsed = 0.0
+        for phase in PHASES:
+            self._before[phase] = elapsed
+            elapsed += self.expected[phase]
+        self._total = elapsed
+
+    @property
+    def phase(self):
+        return self.tracker.phase
+
+    def restart(self):
+        """Start timing from now, once the tool is actually running"""
+        self.tracker.restart()
+        self._progress(EVENT_CONNECTING)
+
+    def feed(self, line):
+        """Inspect one non-empty line; returns the new phase name on a transition"""
+        self.lines += 1
+        if self.classifier.failure is None and self.classifier.feed(line):
+            self._progress(EVENT_ERROR, line)
+        phase = self.tracker.feed(line)
+        if phase:
+            self._progress(PHASE_EVENTS[phase])
+        elif self.tracker.phase == "program" and "@" in line:
+            match = _WRITE_BLOCK.search(line)
+            if match:
+                self.bytes_done += int(match.group(1), 16)
+                # Only whole-percent steps become events
+                if self.total_bytes and self.bytes_done >= self._next_bytes:
+                    self._progress(EVENT_PROGRAMMING)
+        return phase
+
+    def finish(self, return_code, timed_out=False):
+        """(phase durations, failure class or None) of the finished run"""
+        phase = self.tracker.phase
+        failure = self.classifier.classify(return_code, timed_out, phase)
+        phases = self.tracker.finish()
+        if failure is None:
+            self._emit(ProgressEvent(EVENT_DONE, phase, self.bytes_done, self.total_bytes, 1.0,
+                                     0.0, self.clock()))
+        else:
+            self._progress(EVENT_ERROR, self.classifier.line, phase)
+        return phases, failure
+
+    def _progress(self, kind, message=None, phase=None):
+        phase = phase or self.tracker.phase
+        elapsed = self.clock() - self.tracker.phase_started
+        expected = self.expected.get(phase, 0.0)
+        before = self._before.get(phase, 0.0)
+        left = max(0.0, expected - elapsed)
+        if phase == "program" and self.total_bytes:
+            within = min(1.0, self.bytes_done / self.total_bytes)
+            if within > 0.05:
+                # Project the phase from its own rate once it has a few blocks behind it
+                left = elapsed / within - elapsed
+        else:
+            within = min(0.95, elapsed / expected) if expected else 0.0
+        fraction = min(1.0, (before + within * expected) / self._total)
+        if phase == "program" and self.total_bytes and expected:
+            step = (int(100 * fraction) + 1) / 100 * self._total
+            self._next_bytes = (step - before) / expected * self.total_bytes
+        later = 0.0
+        if phase in self._before:
+            later = sum(self.expected[p] for p in PHASES[PHASES.index(phase) + 1:])
+        self._emit(ProgressEvent(kind, phase, self.bytes_done, self.total_bytes, fraction,
+                                 left + later, self.clock(), message))
+
+    def _emit(self, event):
+        self.event = event
+        if self.on_progress:
+            self.on_progress(event)
+
+
+def run_process(command, cwd, on_line, on_start=None, env=None):
+    """Run a flash tool directly in its own process group and stream its output
+
+    on_line(line) gets every line without its line ending; on_start(process)
+    runs once the process exists, e.g. to arm timeouts. Returns the exit code.
+    """
+    import subprocess
+    from flash_recipe import launch
+
+    process = launch(command, cwd, env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                     text=True, bufsize=1)
+    if on_start:
+        on_start(process)
+    for line in iter(process.stdout.readline, ''):
+        on_line(line.rstrip('\r\n'))
+    return process.wait()
+
+
+def job_result(job):
+    """JSON-friendly result of a finished job"""
+    return {
+        "slot": job.slot,
+        "probe_serial": job.serial,
+        "unit_serial": job.unit_serial,
+        "status": job.status,
+        "exit_code": job.return_code,
+        "error": job.error,
+        "failure": job.failure if job.status == SLOT_FAILED else None,
+        "attempts": job.attempts,
+        "recovery_s": job.recovery_seconds,
+        "duration_s": job.duration,
+        "phases": job.phases,
+        "output_path": job.output_path,
+    }
+
+
+def describe_phases(phases):
+    """Phase durations on one line, e.g. connect 1.2s, erase 0.4s"""
+    return ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in phases.items())
+
+
+def describe_result(job):
+    """One-line operator summary of a finished job"""
+    if job.status == SLOT_PASSED:
+        duration = f"{job.duration:.1f}s" if job.duration is not None else "-"
+        return f"flash completed successfully ({duration}: {describe_phases(job.phases)})"
+    if job.status == SLOT_SKIPPED:
+        return "skipped, device already holds this image"
+    if job.status == SLOT_STOPPED:
+        return "stopped by user"
+    if job.status == SLOT_FAILED:
+        reason = job.error or f"exit code: {job.return_code}"
+        if job.failure:
+            reason = f"{describe_failure(job.failure)} after {job.attempts} attempt(s), {reason}"
+        return f"flash failed ({reason})"
+    return job.status
+
+
+class FlashStation:
+    """Station state shared by every job of one front-end, and schedulers over it"""
+
+    def __init__(self, metrics=None, history=None, inventory=None, output_dir=None,
+                 post_workers=2):
+        from flash_history import DEFAULT_OUTPUT_DIR, FlashHistory
+        from image_check import FlashRecords
+        from image_staging import ImageCache
+        from incremental_flash import LastImages
+        from flash_recipe import RecipeCache
+        from phase_metrics import PhaseMetrics
+        from unit_provisioning import ProvisioningCache
+
+        self.records = FlashRecords()
+        self.last_images = LastImages()
+        self.image_cache = ImageCache()
+        self.provisioning = ProvisioningCache()
+        self.recipes = RecipeCache()
+        self._own_history = history is None
+        self.history = history or FlashHistory()
+        self.output_dir = output_dir or DEFAULT_OUTPUT_DIR
+        self.metrics = metrics if metrics is not None else PhaseMetrics()
+        self.inventory = inventory
+        self.session_pool = None
+        self.post_workers = post_workers
+        self.post_pipeline = None
+        # None until the phase timeouts were learned from the history
+        self.learned_runs = None
+
+    def learn_timeouts(self):
+        """Seed the phase metrics (and so the phase timeouts) from the flash history
+
+        The first scheduler() does this on its own; call it earlier to report
+        the result or handle an unreadable history yourself.
+        """
+        from failure_policy import seed_metrics
+
+        self.learned_runs = seed_metrics(self.metrics, self.history)
+        return self.learned_runs
+
+    def sessions(self):
+        """The station's warm session pool, started on first use"""
+        if self.session_pool is None:
+            from flash_session import SessionPool
+
+            self.session_pool = SessionPool(recipes=self.recipes)
+        return self.session_pool
+
+    def pipeline(self):
+        """The station's post-processing pipeline, or None with post_workers=0"""
+        if self.post_pipeline is None and self.post_workers:
+            from post_pipeline import PostPipeline
+
+            self.post_pipeline = PostPipeline(self.post_workers)
+        return self.post_pipeline
+
+    def scheduler(self, max_parallel=4, sessions=False, on_output=None, on_status=None,
+                  on_progress=None, on_finished=None):
+        """A GangScheduler over this station's state
+
+        on_finished(slot, status, job) runs once a finished job's records and
+        history row are written, on a post-processing thread.
+        """
+        import sqlite3
+
+        from gang_scheduler import GangScheduler
+
+        # Phase timeouts start from the runs this station has already logged
+        if self.learned_runs is None:
+            try:
+                self.learn_timeouts()
+            except sqlite3.Error as e:
+                self.learned_runs = 0
+                print(f"WARNING: Flash history unreadable, default phase timeouts: {e}",
+                      file=sys.stderr)
+        return GangScheduler(max_parallel=max_parallel,
+                             inventory=self.inventory,
+                             records=self.records,
+                             last_images=self.last_images,
+                             history=self.history,
+                             output_dir=self.output_dir,
+                             metrics=self.metrics,
+                             image_cache=self.image_cache,
+                             provisioning=self.provisioning,
+                             recipes=self.recipes,
+                             sessions=self.sessions() if sessions else None,
+                             on_output=on_output,
+                             on_status=on_status,
+                             on_progress=on_progress,
+                             on_finished=on_finished,
+                             pipeline=self.pipeline())
+
+    def flash(self, flash_folder, serial=None, on_output=None, on_status=None, sessions=False,
+              on_progress=None, **options):
+        """Flash one unit and wait for it; returns the finished FlashJob
+
+        options are GangScheduler.submit() arguments (skip_identical,
+        incremental, unit_serial, lot, verify, dump_path, provision).
+        """
+        scheduler = self.scheduler(1, sessions, on_output, on_status, on_progress)
+        try:
+            job = scheduler.submit(1, flash_folder, serial=serial, **options)
+            scheduler.wait()
+        finally:
+            scheduler.shutdown()
+        return job
+
+    def close(self):
+        """Finish post-processing, close warm sessions and flush the history if the
+        station opened it"""
+        if self.post_pipeline:
+            self.post_pipeline.close()
+        if self.session_pool:
+            self.session_pool.close_all()
+        if self._own_history:
+            self.history.close()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+CC2650 Flash History
+Structured record of every flash run in a local SQLite database
+
+Features:
+- One row per run: unit serial, probe, lot, image hash, times, phase durations,
+  exit code, status and the path of the raw output log
+- Writes are queued and committed in batches by a background thread; a failed
+  batch is reported and dropped, it never stops the writer
+- Indexes for lookups by serial, image, lot/status and time
+- Raw output files under ~/.cc2650_jig/output/<date>/
+
+Usage:
+    python flash_history.py --lot LOT42 --failures --days 7
+"""
+
+import argparse
+import os
+import queue
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+JIG_DIR = os.path.join(os.path.expanduser("~"), ".cc2650_jig")
+DEFAULT_DB_PATH = os.path.join(JIG_DIR, "flash_history.db")
+DEFAULT_OUTPUT_DIR = os.path.join(JIG_DIR, "output")
+
+PHASES = ("connect", "erase", "program", "verify")
+# Longest flush() or close() waits for the writer before giving up
+WRITER_TIMEOUT = 30.0
+
+COLUMNS = (
+    "unit_serial", "probe_id", "lot", "station", "image_name", "image_hash",
+    "started_at", "finished_at",
+) + tuple(f"{phase}_s" for phase in PHASES) + (
+    "exit_code", "status", "output_path", "failure", "attempts", "kind",
+)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS flash_runs (
+    id INTEGER PRIMARY KEY,
+    unit_serial TEXT,
+    probe_id TEXT,
+    lot TEXT,
+    station TEXT,
+    image_name TEXT,
+    image_hash TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    {", ".join(f"{phase}_s REAL" for phase in PHASES)},
+    exit_code INTEGER,
+    status TEXT NOT NULL,
+    output_path TEXT,
+    failure TEXT,
+    attempts INTEGER,
+    kind TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_serial ON flash_runs (unit_serial, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_image ON flash_runs (image_hash, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_lot_status ON flash_runs (lot, status, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_time ON flash_runs (started_at);
+"""
+
+_FLUSH = object()
+_STOP = object()
+
+
+def output_log_path(output_dir, started, slot=None, serial=None):
+    """Path for one run's raw output file"""
+    day_dir = os.path.join(output_dir, started.strftime("%Y%m%d"))
+    os.makedirs(day_dir, exist_ok=True)
+    name = started.strftime("%H%M%S_%f")
+    if slot is not None:
+        name += f"_slot{slot}"
+    if serial:
+        name += f"_{serial}"
+    return os.path.join(day_dir, name + ".log")
+
+
+def _timestamp(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+
+class FlashHistory:
+    """Batched writer and query helpers for the flash history database"""
+
+    def __init__(self, path=DEFAULT_DB_PATH, batch_size=200, flush_interval=2.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.station = socket.gethostname()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        self._migrate(conn)
+        conn.close()
+
+        self.write_errors = 0
+        self.dropped_runs = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._writer, name="flash-history", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _migrate(self, conn):
+        # Databases from before failure classification lack the newer columns
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(flash_runs)")}
+        with conn:
+            for column, kind in (("failure", "TEXT"), ("attempts", "INTEGER"), ("kind", "TEXT")):
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE flash_runs ADD COLUMN {column} {kind}")
+
+    def record(self, phases=None, **fields):
+        """Queue one run; datetimes are stored as epoch seconds"""
+        fields.setdefault("station", self.station)
+        for phase, seconds in (phases or {}).items():
+            fields[f"{phase}_s"] = seconds
+        for key in ("started_at", "finished_at"):
+            fields[key] = _timestamp(fields.get(key))
+        unknown = set(fields) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown history fields: {', '.join(sorted(unknown))}")
+        self._queue.put(tuple(fields.get(column) for column in COLUMNS))
+
+    def flush(self, timeout=WRITER_TIMEOUT):
+        """Block until every queued run is written; False on timeout"""
+        if not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self, timeout=WRITER_TIMEOUT):
+        """Commit pending runs and stop the writer thread; False on timeout"""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _write(self, conn, insert, batch):
+        try:
+            if conn is None:
+                conn = self._connect()
+            with conn:
+                conn.executemany(insert, batch)
+        except sqlite3.Error as e:
+            self.write_errors += 1
+            self.dropped_runs += len(batch)
+            print(f"WARNING: Flash history write failed, {len(batch)} run(s) dropped: {e}",
+                  file=sys.stderr)
+            if conn is not None:
+                conn.close()
+            return None
+        return conn
+
+    def _writer(self):
+        conn = None
+        insert = (f"INSERT INTO flash_runs ({', '.join(COLUMNS)}) "
+                  f"VALUES ({', '.join('?' for _ in COLUMNS)})")
+        batch = []
+        waiters = []
+        deadline = None
+        stopping = False
+
+        while not stopping:
+            timeout = max(0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                stopping = True
+            elif isinstance(item, tuple) and item and item[0] is _FLUSH:
+                waiters.append(item[1])
+            elif item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+                if len(batch) < self.batch_size and time.monotonic() < deadline:
+                    continue
+
+            if batch:
+                # A dropped connection is opened again for the next batch
+                conn = self._write(conn, insert, batch)
+                batch = []
+            for done in waiters:
+                done.set()
+            waiters = []
+
+        if conn is not None:
+            conn.close()
+
+    def query(self, sql, params=()):
+        """Run a read query on a separate connection; returns a list of dict rows"""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def failures(self, lot, since, until=None):
+        """Failed runs for a lot in a time window"""
+        until = until or datetime.now()
+        return self.query(
+            "SELECT * FROM flash_runs WHERE lot = ? AND status = 'failed' "
+            "AND started_at >= ? AND started_at < ? ORDER BY started_at",
+            (lot, _timestamp(since), _timestamp(until)))
+
+    def runs_for_serial(self, unit_serial, limit=50):
+        """Most recent runs for a unit"""
+        return self.query(
+            "SELECT * FROM flash_runs WHERE unit_serial = ? ORDER BY started_at DESC LIMIT ?",
+            (unit_serial, limit))
+
+    def runs_for_image(self, image_hash, since=None):
+        """Runs that flashed a given image"""
+        return self.query(
+            "SELECT * FROM flash_runs WHERE image_hash = ? AND started_at >= ? ORDER BY started_at",
+            (image_hash, _timestamp(since) or 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the CC2650 flash history")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="history database path")
+    parser.add_argument("--lot", help="lot to report on")
+    parser.add_argument("--serial", help="unit serial to report on")
+    parser.add_argument("--failures", action="store_true", help="only failed runs (with --lot)")
+    parser.add_argument("--days", type=int, default=7, help="time window in days")
+    args = parser.parse_args()
+
+    history = FlashHistory(args.db)
+    if args.serial:
+        rows = history.runs_for_serial(args.serial)
+    elif args.lot and args.failures:
+        rows = history.failures(args.lot, datetime.now() - timedelta(days=args.days))
+    elif args.lot:
+        rows = history.query(
+            "SELECT * FROM flash_runs WHERE lot = ? AND started_at >= ? ORDER BY started_at",
+            (args.lot, (datetime.now() - timedelta(days=args.days)).timestamp()))
+    else:
+        parser.print_help()
+        return
+
+    for row in rows:
+        started = datetime.fromtimestamp(row["started_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        failure = f" ({row['failure']})" if row["failure"] else ""
+        print(f"{started}  {row['status']:8} exit={row['exit_code']}{failure}  "
+              f"unit={row['unit_serial']}  probe={row['probe_id']}  {row['output_path']}")
+    print(f"{len(rows)} run(s)")
+    history.close()
+
+
+if __name__ == "__main__":
+    main()
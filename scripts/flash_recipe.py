@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+CC2650 Flash Recipes
+Declarative description of a package's flash run, resolved once to a direct DSLite command
+
+A recipe names the target configuration, image, UniFlash settings file and DSLite
+options of a package; relative paths are relative to the package folder. It lives
+in the package folder as flash_recipe.json (or flash_recipe.toml on Python 3.11+,
+or with tomli installed). Without a recipe file the package layout gives the same
+defaults the package launcher uses.
+
+    {
+        "tool": "deskdb/content/TICloudAgent/{platform}/ccs_base/DebugServer/bin/DSLite",
+        "ccxml": "user_files/configs/cc2650f128.ccxml",
+        "image": "user_files/images/combined_firmware.bin",
+        "settings": "user_files/settings/generated.ufsettings",
+        "options": {"VerifyAfterProgramLoad": "No verification"},
+        "erase": true,
+        "verify": true,
+        "args": [],
+        "env": {}
+    }
+
+Features:
+- Tool: the recipe's "tool" (a path, or an argv prefix such as [python, script]),
+  else the DSLite executable inside the package; {platform} is win, linux or osx
+- A package with neither still flashes its own defaults through its launcher
+  (dslite.bat on Windows, an executable dslite.sh elsewhere), started with no
+  arguments; anything per job (probe ccxml, staged image, chunks, readback)
+  then fails with an error naming the missing DSLite
+- ResolvedRecipe: tool, files, options and environment resolved once; command()
+  only adds the per-job ccxml, image or chunk list
+- RecipeCache: one ResolvedRecipe per package, resolved again only when the recipe
+  file or the package's user_files folders change
+- is_package() / package_error(): a folder is a package exactly when its recipe
+  resolves, whatever launcher (if any) it ships
+- launch(): starts the argv in the job's own cwd and process group; no shell on
+  Linux or Windows, so the output log shows the command that really ran
+
+Usage:
+    python flash_recipe.py --folder single_flash
+    python flash_recipe.py --folder single_flash --serial L1000ABC
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from uniflash_package import find_image, find_package_file
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+RECIPE_FILES = ("flash_recipe.json", "flash_recipe.toml")
+
+# Where UniFlash standalone packages keep the real DSLite executable
+PACKAGE_TOOL = os.path.join("deskdb", "content", "TICloudAgent", "{platform}", "ccs_base",
+                            "DebugServer", "bin", "DSLite")
+# Launchers this platform can start; they build their own DSLite command line
+PACKAGE_LAUNCHERS = ("dslite.bat",) if os.name == "nt" else ("dslite.sh",)
+
+RECIPE_KEYS = ("tool", "ccxml", "image", "settings", "options", "erase", "verify", "args", "env")
+
+
+def tool_platform():
+    """DSLite's name for this platform in the package layout"""
+    if os.name == "nt":
+        return "win"
+    return "osx" if sys.platform == "darwin" else "linux"
+
+
+def find_recipe(flash_folder):
+    """Recipe file of a package, or None"""
+    for name in RECIPE_FILES:
+        path = os.path.join(flash_folder, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def load_recipe(path):
+    """Parse a JSON or TOML recipe file into a dict"""
+    if path.lower().endswith(".toml"):
+        if tomllib is None:
+            raise ValueError(f"Reading {path} needs Python 3.11+ or the tomli package")
+        with open(path, "rb") as f:
+            spec = tomllib.load(f)
+    else:
+        with open(path, "r") as f:
+            spec = json.load(f)
+    if not isinstance(spec, dict):
+        raise ValueError(f"Recipe {path} is not a table of settings")
+    unknown = sorted(set(spec) - set(RECIPE_KEYS))
+    if unknown:
+        raise ValueError(f"Unknown recipe setting(s) in {path}: {', '.join(unknown)}")
+    return spec
+
+
+def _package_path(flash_folder, path):
+    path = os.path.expanduser(path.format(platform=tool_platform()))
+    return os.path.normpath(os.path.join(flash_folder, path))
+
+
+def _executable(path):
+    for candidate in (path, path + ".exe") if os.name == "nt" else (path,):
+        if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+            return candidate
+    return None
+
+
+def find_tool(flash_folder, tool=None):
+    """argv prefix that starts DSLite for a package"""
+    if isinstance(tool, (list, tuple)):
+        if not tool:
+            raise ValueError("Recipe tool list is empty")
+        program = str(tool[0])
+        # A bare name (python, DSLite) is looked up on PATH, anything else in the package
+        if os.path.dirname(program):
+            program = _package_path(flash_folder, program)
+        return [program] + [str(arg) for arg in tool[1:]]
+    if tool:
+        path = _executable(_package_path(flash_folder, tool))
+        if not path:
+            raise FileNotFoundError(f"Recipe tool not found: {tool}")
+        return [path]
+
+    path = _executable(_package_path(flash_folder, PACKAGE_TOOL))
+    if path:
+        return [path]
+    raise FileNotFoundError(f"No DSLite executable in {flash_folder} "
+                            f"({PACKAGE_TOOL.format(platform=tool_platform())}); "
+                            f"set \"tool\" in a flash recipe")
+
+
+def find_launcher(flash_folder):
+    """Package launcher this platform can start, or None"""
+    for name in PACKAGE_LAUNCHERS:
+        launcher = os.path.join(flash_folder, name)
+        if os.path.isfile(launcher) and (os.name == "nt" or os.access(launcher, os.X_OK)):
+            return launcher
+    return None
+
+
+class ResolvedRecipe:
+    """A recipe with every path and option resolved; builds per-job argv cheaply"""
+
+    def __init__(self, flash_folder, tool, ccxml, image=None, settings=None, options=None,
+                 erase=True, verify=True, args=(), env=None, source=None, launcher=False):
+        self.flash_folder = flash_folder
+        self.tool = list(tool)
+        # tool is the package launcher: it takes no arguments and flashes the defaults
+        self.launcher = launcher
+        self.ccxml = ccxml
+        self.image = image
+        self.settings = settings
+        self.options = dict(options or {})
+        self.erase = erase
+        self.verify = verify
+        self.args = [str(arg) for arg in args]
+        self.source = source
+        # Environment is built once; None inherits the station's
+        self.env = dict(os.environ, **{k: str(v) for k, v in env.items()}) if env else None
+
+        self._options = []
+        if settings:
+            self._options += ["-l", settings]
+        for name, value in self.options.items():
+            self._options += ["-s", f"{name}={value}"]
+        self._options += self.args
+
+    @classmethod
+    def from_package(cls, flash_folder, spec=None, source=None):
+        """Resolve a recipe dict (or the package defaults) against a package folder"""
+        flash_folder = os.path.abspath(flash_folder)
+        spec = spec or {}
+
+        def package_file(key, subdir, pattern):
+            if spec.get(key):
+                path = _package_path(flash_folder, spec[key])
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"Recipe {key} not found: {path}")
+                return path
+            if key == "image":
+                return find_image(flash_folder)
+            return find_package_file(flash_folder, subdir, pattern)
+
+        ccxml = package_file("ccxml", "configs", "*.ccxml")
+        if not ccxml:
+            raise FileNotFoundError(f"No target configuration in {flash_folder}")
+        settings = package_file("settings", "settings", "generated.ufsettings")
+        options = spec.get("options") or {}
+        if not isinstance(options, dict):
+            raise ValueError("Recipe options must map DSLite setting names to values")
+        launcher = None
+        try:
+            tool = find_tool(flash_folder, spec.get("tool"))
+        except FileNotFoundError:
+            launcher = None if spec.get("tool") else find_launcher(flash_folder)
+            if not launcher:
+                raise
+            tool = [launcher]
+        return cls(flash_folder, tool, ccxml,
+                   image=package_file("image", "images", "*"), settings=settings, options=options,
+                   erase=spec.get("erase", True), verify=spec.get("verify", True),
+                   args=spec.get("args") or (), env=spec.get("env"), source=source,
+                   launcher=bool(launcher))
+
+    def option_args(self):
+        """DSLite settings (-l), options (-s) and extra arguments shared by every job"""
+        return list(self._options)
+
+    def _launcher_only(self, what):
+        return FileNotFoundError(f"{what} needs the DSLite executable; "
+                                 f"{os.path.basename(self.tool[0])} in {self.flash_folder} "
+                                 f"only flashes the package defaults")
+
+    def command(self, ccxml=None, image=None, files=None, settings=()):
+        """DSLite flash argv for one job
+
+        ccxml replaces the package target configuration (e.g. a per-probe copy);
+        files replaces the full-image flash with "path" or "path,address" entries
+        programmed without a mass erase; image replaces the recipe image in a full
+        flash (e.g. a staged binary); settings are extra "name=value" settings.
+        """
+        if self.launcher:
+            if ccxml or image or files is not None or settings:
+                raise self._launcher_only("Flashing a chosen probe, image or sectors")
+            return list(self.tool)
+        argv = self.tool + ["flash", "-c", ccxml or self.ccxml] + self._options
+        for setting in settings:
+            argv += ["-s", setting]
+        verify = ["-v"] if self.verify else []
+        if files is not None:
+            return argv + ["-f"] + verify + list(files)
+        image = image or self.image
+        if not image:
+            raise FileNotFoundError(f"No firmware image in {self.flash_folder}")
+        return argv + (["-e"] if self.erase else []) + ["-f"] + verify + [image]
+
+    def readback_command(self, ccxml, start, length, output):
+        """DSLite argv that dumps device flash to a file"""
+        if self.launcher:
+            raise self._launcher_only("Device readback")
+        return self.tool + ["memory", "-c", ccxml or self.ccxml,
+                            "--range", f"0x{start:x},0x{length:x}", "--output", output]
+
+
+def resolve(flash_folder):
+    """ResolvedRecipe of a package from its recipe file, or from its layout"""
+    path = find_recipe(flash_folder)
+    spec = load_recipe(path) if path else None
+    return ResolvedRecipe.from_package(flash_folder, spec, path)
+
+
+def package_error(flash_folder, recipes=None):
+    """Why a folder is not a package this station can flash, or None if it is"""
+    try:
+        if recipes is not None:
+            recipes.get(flash_folder)
+        else:
+            resolve(flash_folder)
+    except (OSError, ValueError) as e:
+        return str(e)
+    return None
+
+
+def is_package(flash_folder, recipes=None):
+    """True if a folder's flash recipe resolves (through a RecipeCache, if given)"""
+    return package_error(flash_folder, recipes) is None
+
+
+def launch(command, cwd, env=None, **kwargs):
+    """Start a DSLite argv directly in cwd, in its own process group"""
+    from stall_watchdog import popen_group_kwargs
+
+    return subprocess.Popen(command, cwd=cwd, env=env, **kwargs, **popen_group_kwargs())
+
+
+class RecipeCache:
+    """One ResolvedRecipe per package, resolved on first use"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recipes = {}
+
+    def get(self, flash_folder):
+        """ResolvedRecipe for a package folder"""
+        flash_folder = os.path.abspath(flash_folder)
+        signature = _signature(flash_folder)
+        with self._lock:
+            entry = self._recipes.get(flash_folder)
+            if entry and entry[0] == signature:
+                return entry[1]
+        recipe = resolve(flash_folder)
+        with self._lock:
+            self._recipes[flash_folder] = (signature, recipe)
+        return recipe
+
+
+def _signature(flash_folder):
+    # Adding, removing or editing a recipe, config, setting or image changes a directory
+    # or file mtime; a few stats per job instead of a fresh resolve
+    paths = [os.path.join(flash_folder, name) for name in RECIPE_FILES]
+    paths += [os.path.join(flash_folder, "user_files", sub) for sub in ("configs", "settings", "images")]
+    signature = []
+    for path in paths:
+        try:
+            signature.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolve a CC2650 flash recipe")
+    parser.add_argument("--folder", default="single_flash", help="UniFlash package folder")
+    parser.add_argument("--serial", help="show the command for this probe's ccxml copy")
+    args = parser.parse_args()
+
+    try:
+        recipe = resolve(args.folder)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}")
+        return 1
+    print(f"Recipe: {recipe.source or 'package defaults'}")
+    ccxml = None
+    if args.serial:
+        ccxml = os.path.join("<workdir>", os.path.basename(recipe.ccxml))
+        print(f"Probe {args.serial}: ccxml copied per job to {ccxml}")
+    print(subprocess.list2cmdline(recipe.command(ccxml)))
+    if recipe.env:
+        print("Environment: " + ", ".join(f"{name}={value}" for name, value in
+                                          sorted(recipe.env.items())
+                                          if os.environ.get(name) != value))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+CC2650 Warm Flash Sessions
+Keeps one flashing tool process per probe alive and sends it a command per unit
+
+The per-unit DSLite launch pays for a shell plus the whole ccs_base_app
+start-up every board. A session starts the tool once per probe and keeps the
+debug server warm; each unit then only costs connect, program and disconnect.
+
+Session tools, in order of preference:
+- dslite_session.bat (Windows) or an executable dslite_session.sh in the
+  package (e.g. the fake DSLite stand-in)
+- TI Debug Server Scripting (ccs_base*/scripting/bin/dss) running
+  dss_flash_session.js from this folder
+Without either, callers fall back to per-unit launches. Sessions are built from
+the package's resolved flash recipe (ccxml, settings, options, environment), so a
+warm session flashes with the same configuration as a per-unit launch.
+
+Line protocol on the tool's stdin/stdout (fields separated by tabs):
+    tool:  READY                          once, when the session is up
+    host:  program <path> <address> ...   flash flat binaries, mass erase first,
+                                          then verify them; non-zero DONE on mismatch
+    host:  readback <path> <address> <length>
+    tool:  ... output lines ...
+    tool:  DONE <exit code>
+    host:  quit
+"""
+
+import glob
+import json
+import os
+import subprocess
+import tempfile
+import threading
+
+from flash_recipe import RecipeCache, launch
+from stall_watchdog import kill_tree
+from uniflash_package import read_ufsettings, write_serial_ccxml
+
+SESSION_START_TIMEOUT = 120
+DEFAULT_SESSION_ROOT = os.path.join(tempfile.gettempdir(), "cc2650_sessions")
+# Session launchers this platform can start, like flash_recipe.PACKAGE_LAUNCHERS
+SESSION_LAUNCHERS = ("dslite_session.bat",) if os.name == "nt" else ("dslite_session.sh",)
+DSS_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dss_flash_session.js")
+
+
+class SessionError(Exception):
+    """The session cannot be started or stopped answering"""
+
+
+def session_command(recipe, ccxml):
+    """Command line that starts a session tool for a resolved recipe, or None
+
+    The session flashes with the recipe's settings and options: a session launcher
+    takes them as DSLite -l/-s arguments, the DSS script as name=value pairs.
+    """
+    for name in SESSION_LAUNCHERS:
+        launcher = os.path.join(recipe.flash_folder, name)
+        if os.path.isfile(launcher) and (os.name == "nt" or os.access(launcher, os.X_OK)):
+            return [launcher, ccxml] + recipe.option_args()
+    script = "dss.bat" if os.name == "nt" else "dss.sh"
+    for dss in sorted(glob.glob(os.path.join(recipe.flash_folder, "ccs_base*", "scripting",
+                                             "bin", script))):
+        options = read_ufsettings(recipe.settings) if recipe.settings else {}
+        options.update(recipe.options)
+        pairs = [f"{name}={json.dumps(value) if isinstance(value, bool) else value}"
+                 for name, value in options.items()]
+        return [dss, DSS_SCRIPT, ccxml] + pairs
+    return None
+
+
+class FlashSession:
+    """One running session tool bound to a probe"""
+
+    def __init__(self, command, cwd, start_timeout=SESSION_START_TIMEOUT, env=None, recipe=None):
+        self.command = command
+        self.recipe = recipe
+        self.broken = False
+        self._lock = threading.Lock()
+        try:
+            # No shell: killing the tree on a stall then reaches the tool itself
+            self.process = launch(command, cwd, env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                  stderr=subprocess.STDOUT, text=True, bufsize=1)
+        except OSError as e:
+            raise SessionError(f"cannot start {os.path.basename(command[0])}: {e}")
+
+        timer = threading.Timer(start_timeout, kill_tree, (self.process,))
+        timer.start()
+        try:
+            for line in iter(self.process.stdout.readline, ''):
+                line = line.strip()
+                if line == "READY":
+                    return
+                if line.startswith("ERROR"):
+                    break
+        finally:
+            timer.cancel()
+        self.close()
+        raise SessionError(f"{os.path.basename(command[0])} did not become ready")
+
+    @property
+    def alive(self):
+        return not self.broken and self.process.poll() is None
+
+    def request(self, *fields, on_line=None):
+        """Send one command; streams output lines to on_line, returns the exit code"""
+        with self._lock:
+            try:
+                self.process.stdin.write("\t".join(str(f) for f in fields) + "\n")
+                self.process.stdin.flush()
+                for line in iter(self.process.stdout.readline, ''):
+                    clean_line = line.rstrip('\r\n')
+                    if clean_line.startswith("DONE "):
+                        return int(clean_line[5:])
+                    if on_line:
+                        on_line(clean_line)
+                error = "session exited during the command"
+            except (OSError, ValueError) as e:
+                error = f"session closed: {e}"
+            # Never reuse a session that lost track of the protocol
+            self.broken = True
+            kill_tree(self.process)
+            raise SessionError(error)
+
+    def program(self, path, base, on_line=None):
+        """Erase, program and verify a flat binary at base"""
+        return self.program_chunks([(path, base)], on_line)
+
+    def program_chunks(self, chunks, on_line=None):
+        """Erase once, then program and verify each (path, address) flat binary"""
+        fields = [field for path, address in chunks for field in (path, f"0x{address:x}")]
+        return self.request("program", *fields, on_line=on_line)
+
+    def readback(self, path, base, length):
+        """Read device flash into a file"""
+        return self.request("readback", path, f"0x{base:x}", f"0x{length:x}")
+
+    def close(self):
+        """Ask the tool to quit, killing it if it does not (or if it is broken)"""
+        if self.process.poll() is not None:
+            return
+        if not self.broken:
+            try:
+                self.process.stdin.write("quit\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=5)
+                return
+            except (OSError, ValueError, subprocess.TimeoutExpired):
+                pass
+        kill_tree(self.process)
+
+
+class SessionPool:
+    """Warm sessions keyed by package and probe serial"""
+
+    def __init__(self, work_root=DEFAULT_SESSION_ROOT, start_timeout=SESSION_START_TIMEOUT,
+                 recipes=None):
+        self.work_root = work_root
+        # The station's recipe cache, so sessions flash what per-unit launches would
+        self.recipes = recipes or RecipeCache()
+        self.start_timeout = start_timeout
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._unsupported = set()
+        self.started = 0
+
+    def get(self, flash_folder, serial=None):
+        """Live session for a probe, starting one if needed; raises SessionError"""
+        flash_folder = os.path.abspath(flash_folder)
+        key = (flash_folder, serial)
+        try:
+            recipe = self.recipes.get(flash_folder)
+        except (OSError, ValueError) as e:
+            raise SessionError(f"no flash recipe: {e}")
+        with self._lock:
+            session = self._sessions.get(key)
+            if session and session.alive and session.recipe is recipe:
+                return session
+            # A broken session may still hold the probe; an edited recipe needs a new one
+            stale = self._sessions.pop(key, None)
+            unsupported = flash_folder in self._unsupported
+        if stale:
+            stale.close()
+        if unsupported:
+            raise SessionError("package has no session-capable flash tool")
+
+        ccxml = recipe.ccxml
+        workdir = os.path.join(self.work_root, serial or "default")
+        os.makedirs(workdir, exist_ok=True)
+        if serial:
+            probe_ccxml = os.path.join(workdir, os.path.basename(ccxml))
+            write_serial_ccxml(ccxml, probe_ccxml, serial)
+            ccxml = probe_ccxml
+
+        command = session_command(recipe, ccxml)
+        if command is None:
+            with self._lock:
+                self._unsupported.add(flash_folder)
+            raise SessionError("package has no session-capable flash tool")
+
+        session = FlashSession(command, workdir, self.start_timeout, recipe.env, recipe)
+        with self._lock:
+            replaced = self._sessions.get(key)
+            self._sessions[key] = session
+            self.started += 1
+        if replaced:
+            replaced.close()
+        return session
+
+    def close(self, serial=None):
+        """Close the sessions of one probe"""
+        with self._lock:
+            keys = [key for key in self._sessions if key[1] == serial]
+            sessions = [self._sessions.pop(key) for key in keys]
+        for session in sessions:
+            session.close()
+
+    def close_all(self):
+        """Close every session"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+CC2650 Flash Worker
+Long-running flash service fed over a local socket or a spool directory
+
+Features:
+- Accepts jobs as JSON: {"id", "folder", "serial", "unit_serial", "lot",
+  "skip_identical", "incremental", "verify", "provision"}; only "folder" is
+  required (or --folder). "provision" maps provisioning fields to values
+- Runs jobs concurrently up to a limit, one at a time per probe serial
+- Emits JSON-lines events: accepted, queued, running, output and progress
+  (optional; progress carries the phase, percent and estimated seconds left), result
+- Socket mode: one JSON job per line on 127.0.0.1:<port>; events for those
+  jobs are written back on the same connection. {"cmd": "status"} reports state
+- Spool mode: drop <id>.json into <spool>/incoming; results appear in
+  <spool>/results/<id>.json and every event in <spool>/events.jsonl
+
+Usage:
+    python flasher.py --worker --listen 9651 --parallel 4
+    python flasher.py --worker --spool C:\\jig\\spool --folder single_flash
+"""
+
+import contextlib
+import json
+import os
+import re
+import signal
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+from flash_core import ACTIVE_STATES, FlashStation, job_result
+from flash_recipe import package_error
+
+DEFAULT_WORKER_PORT = 9651
+SPOOL_POLL_SECONDS = 0.5
+DEFAULT_PROBE = "default"
+# Unit serials name files in the station's archives, so nothing path-like
+UNIT_SERIAL_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
+
+class FlashWorker:
+    """Queues flash jobs per probe and runs them on a FlashStation's scheduler"""
+
+    def __init__(self, max_parallel=4, default_folder=None, progress_output=False,
+                 metrics=None, history=None, sessions=False):
+        self.default_folder = default_folder
+        self.progress_output = progress_output
+        self.station = FlashStation(metrics=metrics, history=history)
+        self.scheduler = self.station.scheduler(max_parallel, sessions,
+                                                on_output=self._on_output,
+                                                on_status=self._on_status,
+                                                on_progress=self._on_progress,
+                                                on_finished=self._on_finished)
+        self._lock = threading.RLock()
+        self._pending = {}
+        self._active = {}
+        self._finishing = {}
+        self._listeners = []
+        self._job_listeners = {}
+        # Events wait here until the worker lock is released, then go out in order
+        self._outbox = deque()
+        self._delivery = threading.Lock()
+        self._held = threading.local()
+        self.completed = 0
+
+    def add_listener(self, listener):
+        """Receive every event; listener(event_dict)"""
+        self._listeners.append(listener)
+
+    def submit(self, request, listener=None):
+        """Queue a job request; returns the job id"""
+        folder = request.get("folder") or self.default_folder
+        error = package_error(folder, self.station.recipes) if folder else "no folder given"
+        if error:
+            raise ValueError(f"Not a UniFlash project folder: {folder} ({error})")
+        unit_serial = request.get("unit_serial")
+        if unit_serial is not None and not UNIT_SERIAL_PATTERN.match(str(unit_serial)):
+            raise ValueError(f"Invalid unit serial: {unit_serial!r}")
+
+        job = dict(request)
+        job["id"] = str(request.get("id") or uuid.uuid4().hex[:12])
+        job["folder"] = os.path.abspath(folder)
+        probe = job.get("serial") or DEFAULT_PROBE
+
+        with self._locked():
+            if listener:
+                self._job_listeners[job["id"]] = listener
+            self._pending.setdefault(probe, deque()).append(job)
+            self._emit({"event": "accepted", "job": job["id"], "probe": probe})
+            self._dispatch(probe)
+        self._deliver()
+        return job["id"]
+
+    def status(self):
+        """Snapshot of queued and running work"""
+        with self._locked():
+            return {
+                "event": "status",
+                "running": {probe: job["id"] for probe, job in self._active.items()},
+                "pending": {probe: [job["id"] for job in jobs]
+                            for probe, jobs in self._pending.items() if jobs},
+                "completed": self.completed,
+            }
+
+    def idle(self):
+        """True when nothing is queued or running"""
+        with self._locked():
+            return not self._active and not self._finishing and not any(self._pending.values())
+
+    def shutdown(self):
+        """Stop running jobs and flush the history"""
+        self.scheduler.shutdown()
+        self.station.close()
+
+    def _dispatch(self, probe):
+        if probe in self._active or not self._pending.get(probe):
+            return
+        job = self._pending[probe].popleft()
+        self._active[probe] = job
+        try:
+            self.scheduler.submit(probe, job["folder"], serial=job.get("serial"),
+                                  skip_identical=bool(job.get("skip_identical")),
+                                  incremental=bool(job.get("incremental")),
+                                  verify=bool(job.get("verify")),
+                                  unit_serial=job.get("unit_serial"), lot=job.get("lot"),
+                                  provision=job.get("provision"))
+        except Exception as e:
+            del self._active[probe]
+            self._finish(job["id"], {"event": "result", "job": job["id"], "probe": probe,
+                                     "status": "failed", "error": str(e)})
+            self._dispatch(probe)
+
+    def _on_output(self, slot, line):
+        if self.progress_output:
+            job = self._active.get(slot)
+            if job:
+                self._emit({"event": "output", "job": job["id"], "probe": slot, "line": line})
+                self._deliver()
+
+    def _on_progress(self, slot, progress):
+        if self.progress_output:
+            job = self._active.get(slot)
+            if job:
+                eta = progress.remaining()
+                self._emit({"event": "progress", "job": job["id"], "probe": slot,
+                            "kind": progress.kind, "phase": progress.phase,
+                            "percent": progress.percent,
+                            "eta_s": None if eta is None else round(eta, 1)})
+                self._deliver()
+
+    def _on_status(self, slot, status, flash_job):
+        with self._locked():
+            job = self._active.get(slot)
+            if job is None:
+                return
+            if status in ACTIVE_STATES:
+                self._emit({"event": status, "job": job["id"], "probe": slot})
+            else:
+                # The probe is free; the result follows once the job is post-processed
+                del self._active[slot]
+                self._finishing[flash_job] = job
+                self._dispatch(slot)
+        self._deliver()
+
+    def _on_finished(self, slot, status, flash_job):
+        with self._locked():
+            job = self._finishing.pop(flash_job, None)
+            if job is None:
+                return
+            self.completed += 1
+        self._finish(job["id"], {
+            "event": "result",
+            "job": job["id"],
+            "probe": slot,
+            **job_result(flash_job),
+            "unit_serial": job.get("unit_serial"),
+        })
+        self._deliver()
+
+    def _finish(self, job_id, result):
+        with self._locked():
+            self._emit(result)
+            self._job_listeners.pop(job_id, None)
+
+    def _emit(self, event):
+        """Queue an event for its listeners; _deliver() sends it"""
+        event.setdefault("time", datetime.now().isoformat(timespec="milliseconds"))
+        with self._locked():
+            listeners = list(self._listeners)
+            listener = self._job_listeners.get(event.get("job"))
+            if listener:
+                listeners.append(listener)
+            self._outbox.append((event, listeners))
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with self._lock:
+            self._held.depth = getattr(self._held, "depth", 0) + 1
+            try:
+                yield
+            finally:
+                self._held.depth -= 1
+
+    def _deliver(self):
+        """Send queued events outside the worker lock, oldest first
+
+        Listeners write to sockets and files, so a slow client only holds up
+        event delivery, never dispatch. Under the lock (e.g. a status callback
+        during dispatch) nothing is sent; the outermost caller sends it. One
+        thread delivers at a time and takes every event queued meanwhile.
+        """
+        if getattr(self._held, "depth", 0):
+            return
+        if not self._delivery.acquire(blocking=False):
+            return
+        while True:
+            with self._locked():
+                if not self._outbox:
+                    # Released under the lock so an event queued next is never stranded
+                    self._delivery.release()
+                    return
+                event, listeners = self._outbox.popleft()
+            for listener in listeners:
+                try:
+                    listener(event)
+                except Exception as e:
+                    print(f"WARNING: Event listener failed: {e}", file=sys.stderr)
+
+
+class _JobConnection(socketserver.StreamRequestHandler):
+    """One client connection: JSON jobs in, JSON events out"""
+
+    def handle(self):
+        worker = self.server.worker
+        write_lock = threading.Lock()
+        outstanding = set()
+        done = threading.Condition()
+
+        def send(event):
+            with write_lock:
+                try:
+                    self.wfile.write((json.dumps(event) + "\n").encode())
+                    self.wfile.flush()
+                except OSError:
+                    pass
+            if event.get("event") == "result":
+                with done:
+                    outstanding.discard(event.get("job"))
+                    done.notify_all()
+
+        for raw in self.rfile:
+            raw = raw.strip()
+            if not raw:
+                continue
+            # Only an id this line added may be dropped again: an earlier job can share it
+            added = None
+            try:
+                request = json.loads(raw)
+                if not isinstance(request, dict):
+                    raise ValueError("A job must be a JSON object")
+                if request.get("cmd") == "status":
+                    send(worker.status())
+                    continue
+                job_id = str(request.get("id") or uuid.uuid4().hex[:12])
+                request["id"] = job_id
+                with done:
+                    if job_id not in outstanding:
+                        outstanding.add(job_id)
+                        added = job_id
+                worker.submit(request, listener=send)
+            except Exception as e:
+                if added is not None:
+                    with done:
+                        outstanding.discard(added)
+                        done.notify_all()
+                send({"event": "error", "error": str(e)})
+
+        # Client finished sending; deliver results for its jobs before closing
+        with done:
+            done.wait_for(lambda: not outstanding)
+
+
+class WorkerServer(socketserver.ThreadingTCPServer):
+    """Local TCP front-end for a FlashWorker"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, worker, port=DEFAULT_WORKER_PORT, host="127.0.0.1"):
+        self.worker = worker
+        super().__init__((host, port), _JobConnection)
+
+
+class SpoolWatcher:
+    """Feeds jobs from <spool>/incoming and writes results to <spool>/results"""
+
+    def __init__(self, worker, spool_dir):
+        self.worker = worker
+        self.incoming = os.path.join(spool_dir, "incoming")
+        self.active = os.path.join(spool_dir, "active")
+        self.results = os.path.join(spool_dir, "results")
+        for folder in (self.incoming, self.active, self.results):
+            os.makedirs(folder, exist_ok=True)
+        self.events_path = os.path.join(spool_dir, "events.jsonl")
+        self._events_lock = threading.Lock()
+        worker.add_listener(self._append_event)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="spool-watcher", daemon=True)
+        self._thread.start()
+
+    def _append_event(self, event):
+        with self._events_lock:
+            with open(self.events_path, "a") as f:
+                f.write(json.dumps(event) + "\n")
+
+    def _run(self):
+        while not self._stop.wait(SPOOL_POLL_SECONDS):
+            for name in sorted(os.listdir(self.incoming)):
+                if name.endswith(".json"):
+                    self._claim(name)
+
+    def _claim(self, name):
+        active_path = os.path.join(self.active, name)
+        try:
+            os.replace(os.path.join(self.incoming, name), active_path)
+            with open(active_path) as f:
+                request = json.load(f)
+        except (OSError, ValueError) as e:
+            self._write_result(name[:-5], {"event": "error", "error": str(e)})
+            return
+
+        request.setdefault("id", name[:-5])
+
+        def on_event(event):
+            if event.get("event") == "result":
+                self._write_result(event["job"], event)
+                if os.path.exists(active_path):
+                    os.remove(active_path)
+
+        try:
+            self.worker.submit(request, listener=on_event)
+        except ValueError as e:
+            on_event({"event": "result", "job": request["id"], "status": "failed", "error": str(e)})
+
+    def _write_result(self, job_id, result):
+        tmp_path = os.path.join(self.results, f"{job_id}.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(result, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.results, f"{job_id}.json"))
+
+    def close(self):
+        """Stop polling the spool directory"""
+        self._stop.set()
+        self._thread.join()
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def run_worker(max_parallel=4, port=None, spool_dir=None, default_folder=None,
+               progress_output=False, metrics=None, sessions=False):
+    """Run the worker until interrupted or terminated, printing events as JSON lines"""
+    signal.signal(signal.SIGTERM, _interrupt)
+    worker = FlashWorker(max_parallel=max_parallel, default_folder=default_folder,
+                         progress_output=progress_output, metrics=metrics,
+                         sessions=sessions)
+    print_lock = threading.Lock()
+
+    def print_event(event):
+        with print_lock:
+            sys.stdout.write(json.dumps(event) + "\n")
+            sys.stdout.flush()
+
+    worker.add_listener(print_event)
+
+    server = None
+    watcher = None
+    if port is not None:
+        server = WorkerServer(worker, port)
+        threading.Thread(target=server.serve_forever, name="worker-server", daemon=True).start()
+    if spool_dir:
+        watcher = SpoolWatcher(worker, spool_dir)
+    print_event({"event": "worker_started", "port": port, "spool": spool_dir,
+                 "parallel": max_parallel})
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+        if watcher:
+            watcher.close()
+        worker.shutdown()
+        print_event({"event": "worker_stopped", "completed": worker.completed})
@@ -12,68 +12,219 @@ and programmer configuration.
 CC2650 Single Firmware Flash Script
 """
 
+import argparse
 import os
-import subprocess
 import sys
-from datetime import datetime
+import threading
 
-def flash_single_firmware():
-    """Flash single combined firmware"""
+from flash_core import (GOOD_STATES, SLOT_PASSED, SLOT_RUNNING, SLOT_SKIPPED, FlashStation,
+                        describe_phases, describe_result)
+from flash_worker import DEFAULT_WORKER_PORT, run_worker
+from line_coordinator import run_station
+from package_index import DEFAULT_LIBRARY_ROOT, PackageIndex, describe
+from phase_metrics import DEFAULT_METRICS_PORT, JsonMetricsWriter, MetricsServer, PhaseMetrics
+from unit_provisioning import field_value
+
+def show_recipe(flash_folder):
+    """Print the flash recipe a package resolves to; False if it cannot be resolved"""
+    from flash_recipe import resolve
+    
+    try:
+        recipe = resolve(flash_folder)
+    except (OSError, ValueError) as e:
+        print("ERROR: " + str(e))
+        return False
+    print("Recipe: " + (os.path.basename(recipe.source) if recipe.source else "package defaults")
+          + ", DSLite: " + recipe.tool[-1])
+    return True
+
+def flash_single_firmware(flash_folder="single_flash", skip_identical=False, incremental=False,
+                          unit_serial=None, lot=None, metrics=None, verify=False,
+                          dump_path=None, provision=None):
+    """Flash single combined firmware
+
+    verify reads the device back after programming and compares it with the
+    image; dump_path compares a readback dump file instead. provision gives
+    values for the package's provisioning fields (the serial defaults to
+    unit_serial).
+    """
     
     print("CC2650 Single Firmware Flash Script")
     print("=" * 60)
     
-    # Path to your single flash project
-    flash_folder = "single_flash"  # or whatever you named it
-    
     if not os.path.exists(flash_folder):
         print("ERROR: Flash folder not found: " + flash_folder)
         return False
     
-    dslite_path = os.path.join(flash_folder, "dslite.bat")
-    if not os.path.exists(dslite_path):
-        print("ERROR: dslite.bat not found in " + flash_folder)
+    if not show_recipe(flash_folder):
         return False
     
-    print("Starting firmware flash...")
+    def on_output(slot, line):
+        print(line)
+    
+    def on_status(slot, status, job):
+        if status == SLOT_RUNNING:
+            print("Starting firmware flash...")
+            print("OUTPUT:")
     
+    station = FlashStation(metrics=metrics)
     try:
-        # Change to flash directory
-        original_dir = os.getcwd()
-        os.chdir(flash_folder)
-        
-        # Run dslite.bat
-        process = subprocess.run(
-            ["dslite.bat"],
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-        
-        # Return to original directory
-        os.chdir(original_dir)
-        
-        # Show output
-        print("STDOUT:")
-        print(process.stdout)
-        
-        if process.stderr:
-            print("STDERR:")
-            print(process.stderr)
-        
-        if process.returncode == 0:
-            print("SUCCESS: CC2650 programming completed!")
-            return True
-        else:
-            print("ERROR: Programming failed with exit code " + str(process.returncode))
-            return False
-            
-    except Exception as e:
-        print("ERROR: " + str(e))
+        job = station.flash(flash_folder, on_output=on_output, on_status=on_status,
+                            skip_identical=skip_identical, incremental=incremental,
+                            unit_serial=unit_serial, lot=lot, verify=verify,
+                            dump_path=dump_path, provision=provision)
+    finally:
+        station.close()
+    
+    if job.phases:
+        print("Phases: " + describe_phases(job.phases))
+    if job.status == SLOT_PASSED:
+        print("SUCCESS: CC2650 programming completed!")
+    elif job.status == SLOT_SKIPPED:
+        print("SKIPPED: " + describe_result(job))
+    else:
+        print("ERROR: " + describe_result(job))
+    return job.status in GOOD_STATES
+
+def flash_gang(flash_folder, serials, max_parallel=4, skip_identical=False, incremental=False,
+               lot=None, metrics=None, verify=False, sessions=False, unit_serial=None,
+               dump_path=None, provision=None):
+    """Flash one unit per probe serial, several at once
+
+    unit_serial, dump_path and provision describe a single unit, so they are
+    only accepted with one probe serial.
+    """
+    if len(serials) > 1 and (unit_serial or dump_path or provision):
+        raise ValueError("A unit serial, readback dump or provisioning values need a single probe")
+    
+    print("CC2650 Gang Flash: " + str(len(serials)) + " probe(s), "
+          + str(max_parallel) + " at a time")
+    print("=" * 60)
+    
+    if not show_recipe(flash_folder):
         return False
+    
+    print_lock = threading.Lock()
+    
+    def on_output(slot, line):
+        with print_lock:
+            print("[slot " + str(slot) + "] " + line)
+    
+    def on_status(slot, status, job):
+        with print_lock:
+            print("[slot " + str(slot) + "] " + status.upper())
+    
+    station = FlashStation(metrics=metrics)
+    scheduler = station.scheduler(max_parallel, sessions, on_output, on_status)
+    for slot, serial in enumerate(serials, start=1):
+        scheduler.submit(slot, flash_folder, serial=serial,
+                         skip_identical=skip_identical, incremental=incremental, lot=lot,
+                         verify=verify, unit_serial=unit_serial, dump_path=dump_path,
+                         provision=provision)
+    scheduler.wait()
+    scheduler.shutdown()
+    station.close()
+    
+    passed = sum(1 for job in scheduler.jobs.values() if job.status in GOOD_STATES)
+    print("=" * 60)
+    print("Gang flash finished: " + str(passed) + "/" + str(len(serials)) + " passed")
+    return passed == len(serials)
+
+def main():
+    parser = argparse.ArgumentParser(description="CC2650 firmware flash script")
+    parser.add_argument("--folder", default="single_flash",
+                        help="UniFlash standalone project folder")
+    parser.add_argument("--product", help="flash the package for this product from --library")
+    parser.add_argument("--version", help="package version for --product (default: newest)")
+    parser.add_argument("--library", default=DEFAULT_LIBRARY_ROOT,
+                        help="folder holding exported UniFlash packages")
+    parser.add_argument("--serial", action="append", default=[],
+                        help="XDS110 probe serial; repeat to gang-flash several probes")
+    parser.add_argument("--parallel", type=int, default=4,
+                        help="maximum number of probes flashed at once")
+    parser.add_argument("--skip-identical", action="store_true",
+                        help="skip units that already hold the package image")
+    parser.add_argument("--incremental", action="store_true",
+                        help="erase and program only sectors changed since the last flash")
+    parser.add_argument("--verify-readback", action="store_true",
+                        help="read the device back after programming and compare on the host")
+    parser.add_argument("--verify-dump", metavar="FILE",
+                        help="compare this readback dump with the image after programming")
+    parser.add_argument("--session", action="store_true",
+                        help="gang/worker: keep a warm flash session per probe instead of "
+                             "launching DSLite per unit")
+    parser.add_argument("--lot", help="production lot recorded in the flash history")
+    parser.add_argument("--unit-serial", help="unit serial recorded in the flash history")
+    parser.add_argument("--provision", action="append", default=[], metavar="FIELD=VALUE",
+                        type=field_value, help="per-unit value for a field in the package's provisioning.json "
+                             "(e.g. ble_mac=00:12:4B:00:00:2A); repeatable")
+    parser.add_argument("--metrics-port", type=int, nargs="?", const=DEFAULT_METRICS_PORT,
+                        help="serve phase metrics on http://127.0.0.1:PORT/metrics while flashing")
+    parser.add_argument("--metrics-json", help="write phase metrics to this JSON file")
+    parser.add_argument("--worker", action="store_true",
+                        help="run as a long-lived flash worker fed by --listen and/or --spool")
+    parser.add_argument("--listen", type=int, nargs="?", const=DEFAULT_WORKER_PORT,
+                        help="worker: accept JSON jobs on 127.0.0.1:PORT")
+    parser.add_argument("--spool", help="worker: accept JSON jobs dropped in SPOOL/incoming")
+    parser.add_argument("--progress-output", action="store_true",
+                        help="worker: include DSLite output lines as progress events")
+    parser.add_argument("--station", metavar="HOST:PORT",
+                        help="run as a line station pulling jobs and unit serials from the "
+                             "line coordinator; --serial names this station's probes")
+    parser.add_argument("--station-name", help="station name reported to the coordinator")
+    args = parser.parse_args()
+    
+    # These describe one unit: a gang, worker or station gets them per job instead
+    unit_options = [option for option, value in (("--unit-serial", args.unit_serial),
+                                                 ("--verify-dump", args.verify_dump),
+                                                 ("--provision", args.provision)) if value]
+    if unit_options and (len(args.serial) > 1 or args.worker or args.station):
+        parser.error(", ".join(unit_options) + " flash a single unit: use at most one --serial "
+                     "and no --worker or --station")
+    
+    if args.product:
+        index = PackageIndex(args.library)
+        index.refresh()
+        package = index.find(args.product, args.version)
+        if not package:
+            print(f"ERROR: No package for {args.product} {args.version or '(any version)'} "
+                  f"in {index.root}")
+            sys.exit(1)
+        print(f"Package: {describe(package)}")
+        args.folder = package["path"]
+    
+    metrics = PhaseMetrics()
+    server = MetricsServer(metrics, args.metrics_port) if args.metrics_port else None
+    writer = JsonMetricsWriter(metrics, args.metrics_json) if args.metrics_json else None
+    
+    if args.station:
+        run_station(args.station, args.serial, args.parallel, args.station_name, args.library,
+                    args.progress_output, metrics, args.session)
+        ok = True
+    elif args.worker:
+        if args.listen is None and not args.spool:
+            args.listen = DEFAULT_WORKER_PORT
+        run_worker(args.parallel, args.listen, args.spool, args.folder,
+                   args.progress_output, metrics, args.session)
+        ok = True
+    elif args.serial:
+        ok = flash_gang(args.folder, args.serial, args.parallel,
+                        args.skip_identical, args.incremental, args.lot, metrics,
+                        args.verify_readback, args.session, args.unit_serial,
+                        args.verify_dump, dict(args.provision))
+    else:
+        ok = flash_single_firmware(args.folder, args.skip_identical, args.incremental,
+                                   args.unit_serial, args.lot, metrics,
+                                   args.verify_readback, args.verify_dump,
+                                   dict(args.provision))
+    
+    if server:
+        server.close()
+    if writer:
+        writer.close()
+    sys.exit(0 if ok else 1)
 
 if __name__ == "__main__":
-    flash_single_firmware()
+    main()
 
 
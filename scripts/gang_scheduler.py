@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+CC2650 Gang Flash Scheduler
+Runs several UniFlash standalone flash jobs at once, one per probe slot
+
+Features:
+- One job per slot, each with its own working directory and probe serial
+- Configurable concurrency limit
+- Per-slot status tracking with callbacks for GUI / console front-ends
+- Optional skip of units that already hold the package image
+- Optional incremental flash of changed sectors only
+- Optional raw output logs and flash history rows per run
+- Per-phase timing of every run, fed into PhaseMetrics
+- Optional probe inventory check before a job is queued
+- Optional image staging: HEX/TI-TXT/ELF packages are programmed from a cached flat binary
+- Optional host-side readback verification after programming (device or dump file)
+- Optional warm per-probe flash sessions, falling back to per-unit DSLite launches
+- Failures classified from the output and retried per class, repeating only the failed step
+- Per-phase timeouts learned from the observed phase durations
+- Stall watchdog on output inactivity and CPU; hung jobs lose their whole process
+  tree, release the probe and hand the slot back, with the recovery time recorded
+- DSLite runs from the package's flash recipe, resolved once per package and
+  started without a shell in the slot's working directory
+- Optional post-processing pipeline: records, history rows and on_finished (result
+  events, uploads) run on a PostPipeline while the slot programs its next unit
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from failure_policy import (DEFAULT_RETRY_POLICIES, FAIL_UNKNOWN, FAIL_VERIFY, STEP_VERIFY,
+                            AdaptiveTimeouts, PhaseDeadline, describe_failure)
+from flash_backend import FLASH_BASE, DSLiteBackend, SessionBackend
+from flash_core import (ACTIVE_STATES, SLOT_FAILED, SLOT_IDLE, SLOT_PASSED,  # noqa: F401
+                        SLOT_QUEUED, SLOT_RUNNING, SLOT_SKIPPED, SLOT_STOPPED, FlashJob,
+                        OutputParser, run_process)
+from flash_history import output_log_path
+from flash_session import SessionError
+from image_check import check_identical, image_digest
+from incremental_flash import plan_incremental, read_package_image
+from readback_verify import verify_device, verify_dump
+from stall_watchdog import StallWatchdog, describe_stall, kill_tree
+from uniflash_package import find_image
+
+DEFAULT_WORK_ROOT = os.path.join(tempfile.gettempdir(), "cc2650_gang")
+
+
+class GangScheduler:
+    """Runs flash jobs in parallel, up to a concurrency limit"""
+
+    def __init__(self, max_parallel=4, work_root=DEFAULT_WORK_ROOT,
+                 on_output=None, on_status=None, backend=None, records=None,
+                 last_images=None, history=None, output_dir=None, metrics=None,
+                 inventory=None, image_cache=None, sessions=None,
+                 retry_policies=DEFAULT_RETRY_POLICIES, timeouts=None, watchdog=None,
+                 provisioning=None, on_progress=None, pipeline=None, on_finished=None,
+                 recipes=None):
+        self.max_parallel = max(1, int(max_parallel))
+        self.watchdog = watchdog or StallWatchdog()
+        self.retry_policies = retry_policies or {}
+        self.timeouts = timeouts or AdaptiveTimeouts(metrics)
+        self.sessions = sessions
+        self.inventory = inventory
+        self.image_cache = image_cache
+        self.provisioning = provisioning
+        self.recipes = recipes
+        self.work_root = work_root
+        self.backend = backend
+        self.records = records
+        self.last_images = last_images
+        self.history = history
+        self.output_dir = output_dir
+        self.metrics = metrics
+        self.on_output = on_output
+        self.on_status = on_status
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.pipeline = pipeline
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_parallel,
+                                            thread_name_prefix="flash-slot")
+
+    def submit(self, slot, flash_folder, serial=None, skip_identical=False, incremental=False,
+               unit_serial=None, lot=None, verify=False, dump_path=None, provision=None):
+        """Queue a flash job for a slot; returns the FlashJob
+
+        provision holds per-unit field values for packages with a provisioning.json.
+        """
+        if serial and self.inventory and self.inventory.available and serial not in self.inventory:
+            raise RuntimeError(f"Probe {serial} is not connected")
+        with self._lock:
+            current = self.jobs.get(slot)
+            if current and current.status in ACTIVE_STATES:
+                raise RuntimeError(f"Slot {slot} is already busy")
+            workdir = os.path.join(self.work_root, f"slot_{slot}")
+            job = FlashJob(slot, flash_folder, serial=serial, workdir=workdir,
+                           skip_identical=skip_identical, incremental=incremental,
+                           unit_serial=unit_serial, lot=lot, verify=verify,
+                           dump_path=dump_path, provision=provision)
+            self.jobs[slot] = job
+
+        self._set_status(job, SLOT_QUEUED)
+        self._executor.submit(self._run, job)
+        return job
+
+    def status(self, slot):
+        """Current status of a slot"""
+        job = self.jobs.get(slot)
+        return job.status if job else SLOT_IDLE
+
+    def snapshot(self):
+        """Dict of slot -> status for every known slot"""
+        with self._lock:
+            return {slot: job.status for slot, job in self.jobs.items()}
+
+    def busy(self):
+        """True while any job is queued or running"""
+        return any(status in ACTIVE_STATES for status in self.snapshot().values())
+
+    def stop(self, slot):
+        """Stop a queued or running job"""
+        job = self.jobs.get(slot)
+        if not job or job.status not in ACTIVE_STATES:
+            return False
+        job.stop_requested = True
+        if job.process and job.process.poll() is None:
+            kill_tree(job.process)
+        return True
+
+    def stop_all(self):
+        """Stop every active job"""
+        for slot in list(self.jobs):
+            self.stop(slot)
+
+    def wait(self):
+        """Block until all submitted jobs have finished and been post-processed"""
+        self._executor.shutdown(wait=True)
+        if self.pipeline:
+            self.pipeline.drain()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_parallel,
+                                            thread_name_prefix="flash-slot")
+
+    def shutdown(self):
+        """Stop all jobs and release worker threads"""
+        self.stop_all()
+        self._executor.shutdown(wait=False)
+        self.watchdog.close()
+
+    def _set_status(self, job, status):
+        job.status = status
+        if self.on_status:
+            self.on_status(job.slot, status, job)
+
+    def _progress_callback(self, job):
+        if not self.on_progress:
+            return None
+        return lambda event: self.on_progress(job.slot, event)
+
+    def _emit(self, job, line):
+        if self.on_output:
+            self.on_output(job.slot, line)
+
+    def _run(self, job):
+        if job.stop_requested:
+            self._set_status(job, SLOT_STOPPED)
+            return
+
+        job.started = datetime.now()
+        self._set_status(job, SLOT_RUNNING)
+        try:
+            job.prepare()
+            if self.recipes:
+                job.recipe = self.recipes.get(job.flash_folder)
+            if self.image_cache:
+                self._stage(job)
+            if self.provisioning and job.staged:
+                self._provision(job)
+            if self.pipeline and (job.skip_identical or job.incremental):
+                # Both read what the probe's previous unit recorded
+                self.pipeline.wait(job.serial)
+            if job.skip_identical and job.unit_image:
+                self._emit(job, "Pre-flash check: unit data differs per device, flashing")
+            elif job.skip_identical:
+                self._check_identical(job)
+            if job.incremental and not job.skipped:
+                self._plan_incremental(job)
+            if not job.skipped:
+                self._program(job)
+        except Exception as e:
+            job.error = str(e)
+            job.failure = job.failure or FAIL_UNKNOWN
+            self._emit(job, f"ERROR: {job.error}")
+        finally:
+            job.finished = datetime.now()
+            job.process = None
+
+        if job.stop_requested:
+            status = SLOT_STOPPED
+        elif job.skipped:
+            status = SLOT_SKIPPED
+        elif job.error is None and job.return_code == 0:
+            status = SLOT_PASSED
+        else:
+            status = SLOT_FAILED
+
+        # The probe is free: hand the slot back first, bookkeeping follows
+        self._set_status(job, status)
+        if self.pipeline:
+            self.pipeline.submit(job.serial, self._post_process, job, status)
+        else:
+            self._post_process(job, status)
+
+    def _post_process(self, job, status):
+        """Host-side work for a finished job that does not need the probe"""
+        try:
+            if status == SLOT_PASSED:
+                self._record(job)
+            elif status == SLOT_FAILED and self.last_images:
+                self.last_images.forget(job.unit_serial)
+            self._log_history(job, status)
+        except Exception as e:
+            # The unit is flashed either way; its result must still reach the caller
+            print(f"WARNING: Post-processing slot {job.slot} failed: {e}", file=sys.stderr)
+        if self.on_finished:
+            self.on_finished(job.slot, status, job)
+
+    def _stage(self, job):
+        try:
+            job.staged = self.image_cache.stage(job.flash_folder)
+        except (OSError, ValueError) as e:
+            # Unstageable image: let the package defaults flash it as exported
+            self._emit(job, f"WARNING: Image staging failed, using package image: {e}")
+            return
+        job.digest = job.staged.digest()
+        if job.staged.converted:
+            self._emit(job, f"Staged image: {job.staged.name} -> {job.staged.size} bytes, "
+                            f"CRC32 0x{job.staged.crc32:08x}")
+
+    def _provision(self, job):
+        provisioner = self.provisioning.get(job.flash_folder, job.staged)
+        if provisioner is None:
+            if job.provision:
+                raise ValueError("Package has no provisioning layout for the unit data")
+            return
+        job.unit_image = provisioner.unit(job.provision, job.unit_serial)
+        job.digest = job.unit_image.digest()
+        self._emit(job, f"Provisioned: {job.unit_image.describe()}")
+
+    def _check_identical(self, job):
+        backend = self._backend(job)
+        # A package that failed to stage is compared and flashed as exported
+        image_cache = self.image_cache if job.staged else None
+        identical, reason, job.digest = check_identical(job.flash_folder, job.serial,
+                                                        backend, self.records, image_cache,
+                                                        job.unit_serial)
+        self._emit(job, f"Pre-flash check: {reason}")
+        job.skipped = identical
+
+    def _plan_incremental(self, job):
+        if self.last_images is None:
+            self._emit(job, "Incremental flash: no image archive configured, full flash")
+            return
+        plan, reason = plan_incremental(job.flash_folder, job.unit_serial, self.last_images,
+                                        self._backend(job), job.serial,
+                                        self.image_cache if job.staged else None,
+                                        self._expected_image(job),
+                                        job.staged.base if job.staged else FLASH_BASE)
+        self._emit(job, f"Incremental flash: {reason}")
+        if plan is not None and not plan.sectors:
+            job.skipped = True
+        else:
+            job.plan = plan
+
+    def _backend(self, job):
+        if self.backend:
+            return self.backend
+        if self.sessions:
+            return SessionBackend(self.sessions, job.flash_folder)
+        return DSLiteBackend(job.flash_folder, recipe=job.recipe)
+
+    def _program(self, job):
+        """Flash (and verify), retrying only the failed step per the failure class"""
+        step = None
+        retried = {}
+        while True:
+            job.attempts += 1
+            job.error = None
+            job.failure = None
+            if step == STEP_VERIFY:
+                self._verify(job)
+                if job.error is None:
+                    job.return_code = 0
+                elif job.failure == FAIL_UNKNOWN:
+                    # Readback was not possible: the unit still failed its verify
+                    job.failure = FAIL_VERIFY
+            else:
+                self._flash(job)
+                if ((job.verify or job.dump_path) and job.return_code == 0
+                        and not job.stop_requested):
+                    self._verify(job)
+            if job.stop_requested or (job.return_code == 0 and job.error is None):
+                return
+
+            policy = self.retry_policies.get(job.failure)
+            count = retried.get(job.failure, 0)
+            if not policy or count >= policy.attempts:
+                return
+            retried[job.failure] = count + 1
+            step = policy.step
+            # Comparing the same dump again cannot change the answer
+            if step == STEP_VERIFY and (job.dump_path or self._expected_image(job) is None):
+                step = None
+            self._emit(job, f"Retry: {describe_failure(job.failure)}, repeating "
+                            f"{step or 'flash'} ({count + 1}/{policy.attempts})")
+            if policy.delay:
+                time.sleep(policy.delay)
+            if job.stop_requested:
+                return
+
+    def _expire(self, job, phase, seconds):
+        job.timed_out = True
+        self._emit(job, f"ERROR: {phase} phase timed out after {seconds:.1f} s")
+        process = job.process
+        if process and process.poll() is None:
+            kill_tree(process)
+
+    def _stalled(self, job, watch):
+        job.timed_out = True
+        self._emit(job, f"ERROR: Watchdog: {describe_stall(watch)}, killing the process tree")
+        kill_tree(watch.process)
+
+    def _recovered(self, job, watch):
+        """After a stall kill: release the probe and record how long the slot was lost"""
+        if self.sessions and job.serial:
+            self.sessions.close(job.serial)
+        job.recovery_seconds = time.monotonic() - watch.last_output
+        if self.metrics:
+            self.metrics.observe_event("slot_recovery", job.serial, job.recovery_seconds)
+        self._emit(job, f"Watchdog: probe released, slot back in service "
+                        f"{job.recovery_seconds:.1f} s after the last output")
+
+    def _flash(self, job):
+        output_file = None
+        if self.output_dir:
+            job.output_path = output_log_path(self.output_dir, job.started, job.slot,
+                                              job.unit_serial or job.serial)
+            # Retries append to the same raw log
+            output_file = open(job.output_path, "a" if job.attempts > 1 else "w",
+                               encoding="utf-8")
+
+        job.timed_out = False
+        parser = OutputParser(self.metrics.typical(job.serial) if self.metrics else None,
+                              job.program_bytes(), self._progress_callback(job))
+        deadline = PhaseDeadline(self.timeouts, job.serial,
+                                 lambda phase, seconds: self._expire(job, phase, seconds), job.kind)
+        watches = []
+
+        def on_line(clean_line):
+            if watches:
+                watches[0].touch()
+            if output_file:
+                output_file.write(clean_line + "\n")
+            if clean_line:
+                phase = parser.feed(clean_line)
+                if phase:
+                    deadline.enter(phase)
+                self._emit(job, clean_line)
+
+        def on_start(process):
+            # Tool start-up (or session checkout) is not part of the connect phase budget
+            job.process = process
+            parser.restart()
+            deadline.start()
+            watches.append(self.watchdog.watch(job.process,
+                                               lambda watch: self._stalled(job, watch)))
+
+        try:
+            if not self._flash_session(job, on_line, on_start):
+                command = job.command()
+                self._emit(job, f"DSLite: {subprocess.list2cmdline(command)}")
+                job.return_code = run_process(command, job.workdir, on_line, on_start,
+                                              job.recipe.env)
+        finally:
+            deadline.cancel()
+            for watch in watches:
+                watch.cancel()
+                if watch.stalled:
+                    self._recovered(job, watch)
+            if output_file:
+                output_file.close()
+
+        job.phases, job.failure = parser.finish(job.return_code, job.timed_out)
+        if self.metrics and job.return_code == 0:
+            self.metrics.observe_run(job.serial, job.phases, job.kind)
+
+    def _flash_session(self, job, on_line, on_start):
+        """Flash a full staged image through a warm session; False means launch DSLite"""
+        if not self.sessions or not job.staged or job.plan:
+            return False
+        try:
+            session = self.sessions.get(job.flash_folder, job.serial)
+            on_start(session.process)
+            if job.unit_image:
+                job.return_code = session.program_chunks(job.unit_image.flash_chunks(job.workdir),
+                                                         on_line)
+            else:
+                job.return_code = session.program(job.staged.path, job.staged.base, on_line)
+            return True
+        except SessionError as e:
+            if job.stop_requested or job.timed_out:
+                job.return_code = -1
+                return True
+            self._emit(job, f"Flash session unavailable ({e}), launching DSLite")
+            return False
+
+    def _expected_image(self, job):
+        if job.unit_image:
+            return job.unit_image.read()
+        return job.staged.read() if job.staged else read_package_image(job.flash_folder)
+
+    def _verify(self, job):
+        data = self._expected_image(job)
+        if data is None:
+            job.error = "Readback verify needs a flat .bin image or image staging"
+            job.failure = FAIL_UNKNOWN
+            self._emit(job, f"ERROR: {job.error}")
+            return
+        base = job.staged.base if job.staged else FLASH_BASE
+        if job.dump_path:
+            job.verify_result = verify_dump(job.dump_path, data, base)
+        else:
+            job.verify_result = verify_device(self._backend(job), job.serial, data, base)
+        self._emit(job, f"Readback verify: {job.verify_result.describe()}")
+        if not job.verify_result.ok:
+            job.error = f"Readback verify failed: {job.verify_result.describe()}"
+            job.failure = FAIL_VERIFY if job.verify_result.ranges else FAIL_UNKNOWN
+
+    def _log_history(self, job, status):
+        if not self.history:
+            return
+        digest = self._image_digest(job) or {}
+        self.history.record(
+            unit_serial=job.unit_serial,
+            probe_id=job.serial,
+            lot=job.lot,
+            image_name=digest.get("name"),
+            image_hash=digest.get("sha256"),
+            started_at=job.started,
+            finished_at=job.finished,
+            phases=job.phases,
+            exit_code=job.return_code,
+            status=status,
+            output_path=job.output_path,
+            failure=job.failure if status == SLOT_FAILED else None,
+            attempts=job.attempts or None,
+            kind=job.kind,
+        )
+
+    def _record(self, job):
+        if self.last_images:
+            data = self._expected_image(job)
+            if data is not None:
+                self.last_images.save(job.unit_serial, data)
+        if self.records and self._image_digest(job):
+            self.records.update(job.unit_serial, job.digest)
+
+    def _image_digest(self, job):
+        if job.digest is None:
+            image = find_image(job.flash_folder)
+            if image:
+                job.digest = image_digest(image)
+        return job.digest
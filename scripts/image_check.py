@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+CC2650 Pre-Flash Image Check
+Decides whether a device already runs the package image so programming can be skipped
+
+Checks, in order:
+- Device readback CRC32 against the image (raw .bin images, backend permitting)
+- Per-unit record of the last image flashed by this station, keyed by the unit
+  serial; a probe's record says nothing about the board now on it, so without a
+  unit serial only a readback can skip programming
+"""
+
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+
+from flash_backend import FLASH_BASE
+from uniflash_package import find_image
+
+DEFAULT_RECORDS_PATH = os.path.join(os.path.expanduser("~"), ".cc2650_jig", "unit_flash_records.json")
+
+
+def image_digest(path):
+    """SHA-256, CRC32 and size of an image file"""
+    with open(path, "rb") as f:
+        data = f.read()
+    return {
+        "name": os.path.basename(path),
+        "size": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "crc32": zlib.crc32(data),
+    }
+
+
+class FlashRecords:
+    """Per-unit record of the last image flashed, kept in a JSON file"""
+
+    def __init__(self, path=DEFAULT_RECORDS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self._records = json.load(f)
+            except (OSError, ValueError):
+                self._records = {}
+
+    def get(self, unit_serial):
+        """Last record for a unit serial, or None"""
+        if not unit_serial:
+            return None
+        with self._lock:
+            return self._records.get(unit_serial)
+
+    def update(self, unit_serial, digest):
+        """Remember that the unit now holds the image described by digest"""
+        if not unit_serial:
+            return
+        record = dict(digest, flashed_at=datetime.now().isoformat(timespec="seconds"))
+        with self._lock:
+            self._records[unit_serial] = record
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Per-writer name: every station on this PC saves the same file
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._records, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def check_identical(flash_folder, serial, backend=None, records=None, image_cache=None,
+                    unit_serial=None):
+    """Compare the package image with the device; returns (identical, reason, digest)
+
+    serial is the probe the device is read through; records are only consulted
+    for a known unit_serial. With an ImageCache the staged binary is compared, so readback also works
+    for HEX, TI-TXT and ELF packages.
+    """
+    if image_cache is not None:
+        staged = image_cache.stage(flash_folder)
+        digest = staged.digest()
+        flat, base = True, staged.base
+    else:
+        image = find_image(flash_folder)
+        if not image:
+            return False, "no image found in user_files/images", None
+        digest = image_digest(image)
+        flat, base = image.lower().endswith(".bin"), FLASH_BASE
+
+    if backend and flat:
+        data = backend.readback(serial, base, digest["size"])
+        if data is not None:
+            crc = zlib.crc32(data)
+            if crc == digest["crc32"]:
+                return True, f"device CRC32 0x{crc:08x} matches {digest['name']}", digest
+            return False, (f"device CRC32 0x{crc:08x} differs from "
+                           f"{digest['name']} (0x{digest['crc32']:08x})"), digest
+
+    if records and unit_serial:
+        last = records.get(unit_serial)
+        if last and last.get("sha256") == digest["sha256"]:
+            return True, (f"unit {unit_serial} last flashed with {digest['name']} "
+                          f"at {last['flashed_at']}"), digest
+
+    return False, f"no matching readback or record for {digest['name']}", digest
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+CC2650 Image Staging
+Converts a package's firmware into a flat, checksummed binary once per image
+
+Features:
+- Parses Intel HEX, TI-TXT and ELF (.out) images as well as raw .bin
+- Packages with several images (BLE stack + app) are merged into one image;
+  overlapping bytes that disagree are an error
+- Flat binary from FLASH_BASE, gaps filled with erased bytes (0xFF)
+- SHA-256 and CRC32 computed once at staging time
+- Content-addressed cache under ~/.cc2650_jig/staged with LRU eviction;
+  repeat lookups for an unchanged package cost one stat per image file
+
+Usage:
+    python image_staging.py --folder single_flash
+    python image_staging.py --convert stack.hex app.hex --output combined.bin
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+from flash_backend import FLASH_BASE
+from incremental_flash import FLASH_SIZE
+from uniflash_package import package_images
+
+DEFAULT_STAGE_DIR = os.path.join(os.path.expanduser("~"), ".cc2650_jig", "staged")
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+FILL_BYTE = 0xFF
+
+
+def parse_intel_hex(text):
+    """Intel HEX text -> list of (address, bytes)"""
+    segments = []
+    upper = 0
+    current_address = None
+    current = None
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith(":"):
+            raise ValueError(f"Intel HEX line {number}: missing ':'")
+        try:
+            record = bytes.fromhex(line[1:])
+        except ValueError:
+            raise ValueError(f"Intel HEX line {number}: not hexadecimal")
+        if len(record) < 5 or len(record) != record[0] + 5:
+            raise ValueError(f"Intel HEX line {number}: bad record length")
+        if sum(record) & 0xFF:
+            raise ValueError(f"Intel HEX line {number}: checksum mismatch")
+
+        count, offset, kind = record[0], (record[1] << 8) | record[2], record[3]
+        payload = record[4:4 + count]
+        if kind == 0x00:
+            address = upper + offset
+            if current is not None and current_address + len(current) == address:
+                current.extend(payload)
+            else:
+                current = bytearray(payload)
+                current_address = address
+                segments.append((address, current))
+        elif kind == 0x01:
+            break
+        elif kind == 0x02:
+            upper = int.from_bytes(payload, "big") << 4
+        elif kind == 0x04:
+            upper = int.from_bytes(payload, "big") << 16
+        # 0x03 / 0x05 start addresses do not affect flash contents
+    return [(address, bytes(data)) for address, data in segments]
+
+
+def parse_ti_txt(text):
+    """TI-TXT ("@ADDR" blocks of hex bytes, "q" to end) -> list of (address, bytes)"""
+    segments = []
+    address = None
+    current = None
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.lower() == "q":
+            break
+        if line.startswith("@"):
+            address = int(line[1:], 16)
+            current = bytearray()
+            segments.append((address, current))
+            continue
+        if current is None:
+            raise ValueError(f"TI-TXT line {number}: data before the first @address")
+        try:
+            current.extend(bytes.fromhex(line))
+        except ValueError:
+            raise ValueError(f"TI-TXT line {number}: not hexadecimal")
+    return [(address, bytes(data)) for address, data in segments if data]
+
+
+def parse_elf(data, flash_base=FLASH_BASE, flash_size=FLASH_SIZE):
+    """Loadable ELF segments in flash -> list of (address, bytes)
+
+    Segments are placed at their load (physical) address; segments that load
+    outside flash, such as RAM sections, are ignored.
+    """
+    if data[:4] != b"\x7fELF":
+        raise ValueError("not an ELF file")
+    order = "<" if data[5] == 1 else ">"
+    if data[4] == 1:
+        phoff, = struct.unpack_from(order + "I", data, 28)
+        phentsize, phnum = struct.unpack_from(order + "HH", data, 42)
+        header = order + "IIIIIIII"
+        fields = lambda h: (h[0], h[1], h[3], h[4])  # type, offset, paddr, filesz
+    elif data[4] == 2:
+        phoff, = struct.unpack_from(order + "Q", data, 32)
+        phentsize, phnum = struct.unpack_from(order + "HH", data, 54)
+        header = order + "IIQQQQQQ"
+        fields = lambda h: (h[0], h[2], h[4], h[5])
+    else:
+        raise ValueError("unknown ELF class")
+
+    segments = []
+    flash_end = flash_base + flash_size
+    for index in range(phnum):
+        p_type, p_offset, p_paddr, p_filesz = fields(
+            struct.unpack_from(header, data, phoff + index * phentsize))
+        if p_type != 1 or not p_filesz:
+            continue
+        if not flash_base <= p_paddr < flash_end:
+            continue
+        if p_paddr + p_filesz > flash_end:
+            raise ValueError(f"ELF segment at 0x{p_paddr:08x} runs past the end of flash")
+        segments.append((p_paddr, bytes(data[p_offset:p_offset + p_filesz])))
+    return segments
+
+
+def load_segments(path):
+    """Segments of an image file, by extension"""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, "rb") as f:
+        data = f.read()
+    if extension in (".hex", ".ihex"):
+        return parse_intel_hex(data.decode("ascii", errors="replace"))
+    if extension == ".txt":
+        return parse_ti_txt(data.decode("ascii", errors="replace"))
+    if extension in (".out", ".elf", ".axf") or data[:4] == b"\x7fELF":
+        return parse_elf(data)
+    return [(FLASH_BASE, data)]
+
+
+def flatten(segments, base=FLASH_BASE, size=FLASH_SIZE, fill=FILL_BYTE):
+    """Merge segments into one flat image from base; overlaps must agree"""
+    if not segments:
+        raise ValueError("image contains no data")
+    end = max(address + len(data) for address, data in segments)
+    if min(address for address, _ in segments) < base or end > base + size:
+        raise ValueError(f"image data outside flash 0x{base:08x}-0x{base + size:08x}")
+
+    image = bytearray([fill]) * (end - base)
+    written = bytearray(end - base)
+    for address, data in segments:
+        start = address - base
+        stop = start + len(data)
+        if any(written[start:stop]):
+            view = memoryview(image)[start:stop]
+            for offset, (old, new, used) in enumerate(zip(view, data, written[start:stop])):
+                if used and old != new:
+                    raise ValueError(f"images overlap with different data at "
+                                     f"0x{address + offset:08x}")
+        image[start:stop] = data
+        written[start:stop] = b"\x01" * len(data)
+    return bytes(image)
+
+
+class StagedImage:
+    """A ready-to-program flat binary in the staging cache"""
+
+    def __init__(self, path, name, size, sha256, crc32, base=FLASH_BASE, converted=False):
+        self.path = path
+        self.name = name
+        self.size = size
+        self.sha256 = sha256
+        self.crc32 = crc32
+        self.base = base
+        self.converted = converted
+
+    def read(self):
+        """Staged image bytes"""
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def digest(self):
+        """Same fields as image_check.image_digest, for the staged binary"""
+        return {"name": self.name, "size": self.size, "sha256": self.sha256, "crc32": self.crc32}
+
+    def flash_arg(self):
+        """DSLite file argument: "path,0xaddress\""""
+        return f"{self.path},0x{self.base:x}"
+
+
+class ImageCache:
+    """Content-addressed store of staged images with LRU eviction"""
+
+    def __init__(self, folder=DEFAULT_STAGE_DIR, max_bytes=DEFAULT_CACHE_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(folder, "index.json")
+        self._lock = threading.Lock()
+        self._memo = {}
+        self._index = {"sources": {}, "images": {}}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    def stage(self, flash_folder):
+        """StagedImage for a package, converting and merging only on a cache miss"""
+        sources = package_images(flash_folder)
+        if not sources:
+            raise FileNotFoundError(f"No firmware image in {flash_folder}")
+        stats = []
+        for path in sources:
+            st = os.stat(path)
+            stats.append((os.path.abspath(path), st.st_size, st.st_mtime_ns))
+        memo_key = tuple(stats)
+
+        with self._lock:
+            staged = self._memo.get(memo_key)
+            if staged and os.path.exists(staged.path):
+                self._touch(staged.sha256)
+                return staged
+
+        # Key on source contents, so renamed or re-exported copies share an entry
+        hasher = hashlib.sha256()
+        for path in sources:
+            with open(path, "rb") as f:
+                content = f.read()
+            hasher.update(os.path.basename(path).lower().encode() + b"\0")
+            hasher.update(hashlib.sha256(content).digest())
+        source_key = hasher.hexdigest()
+        name = " + ".join(os.path.basename(path) for path in sources)
+        converted = len(sources) > 1 or not sources[0].lower().endswith(".bin")
+
+        with self._lock:
+            sha256 = self._index["sources"].get(source_key)
+            entry = self._index["images"].get(sha256) if sha256 else None
+            if entry and os.path.exists(self._path(sha256)):
+                staged = self._staged(sha256, entry, name, converted)
+                self._memo[memo_key] = staged
+                self._touch(sha256)
+                self._save()
+                return staged
+
+        segments = []
+        for path in sources:
+            segments.extend(load_segments(path))
+        data = flatten(segments)
+        sha256 = hashlib.sha256(data).hexdigest()
+        entry = {"size": len(data), "crc32": zlib.crc32(data), "base": FLASH_BASE,
+                 "last_used": time.time()}
+
+        with self._lock:
+            os.makedirs(self.folder, exist_ok=True)
+            path = self._path(sha256)
+            if not os.path.exists(path):
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            self._index["sources"][source_key] = sha256
+            self._index["images"][sha256] = entry
+            self._evict(keep=sha256)
+            self._save()
+            staged = self._staged(sha256, entry, name, converted)
+            self._memo[memo_key] = staged
+            return staged
+
+    def _path(self, sha256):
+        return os.path.join(self.folder, sha256 + ".bin")
+
+    def _staged(self, sha256, entry, name, converted):
+        return StagedImage(self._path(sha256), name, entry["size"], sha256, entry["crc32"],
+                           entry.get("base", FLASH_BASE), converted)
+
+    def _touch(self, sha256):
+        entry = self._index["images"].get(sha256)
+        if entry:
+            entry["last_used"] = time.time()
+
+    def _evict(self, keep):
+        images = self._index["images"]
+        total = sum(entry["size"] for entry in images.values())
+        for sha256, entry in sorted(images.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if sha256 == keep:
+                continue
+            total -= entry["size"]
+            del images[sha256]
+            if os.path.exists(self._path(sha256)):
+                os.remove(self._path(sha256))
+        live = set(images)
+        self._index["sources"] = {key: value for key, value in self._index["sources"].items()
+                                  if value in live}
+        self._memo = {key: staged for key, staged in self._memo.items() if staged.sha256 in live}
+
+    def _save(self):
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def entries(self):
+        """Cached images, most recently used first"""
+        with self._lock:
+            return sorted(({"sha256": sha256, **entry}
+                           for sha256, entry in self._index["images"].items()),
+                          key=lambda entry: entry["last_used"], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage CC2650 firmware images")
+    parser.add_argument("--folder", help="stage this package's images into the cache")
+    parser.add_argument("--convert", nargs="+", metavar="IMAGE",
+                        help="merge and convert image files into --output")
+    parser.add_argument("--output", help="flat binary written by --convert")
+    parser.add_argument("--list", action="store_true", help="list the staging cache")
+    args = parser.parse_args()
+
+    if args.convert:
+        if not args.output:
+            parser.error("--convert needs --output")
+        segments = []
+        for path in args.convert:
+            segments.extend(load_segments(path))
+        data = flatten(segments)
+        with open(args.output, "wb") as f:
+            f.write(data)
+        print(f"{args.output}: {len(data)} bytes, CRC32 0x{zlib.crc32(data):08x}, "
+              f"SHA-256 {hashlib.sha256(data).hexdigest()}")
+    elif args.folder:
+        staged = ImageCache().stage(args.folder)
+        print(f"{staged.name}: {staged.size} bytes, CRC32 0x{staged.crc32:08x}, "
+              f"SHA-256 {staged.sha256}")
+        print(f"Staged at {staged.path}")
+    elif args.list:
+        for entry in ImageCache().entries():
+            print(f"{entry['sha256'][:16]}  {entry['size']:8} bytes  "
+                  f"CRC32 0x{entry['crc32']:08x}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
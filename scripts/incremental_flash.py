@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+CC2650 Incremental Flash Planner
+Diffs a new image against the last image flashed to a device, sector by sector
+
+Features:
+- 4 KB sector diff over the CC2650F128's 128 KB flash
+- Program/erase plan touching only changed sectors, merged into ranges
+- Per-unit archive of the last image flashed, keyed by unit serial
+- The archived image is only used as the base after a device readback confirms
+  it is still on the device; anything else is a full erase and flash
+- Sector chunk files + DSLite arguments for "necessary pages only" erase
+- Benchmark against FakeBackend: python incremental_flash.py --bench
+"""
+
+import argparse
+import os
+import threading
+import zlib
+
+from flash_backend import FLASH_BASE, DSLiteBackend, FakeBackend
+from uniflash_package import find_image
+
+SECTOR_SIZE = 4 * 1024
+FLASH_SIZE = 128 * 1024
+ERASED_BYTE = b"\xff"
+ERASE_SETTING = "FlashEraseSetting=Necessary Pages Only"
+DEFAULT_LAST_IMAGE_DIR = os.path.join(os.path.expanduser("~"), ".cc2650_jig", "last_images")
+
+
+def pad_to_sectors(data, sector_size=SECTOR_SIZE):
+    """Pad an image with erased bytes up to a whole number of sectors"""
+    remainder = len(data) % sector_size
+    if remainder:
+        data = data + ERASED_BYTE * (sector_size - remainder)
+    return data
+
+
+def changed_sectors(old, new, sector_size=SECTOR_SIZE):
+    """Indexes of sectors whose contents differ between two images"""
+    length = max(len(old), len(new))
+    old = memoryview(pad_to_sectors(old.ljust(length, ERASED_BYTE), sector_size))
+    new = memoryview(pad_to_sectors(new.ljust(length, ERASED_BYTE), sector_size))
+    return [index for index, offset in enumerate(range(0, len(new), sector_size))
+            if old[offset:offset + sector_size] != new[offset:offset + sector_size]]
+
+
+class FlashPlan:
+    """Sectors to erase and program for one incremental update"""
+
+    def __init__(self, image, sectors, sector_size=SECTOR_SIZE, base=FLASH_BASE):
+        self.image = image
+        self.sectors = sectors
+        self.sector_size = sector_size
+        self.base = base
+        self.ranges = self._merge(sectors)
+
+    def _merge(self, sectors):
+        ranges = []
+        for index in sectors:
+            start = index * self.sector_size
+            if ranges and ranges[-1][0] + ranges[-1][1] == start:
+                ranges[-1][1] += self.sector_size
+            else:
+                ranges.append([start, self.sector_size])
+        return [(start, length) for start, length in ranges]
+
+    @property
+    def total_bytes(self):
+        """Bytes erased and programmed by the plan"""
+        return len(self.sectors) * self.sector_size
+
+    def describe(self):
+        """One-line summary for logs"""
+        if not self.sectors:
+            return "no sectors changed"
+        spans = ", ".join(f"0x{self.base + start:05x}-0x{self.base + start + length - 1:05x}"
+                          for start, length in self.ranges)
+        return f"{len(self.sectors)} sector(s) changed: {spans}"
+
+    def chunks(self):
+        """(address, bytes) for every range in the plan"""
+        end = (self.sectors[-1] + 1) * self.sector_size if self.sectors else 0
+        image = self.image.ljust(max(len(self.image), end), ERASED_BYTE)
+        return [(self.base + start, image[start:start + length]) for start, length in self.ranges]
+
+    def write_chunks(self, workdir):
+        """Write each range to a .bin in workdir; returns DSLite file,address arguments"""
+        os.makedirs(workdir, exist_ok=True)
+        args = []
+        for address, data in self.chunks():
+            path = os.path.join(workdir, f"chunk_0x{address:05x}.bin")
+            with open(path, "wb") as f:
+                f.write(data)
+            args.append(f"{path},0x{address:x}")
+        return args
+
+
+class LastImages:
+    """Archive of the last image flashed to each unit, by unit serial"""
+
+    def __init__(self, folder=DEFAULT_LAST_IMAGE_DIR):
+        self.folder = folder
+
+    def _path(self, unit_serial):
+        return os.path.join(self.folder, f"{unit_serial}.bin")
+
+    def load(self, unit_serial):
+        """Last image bytes for a unit serial, or None"""
+        if not unit_serial:
+            return None
+        path = self._path(unit_serial)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def save(self, unit_serial, data):
+        """Remember the image now on a unit"""
+        if not unit_serial:
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = f"{self._path(unit_serial)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(unit_serial))
+
+    def forget(self, unit_serial):
+        """Drop the record after a failed flash left the device contents unknown"""
+        if not unit_serial:
+            return
+        path = self._path(unit_serial)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def read_package_image(flash_folder, image_cache=None):
+    """Flat bytes of the package image, or None if it is not a flat .bin
+
+    With an ImageCache any supported format is staged to a flat binary first.
+    """
+    if image_cache is not None:
+        return image_cache.stage(flash_folder).read()
+    image = find_image(flash_folder)
+    if not image or not image.lower().endswith(".bin"):
+        return None
+    with open(image, "rb") as f:
+        return f.read()
+
+
+def plan_incremental(flash_folder, unit_serial, last_images, backend, serial=None,
+                     image_cache=None, new=None, base=FLASH_BASE):
+    """Plan an incremental update; returns (plan, reason), plan None means full flash
+
+    The base is the image archived for unit_serial, and only once the device
+    read back through backend on probe serial still holds it. new overrides the
+    package image, e.g. with a provisioned unit image.
+    """
+    if new is None:
+        new = read_package_image(flash_folder, image_cache)
+    if new is None:
+        return None, "image is not a flat .bin, full flash required"
+    if not unit_serial:
+        return None, "no unit serial to find the previous image, full flash required"
+    old = last_images.load(unit_serial)
+    if old is None:
+        return None, f"no previous image recorded for unit {unit_serial}, full flash required"
+    if backend is None:
+        return None, "no readback to confirm the previous image, full flash required"
+
+    # The diff treats everything past the old image as erased, so confirm that too
+    length = -(-max(len(old), len(new)) // SECTOR_SIZE) * SECTOR_SIZE
+    device = backend.readback(serial, base, length)
+    if device is None:
+        return None, "device readback unavailable, full flash required"
+    expected = old.ljust(length, ERASED_BYTE)
+    if device != expected:
+        return None, (f"device CRC32 0x{zlib.crc32(device):08x} does not match the image "
+                      f"recorded for unit {unit_serial} (0x{zlib.crc32(expected):08x}), "
+                      f"full flash required")
+    plan = FlashPlan(new, changed_sectors(old, new), base=base)
+    return plan, plan.describe()
+
+
+class _MemoryArchive(dict):
+    """LastImages stand-in for the benchmark, without files"""
+
+    def load(self, unit_serial):
+        return self.get(unit_serial)
+
+
+def benchmark(changed=2, runs=20):
+    """Compare simulated full and incremental flash times on FakeBackend"""
+    base = bytes((i * 7) & 0xFF for i in range(FLASH_SIZE))
+    backend = FakeBackend()
+    archive = _MemoryArchive({"unit": base})
+
+    full_seconds = 0.0
+    incremental_seconds = 0.0
+    for run in range(runs):
+        image = bytearray(base)
+        for n in range(changed):
+            sector = (run + n * 5) % (FLASH_SIZE // SECTOR_SIZE)
+            image[sector * SECTOR_SIZE] ^= 0xFF
+        image = bytes(image)
+
+        backend.erase("full")
+        backend.flash("full", base)
+        full_seconds += backend.flash("full", image)
+
+        backend.erase("incremental")
+        backend.flash("incremental", base)
+        # The planner's confirming readback is a connect and transfer of its own
+        readbacks = backend.readbacks
+        plan, _ = plan_incremental(None, "unit", archive, backend, "incremental", new=image)
+        incremental_seconds += ((backend.readbacks - readbacks)
+                                * backend.readback_seconds(len(base)))
+        incremental_seconds += backend.flash("incremental", image, plan.chunks())
+
+        assert backend.readback("incremental", FLASH_BASE, len(image)) == image
+
+    return {
+        "runs": runs,
+        "changed_sectors": changed,
+        "full_avg_s": full_seconds / runs,
+        "incremental_avg_s": incremental_seconds / runs,
+        "saved_pct": 100.0 * (1 - incremental_seconds / full_seconds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CC2650 incremental flash planner")
+    parser.add_argument("--bench", action="store_true",
+                        help="compare full and incremental flash on the fake backend")
+    parser.add_argument("--changed", type=int, default=2,
+                        help="sectors changed per run in the benchmark")
+    parser.add_argument("--folder", help="package folder to plan against")
+    parser.add_argument("--serial", help="probe serial the device is read through")
+    parser.add_argument("--unit", help="unit serial of the previous image")
+    args = parser.parse_args()
+
+    if args.bench:
+        result = benchmark(changed=args.changed)
+        print(f"Full flash:        {result['full_avg_s']:.2f} s/unit")
+        print(f"Incremental flash: {result['incremental_avg_s']:.2f} s/unit "
+              f"({result['changed_sectors']} sector(s) changed)")
+        print(f"Time saved:        {result['saved_pct']:.1f}%")
+    elif args.folder:
+        plan, reason = plan_incremental(args.folder, args.unit, LastImages(),
+                                        DSLiteBackend(args.folder), args.serial)
+        print(reason)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,665 @@
+#!/usr/bin/env python3
+"""
+CC2650 Line Coordinator
+Hands flash jobs and unique unit serials to the jig stations on one line
+
+One coordinator process owns the line's job queue in a local SQLite database
+and serves it over a small JSON-lines TCP service. Stations (flasher.py
+--station) pull jobs for their idle probes, keep them alive with heartbeats
+and report each result back. A station that stops heartbeating loses its
+leases and its jobs go back to the queue for another station.
+
+Features:
+- Job queue: submit N jobs for a package folder or a product/version from each
+  station's package library, with lot and flash options
+- Unit serials: <prefix><counter> allocated per lease from a persistent counter,
+  so no serial is ever handed out twice; the serial of a lost or failed lease
+  is voided instead of reused
+- Leases: every handed-out job carries a lease token and an expiry; heartbeats
+  extend it, expired leases are re-queued, and a job lost by MAX_LEASES
+  stations is failed instead of taking down more stations
+- Late results from a station whose lease already expired are rejected
+- Station runner: leases one job per idle probe into a FlashWorker and reports
+  the worker's result events back
+
+Protocol (one JSON object per line, one reply per request):
+    {"cmd": "submit", "folder" | "product"/"version", "count", "lot", "options"}
+    {"cmd": "lease", "station", "limit"}          -> {"jobs": [...]}
+    {"cmd": "heartbeat", "station", "tokens"}     -> {"held": [...], "lost": [...]}
+    {"cmd": "complete", "token", "result"}        -> {"accepted": bool}
+    {"cmd": "release", "station"}                 -> {"requeued": n}
+    {"cmd": "status"}
+
+Usage:
+    python line_coordinator.py serve --host 0.0.0.0 --serial-prefix CC2650-
+    python line_coordinator.py submit --product sensor-tag --count 200 --lot LOT42
+    python flasher.py --station jig-master:9652 --serial L4100001 --serial L4100002
+    python line_coordinator.py status
+"""
+
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from flash_history import JIG_DIR
+
+DEFAULT_COORDINATOR_PORT = 9652
+DEFAULT_QUEUE_PATH = os.path.join(JIG_DIR, "line_queue.db")
+DEFAULT_LEASE_SECONDS = 60.0
+DEFAULT_SERIAL_PREFIX = "CC"
+SERIAL_DIGITS = 6
+MAX_LEASES = 3
+REAP_SECONDS = 1.0
+STATION_POLL_SECONDS = 1.0
+CONNECT_RETRY_SECONDS = 2.0
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Serial states
+SERIAL_LEASED = "leased"
+SERIAL_USED = "used"
+SERIAL_VOID = "void"
+
+# Worker result statuses that finish a job, and the one that gives it back
+_DONE_STATUSES = ("passed", "skipped")
+_REQUEUE_STATUSES = ("stopped",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    folder TEXT,
+    product TEXT,
+    version TEXT,
+    lot TEXT,
+    options TEXT,
+    unit_serial TEXT,
+    serial_fixed INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL,
+    station TEXT,
+    lease_token TEXT,
+    lease_expires REAL,
+    leases INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state, created_at);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_token ON jobs (lease_token);
+CREATE TABLE IF NOT EXISTS serials (
+    serial TEXT PRIMARY KEY,
+    job_id TEXT,
+    station TEXT,
+    state TEXT NOT NULL,
+    allocated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS serial_counters (
+    prefix TEXT PRIMARY KEY,
+    next INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stations (
+    name TEXT PRIMARY KEY,
+    last_seen REAL NOT NULL
+);
+"""
+
+
+class CoordinatorError(Exception):
+    """The coordinator rejected a request or cannot be reached"""
+
+
+class JobQueue:
+    """Line job queue, serial allocator and lease table in one SQLite database"""
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH, serial_prefix=DEFAULT_SERIAL_PREFIX,
+                 lease_seconds=DEFAULT_LEASE_SECONDS, max_leases=MAX_LEASES):
+        self.path = path
+        self.serial_prefix = serial_prefix
+        self.lease_seconds = lease_seconds
+        self.max_leases = max_leases
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so two coordinators on one
+        # database file can never hand out the same job or serial
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def submit(self, folder=None, product=None, version=None, lot=None, count=1,
+               options=None, unit_serial=None):
+        """Queue count jobs; returns their ids"""
+        if not folder and not product:
+            raise ValueError("A job needs a package folder or a product")
+        if unit_serial and count != 1:
+            raise ValueError("A fixed unit serial can only be given to one job")
+        now = time.time()
+        ids = [uuid.uuid4().hex[:12] for _ in range(count)]
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO jobs (id, folder, product, version, lot, options, unit_serial, "
+                "serial_fixed, state, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(job_id, folder, product, version, lot, json.dumps(options or {}),
+                  unit_serial, bool(unit_serial), JOB_QUEUED, now + i * 1e-6)
+                 for i, job_id in enumerate(ids)])
+        return ids
+
+    def _allocate_serial(self, conn, job_id, station, now):
+        row = conn.execute("SELECT next FROM serial_counters WHERE prefix = ?",
+                           (self.serial_prefix,)).fetchone()
+        number = row["next"] if row else 1
+        conn.execute("INSERT OR REPLACE INTO serial_counters (prefix, next) VALUES (?, ?)",
+                     (self.serial_prefix, number + 1))
+        serial = f"{self.serial_prefix}{number:0{SERIAL_DIGITS}d}"
+        conn.execute("INSERT INTO serials (serial, job_id, station, state, allocated_at) "
+                     "VALUES (?, ?, ?, ?, ?)", (serial, job_id, station, SERIAL_LEASED, now))
+        return serial
+
+    def _end_lease(self, conn, row, state, result=None, serial_state=SERIAL_VOID, now=None):
+        if row["unit_serial"] and not row["serial_fixed"]:
+            conn.execute("UPDATE serials SET state = ? WHERE serial = ?",
+                         (serial_state, row["unit_serial"]))
+        # A re-queued job gets a fresh serial on its next lease
+        conn.execute(
+            "UPDATE jobs SET state = ?, station = CASE WHEN ? THEN station ELSE NULL END, "
+            "lease_token = NULL, lease_expires = NULL, "
+            "unit_serial = CASE WHEN ? THEN unit_serial ELSE NULL END, result = ?, "
+            "finished_at = ? WHERE id = ?",
+            (state, state != JOB_QUEUED, state != JOB_QUEUED or row["serial_fixed"],
+             json.dumps(result) if result is not None else None,
+             now if state != JOB_QUEUED else None, row["id"]))
+
+    _LEASED_ROWS = "SELECT id, unit_serial, serial_fixed, leases FROM jobs WHERE state = 'leased'"
+
+    def requeue_expired(self, now=None):
+        """Give the jobs of lapsed leases back to the queue; returns the job ids"""
+        now = now or time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(self._LEASED_ROWS + " AND lease_expires < ?", (now,)).fetchall()
+            for row in rows:
+                self._lapse(conn, row, "lease expired", now)
+        return [row["id"] for row in rows]
+
+    def _lapse(self, conn, row, reason, now):
+        if row["leases"] >= self.max_leases:
+            self._end_lease(conn, row, JOB_FAILED,
+                            {"status": "failed",
+                             "error": f"{reason} on {row['leases']} station(s)"}, now=now)
+        else:
+            self._end_lease(conn, row, JOB_QUEUED, now=now)
+
+    def lease(self, station, limit=1):
+        """Hand up to limit queued jobs to a station; returns job dicts with a lease token"""
+        now = time.time()
+        jobs = []
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO stations (name, last_seen) VALUES (?, ?)",
+                         (station, now))
+            rows = conn.execute("SELECT * FROM jobs WHERE state = ? ORDER BY created_at LIMIT ?",
+                                (JOB_QUEUED, limit)).fetchall()
+            for row in rows:
+                serial = row["unit_serial"] or self._allocate_serial(conn, row["id"], station, now)
+                token = uuid.uuid4().hex
+                expires = now + self.lease_seconds
+                conn.execute(
+                    "UPDATE jobs SET state = ?, station = ?, lease_token = ?, lease_expires = ?, "
+                    "unit_serial = ?, leases = leases + 1 WHERE id = ?",
+                    (JOB_LEASED, station, token, expires, serial, row["id"]))
+                jobs.append({
+                    "id": row["id"],
+                    "token": token,
+                    "folder": row["folder"],
+                    "product": row["product"],
+                    "version": row["version"],
+                    "lot": row["lot"],
+                    "unit_serial": serial,
+                    "options": json.loads(row["options"] or "{}"),
+                    "lease_seconds": self.lease_seconds,
+                })
+        return jobs
+
+    def heartbeat(self, station, tokens):
+        """Extend a station's leases; returns (held tokens, lost tokens)"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO stations (name, last_seen) VALUES (?, ?)",
+                         (station, now))
+            held = []
+            for token in tokens:
+                cursor = conn.execute(
+                    "UPDATE jobs SET lease_expires = ? WHERE lease_token = ? AND state = ?",
+                    (now + self.lease_seconds, token, JOB_LEASED))
+                if cursor.rowcount:
+                    held.append(token)
+        return held, [token for token in tokens if token not in held]
+
+    def complete(self, token, result):
+        """Record a station's result; False if the lease is no longer held"""
+        now = time.time()
+        status = result.get("status")
+        with self._transaction() as conn:
+            row = conn.execute(self._LEASED_ROWS + " AND lease_token = ?", (token,)).fetchone()
+            if row is None:
+                return False
+            if status in _DONE_STATUSES:
+                self._end_lease(conn, row, JOB_DONE, result, SERIAL_USED, now)
+            elif status in _REQUEUE_STATUSES:
+                self._lapse(conn, row, "stopped", now)
+            else:
+                # The unit may hold part of the image; never hand its serial out again
+                self._end_lease(conn, row, JOB_FAILED, result, SERIAL_VOID, now)
+        return True
+
+    def release(self, station):
+        """Re-queue every job a station holds, e.g. when it shuts down cleanly"""
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(self._LEASED_ROWS + " AND station = ?", (station,)).fetchall()
+            for row in rows:
+                self._end_lease(conn, row, JOB_QUEUED, now=now)
+        return len(rows)
+
+    def status(self):
+        """Job counts per state, stations and their leases, and the next serial"""
+        with self._lock:
+            counts = {row["state"]: row["n"] for row in self._conn.execute(
+                "SELECT state, COUNT(*) AS n FROM jobs GROUP BY state")}
+            leased = {row["station"]: row["n"] for row in self._conn.execute(
+                "SELECT station, COUNT(*) AS n FROM jobs WHERE state = ? GROUP BY station",
+                (JOB_LEASED,))}
+            stations = {row["name"]: {"last_seen_s": round(time.time() - row["last_seen"], 1),
+                                      "leased": leased.get(row["name"], 0)}
+                        for row in self._conn.execute("SELECT * FROM stations")}
+            row = self._conn.execute("SELECT next FROM serial_counters WHERE prefix = ?",
+                                     (self.serial_prefix,)).fetchone()
+        return {
+            "jobs": {state: counts.get(state, 0)
+                     for state in (JOB_QUEUED, JOB_LEASED, JOB_DONE, JOB_FAILED)},
+            "stations": stations,
+            "next_serial": f"{self.serial_prefix}{(row['next'] if row else 1):0{SERIAL_DIGITS}d}",
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _CoordinatorConnection(socketserver.StreamRequestHandler):
+    """One station or operator connection: JSON requests in, one JSON reply each"""
+
+    def handle(self):
+        jobs = self.server.jobs
+        for raw in self.rfile:
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                request = json.loads(raw)
+                reply = self._dispatch(jobs, request)
+            except Exception as e:
+                reply = {"error": str(e)}
+            try:
+                self.wfile.write((json.dumps(reply) + "\n").encode())
+                self.wfile.flush()
+            except OSError:
+                return
+
+    def _dispatch(self, jobs, request):
+        cmd = request.get("cmd")
+        if cmd == "submit":
+            return {"ids": jobs.submit(request.get("folder"), request.get("product"),
+                                       request.get("version"), request.get("lot"),
+                                       int(request.get("count", 1)), request.get("options"),
+                                       request.get("unit_serial"))}
+        if cmd == "lease":
+            return {"jobs": jobs.lease(request["station"], int(request.get("limit", 1)))}
+        if cmd == "heartbeat":
+            held, lost = jobs.heartbeat(request["station"], request.get("tokens", []))
+            return {"held": held, "lost": lost}
+        if cmd == "complete":
+            return {"accepted": jobs.complete(request["token"], request.get("result") or {})}
+        if cmd == "release":
+            return {"requeued": jobs.release(request["station"])}
+        if cmd == "status":
+            return jobs.status()
+        raise ValueError(f"Unknown command: {cmd}")
+
+
+class CoordinatorServer(socketserver.ThreadingTCPServer):
+    """TCP front-end for a JobQueue"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, jobs, port=DEFAULT_COORDINATOR_PORT, host="127.0.0.1"):
+        self.jobs = jobs
+        super().__init__((host, port), _CoordinatorConnection)
+
+
+class CoordinatorClient:
+    """Blocking JSON-lines client for the coordinator; one request at a time"""
+
+    def __init__(self, address, timeout=30.0):
+        self.address = parse_address(address)
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+
+    def request(self, cmd, **fields):
+        """Send one request; returns the reply or raises CoordinatorError"""
+        fields["cmd"] = cmd
+        try:
+            if self._sock is None:
+                self._sock = socket.create_connection(self.address, timeout=self.timeout)
+                self._file = self._sock.makefile("rwb")
+            self._file.write((json.dumps(fields) + "\n").encode())
+            self._file.flush()
+            line = self._file.readline()
+            if not line:
+                raise OSError("connection closed by the coordinator")
+        except OSError as e:
+            self.close()
+            raise CoordinatorError(f"coordinator {self.address[0]}:{self.address[1]}: {e}")
+        reply = json.loads(line)
+        if "error" in reply:
+            raise CoordinatorError(reply["error"])
+        return reply
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._file.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._file = None
+
+
+def parse_address(address):
+    """(host, port) from "host:port", "host" or a port number"""
+    if isinstance(address, tuple):
+        return address
+    host, _, port = str(address).rpartition(":")
+    if not host:
+        host, port = (port, DEFAULT_COORDINATOR_PORT) if not port.isdigit() else ("127.0.0.1", port)
+    return host, int(port)
+
+
+class LineStation:
+    """Leases coordinator jobs for idle probes and runs them on a FlashWorker"""
+
+    def __init__(self, client, worker, probes=None, name=None, library=None, on_event=None):
+        from flash_worker import DEFAULT_PROBE
+
+        self.client = client
+        self.worker = worker
+        # Each probe runs one job at a time; None lets DSLite pick the only probe
+        self.probes = {probe or DEFAULT_PROBE: probe for probe in (probes or [None])}
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.library = library
+        self.on_event = on_event
+        self._index = None
+        self._active = {}
+        self._results = queue.Queue()
+        self._heartbeat_due = 0.0
+        self.completed = 0
+        self.rejected = 0
+
+    def run(self, stop):
+        """Pull and run jobs until the stop event is set"""
+        while not stop.is_set():
+            try:
+                self._report_results()
+                self._heartbeat()
+                leased = self._lease()
+            except CoordinatorError as e:
+                self._emit({"event": "coordinator_error", "error": str(e)})
+                stop.wait(CONNECT_RETRY_SECONDS)
+                continue
+            if not leased:
+                try:
+                    self._report_results(timeout=STATION_POLL_SECONDS)
+                except CoordinatorError:
+                    pass
+        try:
+            self._report_results()
+            self.client.request("release", station=self.name)
+        except CoordinatorError:
+            pass
+
+    def _emit(self, event):
+        if self.on_event:
+            self.on_event(event)
+
+    def _resolve(self, job):
+        if job.get("folder"):
+            return job["folder"]
+        if self._index is None:
+            from package_index import DEFAULT_LIBRARY_ROOT, PackageIndex
+
+            self._index = PackageIndex(self.library or DEFAULT_LIBRARY_ROOT)
+            self._index.refresh()
+        package = self._index.find(job["product"], job.get("version"))
+        if not package:
+            raise ValueError(f"No package for {job['product']} {job.get('version') or ''}")
+        return package["path"]
+
+    def _lease(self):
+        idle = [key for key in self.probes if key not in self._active]
+        if not idle:
+            return 0
+        jobs = self.client.request("lease", station=self.name, limit=len(idle))["jobs"]
+        for key, job in zip(idle, jobs):
+            self._start(key, job)
+        return len(jobs)
+
+    def _start(self, key, job):
+        self._active[key] = job
+        token = job["token"]
+        request = {"id": job["id"], "serial": self.probes[key], "unit_serial": job["unit_serial"],
+                   "lot": job.get("lot")}
+        request.update({option: job["options"][option]
+                        for option in ("skip_identical", "incremental", "verify", "provision")
+                        if option in job["options"]})
+
+        def on_event(event):
+            if event.get("event") == "result":
+                self._results.put((key, token, event))
+
+        try:
+            request["folder"] = self._resolve(job)
+            self.worker.submit(request, listener=on_event)
+        except Exception as e:
+            self._results.put((key, token, {"event": "result", "job": job["id"],
+                                            "status": "failed", "error": str(e)}))
+
+    def _report_results(self, timeout=None):
+        while True:
+            try:
+                if timeout:
+                    key, token, result = self._results.get(timeout=timeout)
+                else:
+                    key, token, result = self._results.get_nowait()
+            except queue.Empty:
+                return
+            timeout = None
+            try:
+                accepted = self.client.request("complete", token=token, result=result)["accepted"]
+            except CoordinatorError:
+                # Keep the result until the coordinator is back
+                self._results.put((key, token, result))
+                raise
+            if self._active.get(key, {}).get("token") == token:
+                del self._active[key]
+            if accepted:
+                self.completed += 1
+            else:
+                self.rejected += 1
+                self._emit({"event": "result_rejected", "job": result.get("job"),
+                            "unit_serial": result.get("unit_serial")})
+
+    def _heartbeat(self):
+        now = time.monotonic()
+        if not self._active or now < self._heartbeat_due:
+            return
+        lease_seconds = min(job["lease_seconds"] for job in self._active.values())
+        tokens = [job["token"] for job in self._active.values()]
+        lost = self.client.request("heartbeat", station=self.name, tokens=tokens)["lost"]
+        self._heartbeat_due = now + lease_seconds / 3
+        for key, job in list(self._active.items()):
+            if job["token"] in lost:
+                # Another station owns the job now; free the probe
+                self._emit({"event": "lease_lost", "job": job["id"],
+                            "unit_serial": job["unit_serial"]})
+                self.worker.scheduler.stop(key)
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def run_station(address, probes=None, max_parallel=4, name=None, library=None,
+                progress_output=False, metrics=None, sessions=False):
+    """Run a station fed by the coordinator until interrupted, printing events as JSON lines"""
+    from flash_worker import FlashWorker
+
+    signal.signal(signal.SIGTERM, _interrupt)
+    worker = FlashWorker(max_parallel=max_parallel, progress_output=progress_output,
+                         metrics=metrics, sessions=sessions)
+    print_lock = threading.Lock()
+
+    def print_event(event):
+        with print_lock:
+            sys.stdout.write(json.dumps(event) + "\n")
+            sys.stdout.flush()
+
+    worker.add_listener(print_event)
+    station = LineStation(CoordinatorClient(address), worker, probes, name, library, print_event)
+    stop = threading.Event()
+    thread = threading.Thread(target=station.run, args=(stop,), name="line-station", daemon=True)
+    print_event({"event": "station_started", "station": station.name,
+                 "coordinator": "%s:%d" % station.client.address,
+                 "probes": sorted(station.probes)})
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        worker.shutdown()
+        thread.join()
+        station.client.close()
+        print_event({"event": "station_stopped", "completed": station.completed,
+                     "rejected": station.rejected})
+
+
+def run_coordinator(jobs, port=DEFAULT_COORDINATOR_PORT, host="127.0.0.1"):
+    """Serve the queue until interrupted, re-queueing lapsed leases"""
+    signal.signal(signal.SIGTERM, _interrupt)
+    server = CoordinatorServer(jobs, port, host)
+    threading.Thread(target=server.serve_forever, name="coordinator-server", daemon=True).start()
+    print(json.dumps({"event": "coordinator_started", "host": host,
+                      "port": server.server_address[1], "queue": jobs.path}), flush=True)
+    try:
+        while True:
+            time.sleep(REAP_SECONDS)
+            requeued = jobs.requeue_expired()
+            if requeued:
+                print(json.dumps({"event": "requeued", "jobs": requeued}), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        jobs.close()
+        print(json.dumps({"event": "coordinator_stopped"}), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CC2650 line job coordinator")
+    parser.add_argument("--coordinator", default=f"127.0.0.1:{DEFAULT_COORDINATOR_PORT}",
+                        help="submit/status: coordinator address HOST:PORT")
+    commands = parser.add_subparsers(dest="command")
+
+    serve = commands.add_parser("serve", help="run the coordinator")
+    serve.add_argument("--host", default="127.0.0.1",
+                       help="address to listen on (0.0.0.0 for the whole LAN)")
+    serve.add_argument("--port", type=int, default=DEFAULT_COORDINATOR_PORT)
+    serve.add_argument("--db", default=DEFAULT_QUEUE_PATH, help="queue database path")
+    serve.add_argument("--serial-prefix", default=DEFAULT_SERIAL_PREFIX,
+                       help="prefix of allocated unit serials")
+    serve.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS,
+                       help="seconds a station keeps a job without a heartbeat")
+
+    submit = commands.add_parser("submit", help="queue flash jobs")
+    target = submit.add_mutually_exclusive_group(required=True)
+    target.add_argument("--folder", help="UniFlash package folder, as seen by the stations")
+    target.add_argument("--product", help="product from each station's package library")
+    submit.add_argument("--version", help="package version for --product (default: newest)")
+    submit.add_argument("--count", type=int, default=1, help="number of units")
+    submit.add_argument("--lot", help="production lot")
+    submit.add_argument("--unit-serial", help="reflash a known unit under its existing serial")
+    submit.add_argument("--skip-identical", action="store_true")
+    submit.add_argument("--incremental", action="store_true")
+    submit.add_argument("--verify-readback", action="store_true")
+
+    commands.add_parser("status", help="print queue and station status")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        jobs = JobQueue(args.db, args.serial_prefix, args.lease)
+        run_coordinator(jobs, args.port, args.host)
+        return 0
+
+    client = CoordinatorClient(args.coordinator)
+    try:
+        if args.command == "submit":
+            options = {"skip_identical": args.skip_identical, "incremental": args.incremental,
+                       "verify": args.verify_readback}
+            reply = client.request("submit", folder=args.folder, product=args.product,
+                                   version=args.version, count=args.count, lot=args.lot,
+                                   options=options, unit_serial=args.unit_serial)
+            print(f"Queued {len(reply['ids'])} job(s)")
+        elif args.command == "status":
+            print(json.dumps(client.request("status"), indent=2))
+        else:
+            parser.print_help()
+            return 2
+    except CoordinatorError as e:
+        print(f"ERROR: {e}")
+        return 1
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
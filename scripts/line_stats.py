@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+CC2650 Line Statistics
+Live units/hour, first-pass yield and per-probe utilization over rolling windows
+
+Features:
+- LineStats.record(): constant work per finished job; each rolling window keeps
+  running totals over a ring of time buckets (10 s buckets for the last 5 minutes,
+  1 min buckets for the last hour), and a bucket's totals are subtracted once when
+  it ages out
+- Shift window: totals since new_shift(), never expiring
+- Per window: units, passed, failed, units/hour, first-pass yield (passed on the
+  first attempt / finished units); skipped and stopped jobs are not units
+- Per probe: jobs, mean cycle time, utilization (busy seconds / window length),
+  and a slow flag when the cycle time drifts above the median of all probes
+- snapshot() costs windows x probes, not jobs, so a dashboard can refresh it every
+  second however many thousands of jobs the shift has seen
+- Replays a shift from the flash history (python line_stats.py --hours 8)
+
+Usage:
+    python line_stats.py --hours 8
+    python line_stats.py --bench
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+# (name, seconds, buckets)
+WINDOWS = (
+    ("5 min", 300, 30),
+    ("1 hour", 3600, 60),
+)
+SHIFT = "shift"
+
+# A probe is slow when its cycle time exceeds the median by this fraction
+DRIFT_TOLERANCE = 0.15
+
+STATUS_PASSED = "passed"
+STATUS_FAILED = "failed"
+
+
+class _Totals:
+    """Counters of one bucket, window or shift"""
+
+    __slots__ = ("units", "passed", "first_pass", "probes")
+
+    def __init__(self):
+        self.units = 0
+        self.passed = 0
+        self.first_pass = 0
+        # probe -> [jobs, busy seconds]
+        self.probes = {}
+
+    def add(self, probe, passed, first_pass, seconds):
+        self.units += 1
+        self.passed += passed
+        self.first_pass += first_pass
+        entry = self.probes.get(probe)
+        if entry is None:
+            self.probes[probe] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    def subtract(self, other):
+        self.units -= other.units
+        self.passed -= other.passed
+        self.first_pass -= other.first_pass
+        for probe, (jobs, seconds) in other.probes.items():
+            entry = self.probes[probe]
+            entry[0] -= jobs
+            entry[1] -= seconds
+            if entry[0] <= 0:
+                del self.probes[probe]
+
+
+class _Window:
+    """Running totals over the last `seconds`, aged out one bucket at a time"""
+
+    def __init__(self, seconds, buckets):
+        self.seconds = seconds
+        self.width = seconds / buckets
+        self.ring = [None] * buckets
+        self.newest = None
+        self.totals = _Totals()
+
+    def advance(self, now):
+        number = int(now // self.width)
+        if self.newest is None or number <= self.newest:
+            if self.newest is None:
+                self.newest = number
+            return
+        # At most one pass over the ring, however long the line was idle
+        for expired in range(self.newest + 1, self.newest + 1 + min(number - self.newest,
+                                                                    len(self.ring))):
+            index = expired % len(self.ring)
+            bucket = self.ring[index]
+            if bucket is not None:
+                self.totals.subtract(bucket)
+                self.ring[index] = None
+        self.newest = number
+
+    def add(self, now, probe, passed, first_pass, seconds):
+        self.advance(now)
+        number = int(now // self.width)
+        if number <= self.newest - len(self.ring):
+            return
+        index = number % len(self.ring)
+        bucket = self.ring[index]
+        if bucket is None:
+            bucket = self.ring[index] = _Totals()
+        bucket.add(probe, passed, first_pass, seconds)
+        self.totals.add(probe, passed, first_pass, seconds)
+
+
+def _summary(totals, span, tolerance):
+    hours = span / 3600 if span > 0 else None
+    probes = {}
+    for probe, (jobs, busy) in totals.probes.items():
+        probes[probe] = {
+            "jobs": jobs,
+            "cycle_s": round(busy / jobs, 2),
+            "utilization": round(min(1.0, busy / span), 3) if span > 0 else None,
+            "slow": False,
+        }
+    median = statistics.median(entry["cycle_s"] for entry in probes.values()) if probes else None
+    if len(probes) > 1:
+        for entry in probes.values():
+            entry["slow"] = entry["cycle_s"] > median * (1 + tolerance)
+    return {
+        "units": totals.units,
+        "passed": totals.passed,
+        "failed": totals.units - totals.passed,
+        "units_per_hour": round(totals.passed / hours, 1) if hours else None,
+        "first_pass_yield": round(totals.first_pass / totals.units, 4) if totals.units else None,
+        "median_cycle_s": median,
+        "probes": probes,
+    }
+
+
+class LineStats:
+    """Throughput, yield and probe utilization of finished jobs, live"""
+
+    def __init__(self, windows=WINDOWS, tolerance=DRIFT_TOLERANCE, clock=time.time):
+        self.tolerance = tolerance
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._windows = {name: _Window(seconds, buckets) for name, seconds, buckets in windows}
+        self.started = clock()
+        self.new_shift()
+
+    def new_shift(self, started=None):
+        """Start a new shift; the rolling windows keep their history"""
+        with self._lock:
+            self.shift_started = started if started is not None else self.clock()
+            self.started = min(self.started, self.shift_started)
+            self._shift = _Totals()
+
+    def record(self, probe, status, seconds, attempts=1, at=None):
+        """Count one finished job; only passed and failed jobs are units"""
+        if status not in (STATUS_PASSED, STATUS_FAILED):
+            return
+        passed = status == STATUS_PASSED
+        first_pass = passed and (attempts or 1) <= 1
+        seconds = max(0.0, seconds or 0.0)
+        probe = probe or "default"
+        now = at if at is not None else self.clock()
+        with self._lock:
+            for window in self._windows.values():
+                window.add(now, probe, passed, first_pass, seconds)
+            if now >= self.shift_started:
+                self._shift.add(probe, passed, first_pass, seconds)
+
+    def record_job(self, job):
+        """Count a finished FlashJob"""
+        at = job.finished.timestamp() if job.finished else None
+        self.record(job.serial or str(job.slot), job.status, job.duration, job.attempts, at)
+
+    def snapshot(self, now=None):
+        """{window: summary} for every rolling window and the shift"""
+        now = now if now is not None else self.clock()
+        with self._lock:
+            result = {}
+            counted = max(0.0, now - self.started)
+            for name, window in self._windows.items():
+                window.advance(now)
+                # A window is only as long as the station has been counting
+                result[name] = _summary(window.totals, min(window.seconds, counted),
+                                        self.tolerance)
+            shift_span = max(0.0, now - self.shift_started)
+            result[SHIFT] = _summary(self._shift, shift_span, self.tolerance)
+            return result
+
+
+def replay_history(stats, history, since):
+    """Feed every run since `since` from the flash history; returns the run count"""
+    rows = history.query(
+        "SELECT probe_id, status, started_at, finished_at, attempts FROM flash_runs "
+        "WHERE started_at >= ? AND finished_at IS NOT NULL ORDER BY finished_at",
+        (since.timestamp(),))
+    for row in rows:
+        stats.record(row["probe_id"], row["status"], row["finished_at"] - row["started_at"],
+                     row["attempts"], row["finished_at"])
+    return len(rows)
+
+
+def describe_window(name, summary):
+    """One-line operator summary of a window"""
+    if not summary["units"]:
+        return f"{name}: no units"
+    rate = summary["units_per_hour"]
+    slow = sorted(probe for probe, entry in summary["probes"].items() if entry["slow"])
+    text = (f"{name}: {summary['units']} units, "
+            f"{rate if rate is not None else '-'} units/h, "
+            f"FPY {100 * summary['first_pass_yield']:.1f}%")
+    if slow:
+        text += f", slow probes: {', '.join(slow)}"
+    return text
+
+
+def benchmark(jobs=100000, probes=16):
+    """Cost of record() and snapshot() over a simulated shift"""
+    clock = [0.0]
+    stats = LineStats(clock=lambda: clock[0])
+    started = time.perf_counter()
+    for index in range(jobs):
+        clock[0] += 0.25
+        stats.record(f"P{index % probes:02d}", STATUS_FAILED if index % 50 == 0 else STATUS_PASSED,
+                     4.0 + (index % probes) * 0.05, 1 + (index % 97 == 0))
+    record_us = (time.perf_counter() - started) * 1e6 / jobs
+    started = time.perf_counter()
+    for _ in range(100):
+        snapshot = stats.snapshot()
+    snapshot_ms = (time.perf_counter() - started) * 1000 / 100
+    return {
+        "jobs": jobs,
+        "probes": probes,
+        "record_us_per_job": round(record_us, 2),
+        "snapshot_ms": round(snapshot_ms, 3),
+        "shift_units_per_hour": snapshot[SHIFT]["units_per_hour"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CC2650 line throughput and yield")
+    parser.add_argument("--hours", type=float, default=8.0,
+                        help="replay this many hours of flash history as one shift")
+    parser.add_argument("--bench", action="store_true", help="time record() and snapshot()")
+    args = parser.parse_args()
+
+    if args.bench:
+        for key, value in benchmark().items():
+            print(f"{key:22} {value}")
+        return 0
+
+    from flash_history import FlashHistory
+
+    since = datetime.now() - timedelta(hours=args.hours)
+    stats = LineStats()
+    stats.new_shift(since.timestamp())
+    history = FlashHistory()
+    runs = replay_history(stats, history, since)
+    history.close()
+    print(f"{runs} run(s) since {since:%Y-%m-%d %H:%M}")
+    snapshot = stats.snapshot()
+    for name, summary in snapshot.items():
+        print(describe_window(name, summary))
+    for probe, entry in sorted(snapshot[SHIFT]["probes"].items()):
+        flag = "  SLOW" if entry["slow"] else ""
+        print(f"    {probe:16} {entry['jobs']:6} jobs  cycle {entry['cycle_s']:6.2f}s  "
+              f"utilization {100 * entry['utilization']:5.1f}%{flag}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
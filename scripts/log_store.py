@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+CC2650 Log Store
+Bounded in-memory log tail with older lines spilled to rotating files on disk
+
+Features:
+- Keeps only the last N lines in memory
+- Evicted lines are appended to <name>.log, rotated to .1 ... .N by size
+- Absolute line numbering so views can page older history back in; a page is
+  read from a stored file offset, not by re-reading the spill files from the top
+- Streams the full history (disk + memory) for save / copy
+"""
+
+import os
+import tempfile
+from collections import deque
+from itertools import islice
+
+DEFAULT_MAX_LINES = 2000
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_SPILL_DIR = os.path.join(tempfile.gettempdir(), "cc2650_logs")
+# A byte offset is kept for every this many lines written to a spill file
+CHECKPOINT_LINES = 256
+
+
+class LogStore:
+    """Line store that keeps a bounded tail in memory and spills the rest to disk"""
+
+    def __init__(self, name, max_lines=DEFAULT_MAX_LINES, spill_dir=DEFAULT_SPILL_DIR,
+                 max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT):
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        os.makedirs(spill_dir, exist_ok=True)
+        self.path = os.path.join(spill_dir, f"{name}.log")
+
+        self._tail = deque()
+        self._spill = None
+        self._file_lines = 0
+        self._backup_lines = deque()
+        self._checkpoints = []
+        self._backup_checkpoints = deque()
+        self.total = 0
+        self.discarded = 0
+        self._remove_spill_files()
+
+    @property
+    def first_available(self):
+        """Absolute index of the oldest line still held on disk or in memory"""
+        return self.discarded
+
+    def append(self, line):
+        """Add one line"""
+        if len(self._tail) >= self.max_lines:
+            self._write_spill(self._tail.popleft())
+        self._tail.append(line)
+        self.total += 1
+
+    def extend(self, lines):
+        """Add several lines"""
+        for line in lines:
+            self.append(line)
+
+    def tail(self):
+        """Lines currently held in memory"""
+        return list(self._tail)
+
+    def iter_lines(self):
+        """Yield the full history, oldest first"""
+        if self._spill:
+            self._spill.flush()
+        for path in self._spill_files():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    yield line.rstrip("\n")
+        yield from list(self._tail)
+
+    def lines_between(self, start, end):
+        """Lines with absolute index in [start, end)"""
+        start = max(start, self.discarded)
+        end = min(end, self.total)
+        if start >= end:
+            return []
+        result = []
+        tail_start = self.total - len(self._tail)
+        if start < tail_start:
+            if self._spill:
+                self._spill.flush()
+            first = self.discarded
+            for path, lines, checkpoints in self._spill_segments():
+                if start < first + lines and first < end:
+                    result += self._read_spill(path, checkpoints, max(start - first, 0),
+                                               min(end - first, lines))
+                first += lines
+        result += islice(self._tail, max(start - tail_start, 0), max(end - tail_start, 0))
+        return result
+
+    def write_to(self, f):
+        """Stream the full history into an open text file"""
+        for line in self.iter_lines():
+            f.write(line + "\n")
+
+    def text(self):
+        """Full history as a single string"""
+        return "".join(line + "\n" for line in self.iter_lines())
+
+    def clear(self):
+        """Forget all lines, in memory and on disk"""
+        self._tail.clear()
+        self._remove_spill_files()
+        self.total = 0
+        self.discarded = 0
+
+    def close(self):
+        """Close the spill file and remove it from disk"""
+        self._remove_spill_files()
+
+    def _spill_files(self):
+        """Existing spill files, oldest first"""
+        paths = [f"{self.path}.{i}" for i in range(self.backup_count, 0, -1)]
+        paths.append(self.path)
+        return [path for path in paths if os.path.exists(path)]
+
+    def _spill_segments(self):
+        """(path, line count, checkpoints) of every spill file, oldest first"""
+        for i in range(len(self._backup_lines), 0, -1):
+            yield f"{self.path}.{i}", self._backup_lines[i - 1], self._backup_checkpoints[i - 1]
+        yield self.path, self._file_lines, self._checkpoints
+
+    def _read_spill(self, path, checkpoints, start, stop):
+        """Lines [start, stop) of one spill file, read from the nearest checkpoint"""
+        mark = start // CHECKPOINT_LINES
+        index = mark * CHECKPOINT_LINES
+        lines = []
+        with open(path, "rb") as f:
+            f.seek(checkpoints[mark])
+            for raw in f:
+                if index >= stop:
+                    break
+                if index >= start:
+                    lines.append(raw.decode("utf-8").rstrip("\n"))
+                index += 1
+        return lines
+
+    def _write_spill(self, line):
+        if self._spill is None:
+            self._spill = open(self.path, "ab")
+        if self._file_lines % CHECKPOINT_LINES == 0:
+            self._checkpoints.append(self._spill.tell())
+        self._spill.write(line.encode("utf-8") + b"\n")
+        self._file_lines += 1
+        if self._spill.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._spill.close()
+        self._spill = None
+
+        if len(self._backup_lines) >= self.backup_count:
+            self.discarded += self._backup_lines.pop()
+            self._backup_checkpoints.pop()
+            os.remove(f"{self.path}.{self.backup_count}")
+        for i in range(len(self._backup_lines), 0, -1):
+            os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+        self._backup_lines.appendleft(self._file_lines)
+        self._backup_checkpoints.appendleft(self._checkpoints)
+        self._file_lines = 0
+        self._checkpoints = []
+
+    def _remove_spill_files(self):
+        if self._spill:
+            self._spill.close()
+            self._spill = None
+        for path in [self.path] + [f"{self.path}.{i}" for i in range(1, self.backup_count + 1)]:
+            if os.path.exists(path):
+                os.remove(path)
+        self._file_lines = 0
+        self._backup_lines.clear()
+        self._checkpoints = []
+        self._backup_checkpoints.clear()
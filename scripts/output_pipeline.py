@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+CC2650 Flash Output Pipeline
+Thread-safe line queue between flash reader threads and the Tk output view
+
+Features:
+- Reader threads push lines without touching Tk
+- The UI drains everything queued since the last tick in one batch
+- Bounded queue: oldest lines are dropped under back-pressure
+- Consecutive duplicate lines are coalesced into a single "(xN)" line
+- Dropped / coalesced counters for reporting
+"""
+
+import threading
+from collections import deque
+
+DEFAULT_MAX_PENDING = 5000
+
+
+class OutputPipeline:
+    """Bounded, coalescing line queue drained on a fixed UI tick"""
+
+    def __init__(self, max_pending=DEFAULT_MAX_PENDING):
+        self.max_pending = max_pending
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self.pushed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._dropped_reported = 0
+
+    def push(self, line):
+        """Queue one line; safe to call from any thread"""
+        with self._lock:
+            self.pushed += 1
+            if self._pending and self._pending[-1][0] == line:
+                self._pending[-1][1] += 1
+                self.coalesced += 1
+                return
+            if len(self._pending) >= self.max_pending:
+                _, count = self._pending.popleft()
+                self.dropped += count
+            self._pending.append([line, 1])
+
+    def drain(self):
+        """Take every queued line, formatted for display"""
+        with self._lock:
+            pending = self._pending
+            self._pending = deque()
+            newly_dropped = self.dropped - self._dropped_reported
+            self._dropped_reported = self.dropped
+
+        lines = []
+        if newly_dropped:
+            lines.append(f"... {newly_dropped} line(s) dropped (output backlog)")
+        for line, count in pending:
+            lines.append(line if count == 1 else f"{line}  (x{count})")
+        return lines
+
+    def clear(self):
+        """Discard queued lines without counting them as dropped"""
+        with self._lock:
+            self._pending.clear()
+
+    def stats(self):
+        """Totals since the pipeline was created"""
+        with self._lock:
+            return {
+                "pushed": self.pushed,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "pending": len(self._pending),
+            }
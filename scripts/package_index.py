@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+UniFlash Package Library
+Index of exported UniFlash standalone packages under a library root
+
+Features:
+- Finds every package (a folder whose flash recipe resolves, see
+  flash_recipe.is_package) below the root; without a configured root only the
+  jig's usual package folders are searched
+- Reads the target device and probe from user_files/configs/*.ccxml and the
+  flash settings from user_files/settings/generated.ufsettings
+- Hashes the images in user_files/images (SHA-256 and CRC32)
+- Caches everything on disk; a refresh only re-reads folders whose mtime
+  changed and only re-hashes images whose size or mtime changed
+- Product and version from "<product>_<version>" folder names or a
+  <root>/<product>/<version>/ layout
+
+Usage:
+    python package_index.py --root D:\\packages
+    python package_index.py --root D:\\packages --product sensor_tag
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+
+from flash_recipe import RECIPE_FILES, is_package
+from image_check import image_digest
+from uniflash_package import is_image_file, read_ufsettings
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cc2650_jig", "package_index.json")
+# None: no library configured, search DEFAULT_PACKAGE_FOLDERS of the working directory
+DEFAULT_LIBRARY_ROOT = os.environ.get("CC2650_PACKAGE_ROOT")
+DEFAULT_PACKAGE_FOLDERS = ("single_flash", ".", "cc2650_project", "uniflash_export")
+INDEX_VERSION = 3
+# Only folders with one of these are resolved as possible packages
+_PACKAGE_HINTS = ("user_files",) + RECIPE_FILES
+
+_NAME_VERSION = re.compile(r"^(?P<product>.+?)[ _-]v?(?P<version>\d+(?:\.\d+)*[a-z0-9-]*)$",
+                           re.IGNORECASE)
+
+# Folders inside a package that decide whether its entry is stale
+_PACKAGE_DIRS = ("", "user_files", os.path.join("user_files", "configs"),
+                 os.path.join("user_files", "settings"), os.path.join("user_files", "images"))
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def version_key(version):
+    """Sort key that orders 1.10 after 1.9"""
+    return [(0, int(part), "") if part.isdigit() else (1, 0, part)
+            for part in re.split(r"[._-]", version or "")]
+
+
+def product_version(folder, root):
+    """(product, version) for a package folder"""
+    name = os.path.basename(os.path.normpath(folder))
+    match = _NAME_VERSION.match(name)
+    if match:
+        return match.group("product"), match.group("version")
+    parent = os.path.dirname(os.path.normpath(folder))
+    if os.path.normpath(parent) != os.path.normpath(root):
+        return os.path.basename(parent), name
+    return name, ""
+
+
+def read_ccxml(path):
+    """Target device and probe named in a ccxml"""
+    info = {"ccxml": os.path.basename(path), "device": None, "connection": None}
+    try:
+        root = ET.parse(path).getroot()
+    except (OSError, ET.ParseError) as e:
+        info["error"] = f"ccxml: {e}"
+        return info
+    for instance in root.iter("instance"):
+        xmlpath = instance.get("xmlpath")
+        if xmlpath == "devices" and not info["device"]:
+            info["device"] = instance.get("desc") or instance.get("id")
+        elif xmlpath == "connections" and not info["connection"]:
+            info["connection"] = instance.get("desc") or instance.get("id")
+    return info
+
+
+class PackageIndex:
+    """Library of UniFlash packages under one root, cached in a JSON file"""
+
+    def __init__(self, root=DEFAULT_LIBRARY_ROOT, path=DEFAULT_INDEX_PATH, folders=None):
+        if root is None:
+            root, folders = ".", folders or DEFAULT_PACKAGE_FOLDERS
+        self.root = os.path.abspath(root)
+        # Folders below root to search; None searches the whole root
+        self.folders = list(folders) if folders else None
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirs = {}
+        self._packages = {}
+        self._images = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (data.get("version") != INDEX_VERSION or data.get("root") != self.root
+                or data.get("folders") != self.folders):
+            return
+        self._dirs = data.get("dirs", {})
+        self._packages = data.get("packages", {})
+        self._images = data.get("images", {})
+
+    def save(self):
+        """Write the index cache atomically"""
+        with self._lock:
+            data = {"version": INDEX_VERSION, "root": self.root, "folders": self.folders,
+                    "dirs": self._dirs,
+                    "packages": self._packages, "images": self._images}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self):
+        """Bring the index up to date with the disk; returns counts of
+        packages re-read and packages reused from the cache"""
+        dirs = {}
+        packages = {}
+        stats = {"read": 0, "cached": 0}
+        if self.folders is None:
+            pending = [(self.root, True)]
+        else:
+            # The root itself may be a package, but is never walked
+            pending = [(os.path.normpath(os.path.join(self.root, name)),
+                        os.path.normpath(name) != os.curdir) for name in self.folders]
+
+        while pending:
+            folder, walk = pending.pop()
+            if folder in dirs:
+                continue
+            mtime = _mtime(folder)
+            if mtime is None:
+                continue
+            cached = self._dirs.get(folder)
+            if cached and cached["mtime"] == mtime:
+                entry = cached
+            else:
+                # Directory changed (or is new): list it again
+                try:
+                    with os.scandir(folder) as it:
+                        names = {e.name: e.is_dir() for e in it}
+                except OSError:
+                    continue
+                entry = {"mtime": mtime,
+                         "candidate": any(name in names for name in _PACKAGE_HINTS),
+                         "subdirs": sorted(n for n, is_dir in names.items() if is_dir)}
+            dirs[folder] = entry
+
+            # Resolved on every refresh: a recipe or tool can change below an unchanged folder
+            if entry["candidate"] and is_package(folder):
+                # Never descend into a package; ccs_base_app alone is thousands of files
+                packages[folder] = self._package(folder, stats)
+            elif walk:
+                pending.extend((os.path.join(folder, name), True) for name in entry["subdirs"])
+
+        live_images = {image["path"] for pkg in packages.values() for image in pkg["images"]}
+        with self._lock:
+            self._dirs = dirs
+            self._packages = packages
+            self._images = {path: value for path, value in self._images.items()
+                            if path in live_images}
+        self.save()
+        return stats
+
+    def _package(self, folder, stats):
+        mtimes = [_mtime(os.path.join(folder, sub)) for sub in _PACKAGE_DIRS]
+        cached = self._packages.get(folder)
+        if cached and cached["mtimes"] == mtimes and self._images_current(cached):
+            stats["cached"] += 1
+            return cached
+        stats["read"] += 1
+        return self.read_package(folder, mtimes)
+
+    def _images_current(self, package):
+        for image in package["images"]:
+            try:
+                st = os.stat(image["path"])
+            except OSError:
+                return False
+            if [st.st_size, st.st_mtime_ns] != image["stat"]:
+                return False
+        return True
+
+    def read_package(self, folder, mtimes=None):
+        """Parse one package folder into an index entry"""
+        folder = os.path.abspath(folder)
+        product, version = product_version(folder, self.root)
+        package = {"path": folder, "name": os.path.basename(folder),
+                   "product": product, "version": version,
+                   "mtimes": mtimes or [_mtime(os.path.join(folder, sub)) for sub in _PACKAGE_DIRS],
+                   "device": None, "connection": None, "ccxml": None,
+                   "settings": {}, "images": [], "errors": []}
+
+        configs = os.path.join(folder, "user_files", "configs")
+        ccxmls = sorted(n for n in _listdir(configs) if n.lower().endswith(".ccxml"))
+        if ccxmls:
+            info = read_ccxml(os.path.join(configs, ccxmls[0]))
+            error = info.pop("error", None)
+            if error:
+                package["errors"].append(error)
+            package.update(info)
+        else:
+            package["errors"].append("no ccxml in user_files/configs")
+
+        package["settings"] = read_ufsettings(
+            os.path.join(folder, "user_files", "settings", "generated.ufsettings"))
+
+        images = os.path.join(folder, "user_files", "images")
+        for name in sorted(_listdir(images)):
+            path = os.path.join(images, name)
+            if is_image_file(path):
+                package["images"].append(self._image(path))
+        if not package["images"]:
+            package["errors"].append("no image in user_files/images")
+        return package
+
+    def _image(self, path):
+        st = os.stat(path)
+        stat = [st.st_size, st.st_mtime_ns]
+        cached = self._images.get(path)
+        if cached and cached["stat"] == stat:
+            return cached
+        entry = dict(image_digest(path), path=path, stat=stat)
+        with self._lock:
+            self._images[path] = entry
+        return entry
+
+    def packages(self, product=None):
+        """Indexed packages, optionally for one product, newest version first"""
+        with self._lock:
+            found = [p for p in self._packages.values()
+                     if product is None or p["product"] == product]
+        return sorted(found, key=lambda p: (p["product"], version_key(p["version"])),
+                      reverse=True)
+
+    def products(self):
+        """Product names in the library"""
+        with self._lock:
+            return sorted({p["product"] for p in self._packages.values()})
+
+    def versions(self, product):
+        """Versions of a product, newest first"""
+        return [p["version"] for p in self.packages(product)]
+
+    def find(self, product, version=None):
+        """Package for a product and version (latest when version is None), or None"""
+        for package in self.packages(product):
+            if version is None or package["version"] == version:
+                return package
+        return None
+
+
+def _listdir(folder):
+    try:
+        return os.listdir(folder)
+    except OSError:
+        return []
+
+
+def describe(package):
+    """One-line summary of a package entry"""
+    images = ", ".join(image["name"] for image in package["images"]) or "no image"
+    return (f"{package['product']} {package['version'] or '-'}  "
+            f"{package['device'] or 'unknown device'}  {images}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index UniFlash standalone packages")
+    parser.add_argument("--root", default=DEFAULT_LIBRARY_ROOT,
+                        help="package library root (default: the usual package folders here)")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="index cache file")
+    parser.add_argument("--product", help="only list this product")
+    args = parser.parse_args()
+
+    index = PackageIndex(args.root, args.index)
+    stats = index.refresh()
+    for package in index.packages(args.product):
+        print(f"{describe(package)}\n    {package['path']}")
+        for error in package["errors"]:
+            print(f"    ! {error}")
+    print(f"{len(index.packages())} package(s): {stats['read']} read, {stats['cached']} from cache")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+CC2650 Flash Phase Metrics
+Per-phase timing from DSLite output, rolling histograms and a local metrics endpoint
+
+Features:
+- PhaseTracker: detects connect / erase / program / verify boundaries line by line
+- PhaseMetrics: cumulative histograms plus a rolling sample window per phase and probe,
+  and the same for station events such as slot recovery after a hung job; runs
+  tagged with a job kind (full, incremental, provisioned) also feed per-kind windows
+- MetricsServer: Prometheus text on http://127.0.0.1:<port>/metrics, JSON on /metrics.json
+- JsonMetricsWriter: periodic JSON snapshot for stations without a scraper
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+
+DEFAULT_METRICS_PORT = 9650
+DEFAULT_WINDOW = 500
+BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+PHASES = ("connect", "erase", "program", "verify")
+
+# What a job writes; a sector patch and a full image take very different times
+KIND_FULL = "full"
+KIND_INCREMENTAL = "incremental"
+KIND_PROVISIONED = "provisioned"
+JOB_KINDS = (KIND_FULL, KIND_INCREMENTAL, KIND_PROVISIONED)
+# Phases whose duration depends on what is written; connect does not
+KIND_PHASES = ("erase", "program", "verify")
+
+# First DSLite line that marks the start of each phase; connect starts at launch
+PHASE_PATTERNS = (
+    ("erase", re.compile(r"erasing", re.IGNORECASE)),
+    ("program", re.compile(r"writing flash|programming|loading program", re.IGNORECASE)),
+    ("verify", re.compile(r"verif", re.IGNORECASE)),
+)
+
+
+class PhaseTracker:
+    """Splits one flash run into phase durations as output lines arrive"""
+
+    def __init__(self, started=None, clock=time.monotonic):
+        self.clock = clock
+        self.phase = "connect"
+        self.phase_started = started if started is not None else clock()
+        self.durations = {}
+        self._next = 0
+
+    def feed(self, line):
+        """Inspect one output line; returns the new phase name on a transition"""
+        for index in range(self._next, len(PHASE_PATTERNS)):
+            phase, pattern = PHASE_PATTERNS[index]
+            if pattern.search(line):
+                self._enter(phase)
+                self._next = index + 1
+                return phase
+        return None
+
+    def restart(self):
+        """Start timing the current phase again, e.g. once the tool is up"""
+        self.phase_started = self.clock()
+
+    def finish(self):
+        """Close the current phase; returns {phase: seconds}"""
+        if self.phase:
+            self._enter(None)
+        return dict(self.durations)
+
+    def _enter(self, phase):
+        now = self.clock()
+        self.durations[self.phase] = self.durations.get(self.phase, 0.0) + now - self.phase_started
+        self.phase = phase
+        self.phase_started = now
+
+
+class _Series:
+    """Histogram buckets plus a rolling window of recent samples"""
+
+    def __init__(self, window):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+
+    def quantile(self, q):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class PhaseMetrics:
+    """Phase durations by phase and by probe"""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._series = {}
+        self._events = {}
+        self._kinds = {}
+
+    def observe(self, phase, probe, seconds, kind=None):
+        """Record one phase duration for a probe (and for its job kind, if given)"""
+        with self._lock:
+            for key in ((phase, None), (phase, probe or "default")):
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = _Series(self.window)
+                series.observe(seconds)
+            if kind:
+                for key in ((phase, None, kind), (phase, probe or "default", kind)):
+                    series = self._kinds.get(key)
+                    if series is None:
+                        series = self._kinds[key] = _Series(self.window)
+                    series.observe(seconds)
+
+    def observe_event(self, name, probe, seconds):
+        """Record a non-phase duration, e.g. observe_event("slot_recovery", probe, 4.2)"""
+        with self._lock:
+            for key in ((name, None), (name, probe or "default")):
+                series = self._events.get(key)
+                if series is None:
+                    series = self._events[key] = _Series(self.window)
+                series.observe(seconds)
+
+    def observe_run(self, probe, durations, kind=None):
+        """Record every phase of one run"""
+        for phase, seconds in durations.items():
+            self.observe(phase, probe, seconds, kind)
+
+    def _get(self, phase, probe, kind):
+        return self._kinds.get((phase, probe, kind)) if kind else self._series.get((phase, probe))
+
+    def quantile(self, phase, q, probe=None, kind=None):
+        """Quantile of the rolling window, e.g. quantile("erase", 0.99)"""
+        with self._lock:
+            series = self._get(phase, probe, kind)
+            return series.quantile(q) if series else None
+
+    def typical(self, probe=None, q=0.5):
+        """{phase: typical seconds} for a probe, falling back to the whole station"""
+        result = {}
+        with self._lock:
+            for phase in PHASES:
+                series = (self._series.get((phase, probe or "default"))
+                          or self._series.get((phase, None)))
+                if series and series.recent:
+                    result[phase] = series.quantile(q)
+        return result
+
+    def samples(self, phase, probe=None, kind=None):
+        """Number of samples in the rolling window"""
+        with self._lock:
+            series = self._get(phase, probe, kind)
+            return len(series.recent) if series else 0
+
+    def snapshot(self):
+        """JSON-friendly view of every series"""
+        with self._lock:
+            result = {"phases": {}, "probes": {}, "events": {}}
+            for (phase, probe), series in sorted(self._series.items(), key=lambda item: str(item[0])):
+                if probe is None:
+                    result["phases"][phase] = _entry(series)
+                else:
+                    result["probes"].setdefault(probe, {})[phase] = _entry(series)
+            for (event, probe), series in sorted(self._events.items(), key=lambda item: str(item[0])):
+                entry = result["events"].setdefault(event, {})
+                if probe is None:
+                    entry.update(_entry(series))
+                else:
+                    entry.setdefault("probes", {})[probe] = _entry(series)
+            return result
+
+    def render_prometheus(self):
+        """Prometheus text exposition format"""
+        name = "cc2650_flash_phase_seconds"
+        lines = [f"# HELP {name} Duration of DSLite flash phases",
+                 f"# TYPE {name} histogram"]
+        with self._lock:
+            for (phase, probe), series in sorted(self._series.items(), key=lambda item: str(item[0])):
+                labels = f'phase="{phase}"' + (f',probe="{probe}"' if probe else "")
+                _render_series(lines, name, labels, series)
+            declared = set()
+            for (event, probe), series in sorted(self._events.items(), key=lambda item: str(item[0])):
+                event_name = f"cc2650_{event}_seconds"
+                if event_name not in declared:
+                    declared.add(event_name)
+                    lines += [f"# HELP {event_name} Duration of {event.replace('_', ' ')} events",
+                              f"# TYPE {event_name} histogram"]
+                _render_series(lines, event_name, f'probe="{probe}"' if probe else "", series)
+        return "\n".join(lines) + "\n"
+
+
+def _entry(series):
+    return {
+        "count": series.count,
+        "sum": round(series.total, 3),
+        "buckets": dict(zip([str(b) for b in BUCKETS], series.buckets)),
+        "p50": series.quantile(0.5),
+        "p90": series.quantile(0.9),
+        "p99": series.quantile(0.99),
+    }
+
+
+def _render_series(lines, name, labels, series):
+    sep = "," if labels else ""
+    for bound, count in zip(BUCKETS, series.buckets):
+        lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {count}')
+    lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {series.count}')
+    lines.append(f"{name}_sum{{{labels}}} {series.total:.3f}")
+    lines.append(f"{name}_count{{{labels}}} {series.count}")
+
+
+class MetricsServer:
+    """Serves PhaseMetrics over HTTP on localhost from a daemon thread"""
+
+    def __init__(self, metrics, port=DEFAULT_METRICS_PORT, host="127.0.0.1"):
+        # Imported here: http.server pulls in email and ssl, which headless
+        # flash runs without a metrics endpoint never need
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics_ref = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = metrics_ref.render_prometheus().encode()
+                    content_type = "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body = json.dumps(metrics_ref.snapshot(), indent=2).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever,
+                                        name="metrics-http", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop serving"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class JsonMetricsWriter:
+    """Writes a PhaseMetrics snapshot to a JSON file every interval seconds"""
+
+    def __init__(self, metrics, path, interval=30.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-json", daemon=True)
+        self._thread.start()
+
+    def write(self):
+        """Write one snapshot now"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.metrics.snapshot(), f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def close(self):
+        """Stop the timer and write a final snapshot"""
+        self._stop.set()
+        self._thread.join()
+        self.write()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+CC2650 Post-Processing Pipeline
+Host-side bookkeeping of finished units, off the probe's critical path
+
+A slot used to finish all the bookkeeping for a unit before its probe could take
+the next one. That covers the flash records, the last-image archive, the history
+row, and the result events with their spool files and uploads. With a PostPipeline
+the slot hands that work to a small worker pool and programs the next unit
+straight away.
+
+Features:
+- Bounded queues with back-pressure: submit() blocks once `depth` tasks wait
+  for a worker, so a slow disk or upload throttles the line instead of growing
+  memory; the time slots spent blocked is counted
+- Per-probe order: every task for a key runs on the same worker, in submission
+  order, so a probe's records are never written out of order
+- Per-probe barrier: wait(key) returns once every task submitted for a probe has
+  run, for steps that read what the previous unit wrote (pre-flash identical
+  check, incremental plan)
+- A failing task is counted and handed to on_error; it never stops a worker
+- drain() and close() so nothing queued is lost at shutdown
+- Benchmark: serial vs pipelined units/hour for one probe
+
+Usage:
+    python post_pipeline.py --bench --flash 0.2 --post 0.1
+"""
+
+import argparse
+import queue
+import sys
+import threading
+import time
+
+DEFAULT_WORKERS = 2
+DEFAULT_DEPTH = 8
+
+_STOP = object()
+
+
+class PostPipeline:
+    """Bounded worker pool for the host-side work of finished units"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, depth=DEFAULT_DEPTH, on_error=None):
+        self.workers = max(1, int(workers))
+        self.depth = max(1, int(depth))
+        self.on_error = on_error
+        self._queues = [queue.Queue(maxsize=self.depth) for _ in range(self.workers)]
+        self._threads = []
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._outstanding = 0
+        self._closed = False
+        self.completed = 0
+        self.failed = 0
+        self.blocked = 0
+        self.blocked_seconds = 0.0
+        self.high_water = 0
+
+    def submit(self, key, fn, *args):
+        """Queue fn(*args) behind earlier tasks for key
+
+        Blocks while that worker's queue is full. Never call it from a
+        pipeline task: a full queue would then wait on itself.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Post-processing pipeline is closed")
+            if not self._threads:
+                self._start()
+            self._pending[key] = self._pending.get(key, 0) + 1
+            self._outstanding += 1
+
+        tasks = self._queues[hash(key) % self.workers]
+        item = (key, fn, args)
+        try:
+            tasks.put_nowait(item)
+        except queue.Full:
+            started = time.monotonic()
+            tasks.put(item)
+            with self._cond:
+                self.blocked += 1
+                self.blocked_seconds += time.monotonic() - started
+        with self._cond:
+            self.high_water = max(self.high_water, tasks.qsize())
+
+    def wait(self, key=None, timeout=None):
+        """Block until every task for key (or every task) has run; False on timeout"""
+        with self._cond:
+            if key is None:
+                return self._cond.wait_for(lambda: not self._outstanding, timeout)
+            return self._cond.wait_for(lambda: key not in self._pending, timeout)
+
+    def drain(self, timeout=None):
+        """Block until the pipeline is empty"""
+        return self.wait(timeout=timeout)
+
+    def stats(self):
+        """Counters for status displays and benchmarks"""
+        with self._cond:
+            return {
+                "queued": self._outstanding,
+                "high_water": self.high_water,
+                "completed": self.completed,
+                "failed": self.failed,
+                "blocked": self.blocked,
+                "blocked_s": round(self.blocked_seconds, 3),
+            }
+
+    def close(self):
+        """Run everything still queued, then stop the workers"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+        for tasks in self._queues:
+            if self._threads:
+                tasks.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def _start(self):
+        for index, tasks in enumerate(self._queues):
+            thread = threading.Thread(target=self._run, args=(tasks,),
+                                      name=f"post-process-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self, tasks):
+        while True:
+            item = tasks.get()
+            if item is _STOP:
+                return
+            key, fn, args = item
+            failed = False
+            try:
+                fn(*args)
+            except Exception as e:
+                failed = True
+                if self.on_error:
+                    try:
+                        self.on_error(key, e)
+                    except Exception:
+                        pass
+            with self._cond:
+                if failed:
+                    self.failed += 1
+                self.completed += 1
+                self._outstanding -= 1
+                self._pending[key] -= 1
+                if not self._pending[key]:
+                    del self._pending[key]
+                self._cond.notify_all()
+
+
+def benchmark(units=20, flash_seconds=0.2, post_seconds=0.1, workers=DEFAULT_WORKERS,
+              depth=DEFAULT_DEPTH):
+    """Units/hour on one probe with bookkeeping inline vs in a PostPipeline"""
+    def flash():
+        time.sleep(flash_seconds)
+
+    def post():
+        time.sleep(post_seconds)
+
+    started = time.perf_counter()
+    for _ in range(units):
+        flash()
+        post()
+    serial = time.perf_counter() - started
+
+    pipeline = PostPipeline(workers, depth)
+    started = time.perf_counter()
+    busy = 0.0
+    for _ in range(units):
+        began = time.perf_counter()
+        flash()
+        busy += time.perf_counter() - began
+        pipeline.submit("probe", post)
+    pipeline.drain()
+    pipelined = time.perf_counter() - started
+    stats = pipeline.stats()
+    pipeline.close()
+
+    return {
+        "units": units,
+        "serial_units_per_hour": round(units * 3600 / serial),
+        "pipelined_units_per_hour": round(units * 3600 / pipelined),
+        "probe_busy_pct": round(100.0 * busy / pipelined, 1),
+        "saved_pct": round(100.0 * (1 - pipelined / serial), 1),
+        "queue_high_water": stats["high_water"],
+        "backpressure_s": stats["blocked_s"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CC2650 post-processing pipeline")
+    parser.add_argument("--bench", action="store_true", help="serial vs pipelined benchmark")
+    parser.add_argument("--units", type=int, default=20, help="units per benchmark run")
+    parser.add_argument("--flash", type=float, default=0.2, help="simulated seconds on the probe")
+    parser.add_argument("--post", type=float, default=0.1, help="simulated host-side seconds")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="post-processing workers")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="queued tasks per worker")
+    args = parser.parse_args()
+
+    if not args.bench:
+        parser.print_help()
+        return 2
+    for key, value in benchmark(args.units, args.flash, args.post, args.workers,
+                                args.depth).items():
+        print(f"{key:26} {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
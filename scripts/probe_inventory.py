@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+CC2650 Probe Inventory
+Cached list of connected XDS110 debug probes, kept current on hotplug
+
+Features:
+- Enumerates XDS110 probes with their serial numbers once, then caches them
+- Linux: reads /sys/bus/usb/devices (root is configurable, e.g. a fake tree)
+- Linux: kernel uevents wake the watcher on hotplug; otherwise the device
+  listing is polled and only added or removed entries are read
+- Windows: WMI enumeration of the XDS110 USB IDs on a slower poll
+- Instant queries for the scheduler and GUI, plus probe-to-slot mapping
+
+Usage:
+    python probe_inventory.py
+    python probe_inventory.py --watch
+"""
+
+import argparse
+import os
+import re
+import socket
+import subprocess
+import threading
+import time
+
+SYSFS_USB_DEVICES = "/sys/bus/usb/devices"
+TI_VENDOR_ID = "0451"
+XDS110_PRODUCT_IDS = ("bef3", "bef4")
+POLL_INTERVAL = 1.0
+WINDOWS_POLL_INTERVAL = 5.0
+NETLINK_KOBJECT_UEVENT = 15
+
+_WMI_DEVICE_ID = re.compile(r"USB\\VID_([0-9A-F]{4})&PID_([0-9A-F]{4})\\(\S+)", re.IGNORECASE)
+
+
+class Probe:
+    """One connected XDS110 probe"""
+
+    def __init__(self, serial, vendor_id, product_id, product=None, location=None, devnum=None):
+        self.serial = serial
+        self.vendor_id = vendor_id
+        self.product_id = product_id
+        self.product = product
+        self.location = location
+        self.devnum = devnum
+
+    def __repr__(self):
+        return f"Probe({self.serial!r}, {self.product!r} at {self.location})"
+
+    def describe(self):
+        """Short human-readable description"""
+        return f"{self.serial}  {self.product or 'XDS110'}  [{self.location}]"
+
+
+def _read_attr(device_dir, name):
+    try:
+        with open(os.path.join(device_dir, name)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def read_sysfs_device(sysfs_root, name):
+    """Probe for a /sys/bus/usb/devices entry, or None if it is not an XDS110"""
+    device_dir = os.path.join(sysfs_root, name)
+    if _read_attr(device_dir, "idVendor") != TI_VENDOR_ID:
+        return None
+    product_id = _read_attr(device_dir, "idProduct")
+    if product_id not in XDS110_PRODUCT_IDS:
+        return None
+    serial = _read_attr(device_dir, "serial")
+    if not serial:
+        return None
+    return Probe(serial, TI_VENDOR_ID, product_id,
+                 product=_read_attr(device_dir, "product"),
+                 location=name,
+                 devnum=_read_attr(device_dir, "devnum"))
+
+
+def _sysfs_entries(sysfs_root):
+    try:
+        # Interface entries ("1-1.2:1.0") and root hubs carry no probe serial
+        return {name for name in os.listdir(sysfs_root)
+                if ":" not in name and not name.startswith("usb")}
+    except OSError:
+        return set()
+
+
+def scan_windows():
+    """XDS110 probes from WMI, keyed by serial"""
+    result = subprocess.run(
+        ["wmic", "path", "Win32_PnPEntity", "where",
+         f"DeviceID like 'USB\\\\VID_{TI_VENDOR_ID}%'", "get", "DeviceID,Name"],
+        capture_output=True, text=True, timeout=10)
+    probes = {}
+    for line in result.stdout.splitlines():
+        match = _WMI_DEVICE_ID.search(line)
+        if not match or match.group(2).lower() not in XDS110_PRODUCT_IDS:
+            continue
+        serial = match.group(3)
+        if "&" in serial:
+            # Composite interface node; the parent device carries the serial
+            continue
+        name = line[match.end():].strip() or None
+        probes[serial] = Probe(serial, TI_VENDOR_ID, match.group(2).lower(),
+                               product=name, location=match.group(0))
+    return probes
+
+
+class ProbeInventory:
+    """Cached XDS110 probe list with hotplug updates from a background thread"""
+
+    def __init__(self, sysfs_root=None, on_change=None, poll_interval=None, use_uevents=None,
+                 scan=True):
+        self.windows = os.name == "nt" and sysfs_root is None
+        self.sysfs_root = sysfs_root or SYSFS_USB_DEVICES
+        self.on_change = on_change
+        self.poll_interval = poll_interval or (WINDOWS_POLL_INTERVAL if self.windows
+                                               else POLL_INTERVAL)
+        if use_uevents is None:
+            use_uevents = sysfs_root is None and hasattr(socket, "AF_NETLINK")
+        self.use_uevents = use_uevents and not self.windows
+        self._lock = threading.Lock()
+        self._entries = set()
+        self._by_location = {}
+        self._probes = {}
+        self._stop = threading.Event()
+        self._thread = None
+        # False when probes cannot be enumerated here; an empty list then
+        # does not mean "no probe connected"
+        self.available = False
+        # scan=False leaves the first scan (seconds of wmic on Windows) to the caller
+        if scan:
+            self.refresh()
+
+    def probes(self):
+        """Connected probes sorted by serial"""
+        with self._lock:
+            return [self._probes[serial] for serial in sorted(self._probes)]
+
+    def serials(self):
+        """Connected probe serials, sorted"""
+        with self._lock:
+            return sorted(self._probes)
+
+    def get(self, serial):
+        """Probe with this serial, or None if it is not connected"""
+        with self._lock:
+            return self._probes.get(serial)
+
+    def __contains__(self, serial):
+        return self.get(serial) is not None
+
+    def assign_slots(self, slots, current=None):
+        """Map slots to probes: keep current assignments whose probe is still
+        connected, then fill the remaining slots with unassigned probes"""
+        current = current or {}
+        connected = self.serials()
+        assignment = {}
+        for slot in slots:
+            serial = current.get(slot)
+            if serial in connected:
+                assignment[slot] = serial
+        free = [serial for serial in connected if serial not in assignment.values()]
+        for slot in slots:
+            if slot not in assignment:
+                assignment[slot] = free.pop(0) if free else None
+        return assignment
+
+    def refresh(self):
+        """Bring the cache up to date; returns (added, removed) probe lists"""
+        if self.windows:
+            try:
+                found = scan_windows()
+                self.available = True
+            except (OSError, subprocess.SubprocessError):
+                # Keep the last good list rather than dropping every probe
+                return [], []
+            return self._replace(found)
+        self.available = os.path.isdir(self.sysfs_root)
+        return self._refresh_sysfs()
+
+    def start(self):
+        """Start watching for hotplug events"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="probe-inventory",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        """Stop the hotplug watcher"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _refresh_sysfs(self, changed=()):
+        entries = _sysfs_entries(self.sysfs_root)
+        with self._lock:
+            known = self._entries
+            reread = (entries - known) | (set(changed) & entries)
+            # Same port, new plug: devnum changes even when the entry name does not
+            for name, probe in self._by_location.items():
+                if name in entries and _read_attr(os.path.join(self.sysfs_root, name),
+                                                  "devnum") != probe.devnum:
+                    reread.add(name)
+            gone = (known - entries) | reread
+
+        added = []
+        updates = {}
+        for name in reread:
+            probe = read_sysfs_device(self.sysfs_root, name)
+            if probe:
+                updates[name] = probe
+
+        with self._lock:
+            removed = [self._by_location.pop(name) for name in gone if name in self._by_location]
+            for probe in removed:
+                self._probes.pop(probe.serial, None)
+            for name, probe in updates.items():
+                self._by_location[name] = probe
+                self._probes[probe.serial] = probe
+                added.append(probe)
+            self._entries = entries
+
+        # A re-read of the same probe is neither an addition nor a removal
+        unchanged = {p.serial for p in added} & {p.serial for p in removed}
+        added = [p for p in added if p.serial not in unchanged]
+        removed = [p for p in removed if p.serial not in unchanged]
+        self._notify(added, removed)
+        return added, removed
+
+    def _replace(self, found):
+        with self._lock:
+            added = [probe for serial, probe in found.items() if serial not in self._probes]
+            removed = [probe for serial, probe in self._probes.items() if serial not in found]
+            self._probes = dict(found)
+        self._notify(added, removed)
+        return added, removed
+
+    def _notify(self, added, removed):
+        if (added or removed) and self.on_change:
+            self.on_change(added, removed)
+
+    def _uevent_socket(self):
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+            sock.bind((0, 1))
+            sock.settimeout(self.poll_interval)
+            return sock
+        except (OSError, AttributeError):
+            return None
+
+    def _watch(self):
+        sock = self._uevent_socket() if self.use_uevents else None
+        try:
+            while not self._stop.is_set():
+                if sock is None:
+                    self._stop.wait(self.poll_interval)
+                    if not self._stop.is_set():
+                        self.refresh()
+                    continue
+                try:
+                    message = sock.recv(65536)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    sock.close()
+                    sock = None
+                    continue
+                # "add@/devices/pci0000:00/.../1-1.2" -> re-read entry "1-1.2"
+                header = message.split(b"\0", 1)[0].decode(errors="replace")
+                if "@" in header and "/usb" in header:
+                    self._refresh_sysfs(changed=[os.path.basename(header.split("@", 1)[1])])
+        finally:
+            if sock is not None:
+                sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List connected XDS110 probes")
+    parser.add_argument("--sysfs", help="alternative /sys/bus/usb/devices tree")
+    parser.add_argument("--watch", action="store_true", help="print hotplug changes until Ctrl+C")
+    args = parser.parse_args()
+
+    def report(added, removed):
+        for probe in added:
+            print(f"+ {probe.describe()}")
+        for probe in removed:
+            print(f"- {probe.describe()}")
+
+    inventory = ProbeInventory(args.sysfs)
+    for probe in inventory.probes():
+        print(probe.describe())
+    print(f"{len(inventory.serials())} XDS110 probe(s)")
+
+    if args.watch:
+        inventory.on_change = report
+        inventory.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        inventory.close()
+
+
+if __name__ == "__main__":
+    main()
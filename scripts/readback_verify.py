@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+CC2650 Readback Verification
+Host-side compare of device flash (or a readback dump) against the flashed image
+
+Features:
+- Reports every mismatched address range, not just pass/fail
+- memoryview block compare; NumPy is used when installed
+- Reads the device through a flash backend, or loads a dump file
+  (.bin, or any format image_staging understands)
+- Benchmark: python readback_verify.py --bench
+
+Usage:
+    python readback_verify.py --folder single_flash --dump readback.bin
+    python readback_verify.py --folder single_flash --serial L1000ABC
+"""
+
+import argparse
+import sys
+import time
+
+from flash_backend import FLASH_BASE, DSLiteBackend
+from image_staging import FILL_BYTE, ImageCache, flatten, load_segments
+from incremental_flash import FLASH_SIZE
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+BLOCK_SIZE = 256
+MAX_REPORTED_RANGES = 8
+
+
+def _ranges_numpy(expected, actual):
+    diff = numpy.flatnonzero(numpy.frombuffer(expected, dtype=numpy.uint8)
+                             != numpy.frombuffer(actual, dtype=numpy.uint8))
+    if not len(diff):
+        return []
+    breaks = numpy.flatnonzero(numpy.diff(diff) > 1)
+    starts = numpy.concatenate(([diff[0]], diff[breaks + 1]))
+    ends = numpy.concatenate((diff[breaks], [diff[-1]])) + 1
+    return [[int(start), int(end)] for start, end in zip(starts, ends)]
+
+
+def _ranges_memoryview(expected, actual):
+    ranges = []
+    expected = memoryview(expected)
+    actual = memoryview(actual)
+    for block in range(0, len(expected), BLOCK_SIZE):
+        stop = min(block + BLOCK_SIZE, len(expected))
+        if expected[block:stop] == actual[block:stop]:
+            continue
+        for offset in range(block, stop):
+            if expected[offset] != actual[offset]:
+                if ranges and ranges[-1][1] == offset:
+                    ranges[-1][1] = offset + 1
+                else:
+                    ranges.append([offset, offset + 1])
+    return ranges
+
+
+def mismatched_ranges(expected, actual, use_numpy=None):
+    """[start, end) offsets where actual differs from expected; a short
+    readback counts as a mismatch over the missing tail"""
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    length = min(len(expected), len(actual))
+    if expected[:length] == actual[:length]:
+        ranges = []
+    elif use_numpy:
+        ranges = _ranges_numpy(expected[:length], actual[:length])
+    else:
+        ranges = _ranges_memoryview(expected[:length], actual[:length])
+    if len(actual) < len(expected):
+        if ranges and ranges[-1][1] == length:
+            ranges[-1][1] = len(expected)
+        else:
+            ranges.append([length, len(expected)])
+    return [tuple(r) for r in ranges]
+
+
+class VerifyResult:
+    """Outcome of one readback compare"""
+
+    def __init__(self, ranges=(), base=FLASH_BASE, size=0, seconds=0.0, error=None):
+        self.ranges = list(ranges)
+        self.base = base
+        self.size = size
+        self.seconds = seconds
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None and not self.ranges
+
+    @property
+    def mismatched_bytes(self):
+        return sum(end - start for start, end in self.ranges)
+
+    def describe(self):
+        """One-line summary with the first few mismatched address ranges"""
+        if self.error:
+            return f"readback verify not possible: {self.error}"
+        if not self.ranges:
+            return (f"readback matches image ({self.size} bytes, "
+                    f"compared in {1000 * self.seconds:.1f} ms)")
+        shown = ", ".join(f"0x{self.base + start:08x}-0x{self.base + end - 1:08x}"
+                          for start, end in self.ranges[:MAX_REPORTED_RANGES])
+        more = len(self.ranges) - MAX_REPORTED_RANGES
+        if more > 0:
+            shown += f", ... {more} more"
+        return (f"{self.mismatched_bytes} byte(s) differ in {len(self.ranges)} range(s): {shown}")
+
+
+def compare(expected, actual, base=FLASH_BASE):
+    """VerifyResult for image bytes against readback bytes"""
+    started = time.perf_counter()
+    ranges = mismatched_ranges(expected, actual)
+    return VerifyResult(ranges, base, len(expected), time.perf_counter() - started)
+
+
+def verify_device(backend, serial, expected, base=FLASH_BASE):
+    """Read the device back through a backend and compare it with the image"""
+    actual = backend.readback(serial, base, len(expected))
+    if actual is None:
+        return VerifyResult(base=base, size=len(expected),
+                            error=f"{backend.name} backend could not read the device")
+    return compare(expected, actual, base)
+
+
+def load_dump(path, base=FLASH_BASE):
+    """Readback dump as flat bytes from base"""
+    if path.lower().endswith(".bin"):
+        with open(path, "rb") as f:
+            return f.read()
+    return flatten(load_segments(path), base=base)
+
+
+def verify_dump(path, expected, base=FLASH_BASE):
+    """Compare a readback dump file with the image"""
+    return compare(expected, load_dump(path, base), base)
+
+
+def benchmark(runs=50, corrupt=3):
+    """Time full-device compares with a few corrupted ranges"""
+    image = bytes((i * 7) & 0xFF for i in range(FLASH_SIZE))
+    readback = bytearray(image)
+    for n in range(corrupt):
+        offset = (n * 37 * 1024) % FLASH_SIZE
+        readback[offset:offset + 16] = bytes([FILL_BYTE]) * 16
+    readback = bytes(readback)
+
+    timings = {}
+    for name, use_numpy in (("memoryview", False), ("numpy", True)):
+        if use_numpy and numpy is None:
+            continue
+        started = time.perf_counter()
+        for _ in range(runs):
+            ranges = mismatched_ranges(image, readback, use_numpy)
+        timings[name] = 1000 * (time.perf_counter() - started) / runs
+    started = time.perf_counter()
+    for _ in range(runs):
+        mismatched_ranges(image, image)
+    timings["identical"] = 1000 * (time.perf_counter() - started) / runs
+    return {"bytes": FLASH_SIZE, "ranges": len(ranges), "ms_per_compare": timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify CC2650 flash against a package image")
+    parser.add_argument("--folder", help="package whose staged image is expected")
+    parser.add_argument("--dump", help="readback dump file to compare")
+    parser.add_argument("--serial", help="probe serial to read back through DSLite")
+    parser.add_argument("--bench", action="store_true", help="time compares of a 128 KB image")
+    args = parser.parse_args()
+
+    if args.bench:
+        result = benchmark()
+        for name, ms in result["ms_per_compare"].items():
+            print(f"{name:12} {ms:.3f} ms per {result['bytes']} byte compare")
+        return 0
+    if not args.folder:
+        parser.print_help()
+        return 2
+
+    staged = ImageCache().stage(args.folder)
+    expected = staged.read()
+    if args.dump:
+        result = verify_dump(args.dump, expected, staged.base)
+    else:
+        result = verify_device(DSLiteBackend(args.folder), args.serial, expected, staged.base)
+    print(result.describe())
+    return 0 if result.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
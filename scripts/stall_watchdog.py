@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+CC2650 Stall Watchdog
+Notices flash jobs that stop producing output and tears down their whole process tree
+
+dslite.bat runs through a shell on Windows, and DSLite itself starts
+ccs_base_app helpers; terminating the Popen only ends the outermost process
+and can leave the real flasher holding the probe. Flash tools are therefore
+started in their own process group and always killed as a group / tree.
+
+Features:
+- popen_group_kwargs(): Popen arguments for a new process group (POSIX session,
+  Windows CREATE_NEW_PROCESS_GROUP)
+- kill_tree(): kills the group (killpg / taskkill /T, plus psutil children when
+  installed) and reaps the leader
+- tree_cpu_seconds(): CPU used by a job's process group (psutil, or /proc on Linux)
+- StallWatchdog: one background thread checking every watched job; a job with no
+  output for stall_seconds is a stall unless its tree is still burning CPU, and
+  is a stall regardless once idle for hard_factor x stall_seconds
+
+Usage:
+    python stall_watchdog.py --stall 5 -- some_command --with args
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_STALL_SECONDS = 30.0
+DEFAULT_BUSY_CPU = 0.05
+DEFAULT_HARD_FACTOR = 4
+DEFAULT_INTERVAL = 1.0
+KILL_WAIT_SECONDS = 5.0
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def popen_group_kwargs():
+    """Extra Popen arguments that put the child in its own process group"""
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def _children(pid):
+    if psutil is None:
+        return []
+    try:
+        return psutil.Process(pid).children(recursive=True)
+    except psutil.Error:
+        return []
+
+
+def kill_tree(process, wait=KILL_WAIT_SECONDS):
+    """Kill a Popen and everything it started; True once the leader has exited"""
+    # Collect descendants first: once the leader dies they are re-parented
+    children = _children(process.pid)
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        try:
+            # Only a leader that is still there (or a zombie) proves the group is ours;
+            # a reaped pid may already belong to someone else
+            if os.getpgid(process.pid) == process.pid:
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                # Not started with popen_group_kwargs(): never signal our own group
+                process.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+    for child in children:
+        try:
+            child.kill()
+        except psutil.Error:
+            pass
+    if process.poll() is None:
+        try:
+            process.kill()
+            process.wait(timeout=wait)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+    return process.poll() is not None
+
+
+def _proc_group_cpu(pgid):
+    total = 0
+    found = False
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # Fields after the parenthesised command: state ppid pgrp ... utime(14) stime(15)
+        fields = stat[stat.rfind(b")") + 2:].split()
+        if int(fields[2]) == pgid:
+            total += int(fields[11]) + int(fields[12])
+            found = True
+    return total / _CLOCK_TICKS if found else None
+
+
+def tree_cpu_seconds(process):
+    """User + system CPU of a job's process tree, or None if it cannot be measured"""
+    if psutil is not None:
+        try:
+            root = psutil.Process(process.pid)
+            total = 0.0
+            for proc in [root] + root.children(recursive=True):
+                try:
+                    times = proc.cpu_times()
+                    total += times.user + times.system
+                except psutil.Error:
+                    pass
+            return total
+        except psutil.Error:
+            return None
+    if os.path.isdir("/proc"):
+        return _proc_group_cpu(process.pid)
+    return None
+
+
+class Watch:
+    """One watched process; call touch() for every output line"""
+
+    def __init__(self, watchdog, process, on_stall):
+        self.watchdog = watchdog
+        self.process = process
+        self.on_stall = on_stall
+        self.started = time.monotonic()
+        self.last_output = self.started
+        self.cpu = None
+        self.cpu_at = None
+        self.cpu_rate = None
+        self.stalled = None
+
+    def touch(self):
+        """Record output activity"""
+        self.last_output = time.monotonic()
+
+    @property
+    def idle(self):
+        return time.monotonic() - self.last_output
+
+    def cancel(self):
+        """Stop watching"""
+        self.watchdog.unwatch(self)
+
+
+class StallWatchdog:
+    """Background check of output inactivity and CPU for running flash jobs"""
+
+    def __init__(self, stall_seconds=DEFAULT_STALL_SECONDS, busy_cpu=DEFAULT_BUSY_CPU,
+                 hard_factor=DEFAULT_HARD_FACTOR, interval=DEFAULT_INTERVAL):
+        self.stall_seconds = stall_seconds
+        self.busy_cpu = busy_cpu
+        self.hard_factor = hard_factor
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._watches = set()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stalls = 0
+
+    def watch(self, process, on_stall):
+        """Start watching a process; on_stall(watch) runs on the watchdog thread"""
+        watch = Watch(self, process, on_stall)
+        with self._lock:
+            self._watches.add(watch)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stall-watchdog",
+                                                daemon=True)
+                self._thread.start()
+        return watch
+
+    def unwatch(self, watch):
+        """Stop watching"""
+        with self._lock:
+            self._watches.discard(watch)
+
+    def close(self):
+        """Stop the watchdog thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                watches = list(self._watches)
+            for watch in watches:
+                if self._stalled(watch):
+                    self.unwatch(watch)
+                    self.stalls += 1
+                    watch.stalled = time.monotonic()
+                    try:
+                        watch.on_stall(watch)
+                    except Exception:
+                        pass
+
+    def _stalled(self, watch):
+        if watch.process.poll() is not None:
+            return False
+        idle = watch.idle
+        if idle < self.stall_seconds:
+            watch.cpu = None
+            return False
+
+        # Quiet but busy (e.g. a long erase) is not a stall until the hard limit
+        now = time.monotonic()
+        cpu = tree_cpu_seconds(watch.process)
+        if cpu is not None and watch.cpu is not None and now > watch.cpu_at:
+            watch.cpu_rate = (cpu - watch.cpu) / (now - watch.cpu_at)
+        watch.cpu, watch.cpu_at = cpu, now
+        if idle >= self.stall_seconds * self.hard_factor:
+            return True
+        if cpu is None:
+            return True
+        return watch.cpu_rate is not None and watch.cpu_rate < self.busy_cpu
+
+
+def describe_stall(watch):
+    """One-line description of why a watch fired"""
+    cpu = "unknown" if watch.cpu_rate is None else f"{100 * watch.cpu_rate:.1f}%"
+    return f"no output for {watch.idle:.1f} s, process tree CPU {cpu}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a command under the stall watchdog")
+    parser.add_argument("--stall", type=float, default=DEFAULT_STALL_SECONDS,
+                        help="seconds without output before the command counts as hung")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="command to run")
+    args = parser.parse_args()
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        parser.print_help()
+        return 2
+
+    watchdog = StallWatchdog(stall_seconds=args.stall)
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               text=True, bufsize=1, **popen_group_kwargs())
+
+    def on_stall(watch):
+        print(f"WATCHDOG: {describe_stall(watch)}; killing process tree", flush=True)
+        kill_tree(process)
+
+    watch = watchdog.watch(process, on_stall)
+    for line in iter(process.stdout.readline, ''):
+        watch.touch()
+        print(line.rstrip("\r\n"), flush=True)
+    process.wait()
+    watch.cancel()
+    watchdog.close()
+    if watch.stalled:
+        print(f"WATCHDOG: released after {time.monotonic() - watch.last_output:.1f} s idle")
+    return process.returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# Station state (~/.cc2650_jig) goes to a throwaway home, set before any module
+# computes its default paths
+_HOME = tempfile.mkdtemp(prefix="cc2650_tests_")
+os.environ["HOME"] = os.environ["USERPROFILE"] = _HOME
+os.environ.setdefault("FAKE_DSLITE_LATENCY", "0.1")
+
+# The jig scripts are flat modules run from scripts/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
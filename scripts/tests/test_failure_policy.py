@@ -0,0 +1,76 @@
+import os
+
+from failure_policy import AdaptiveTimeouts, seed_metrics
+from flash_core import FlashStation
+from flash_history import FlashHistory
+from phase_metrics import KIND_FULL, KIND_INCREMENTAL, PhaseMetrics
+
+
+def _mixed_runs(observe):
+    # A full flash programs for ~10 s, a sector patch for ~0.4 s
+    for index in range(40):
+        if index % 4 == 0:
+            observe({"connect": 1.0, "program": 10.0 + index / 100}, KIND_FULL)
+        else:
+            observe({"connect": 1.0, "program": 0.4}, KIND_INCREMENTAL)
+
+
+def test_program_budget_is_learned_per_job_kind():
+    metrics = PhaseMetrics()
+    timeouts = AdaptiveTimeouts(metrics, min_samples=10)
+    _mixed_runs(lambda durations, kind: metrics.observe_run("P1", durations, kind))
+
+    # Mostly incremental runs must not squeeze the budget of the next full flash
+    assert timeouts.phase("program", "P1", KIND_FULL) >= 30.0
+    assert timeouts.phase("program", "P1", KIND_INCREMENTAL) == timeouts.minimum
+    # Connect does not depend on what is written, so every run counts
+    assert timeouts.phase("connect", "P1", KIND_FULL) == timeouts.minimum
+    assert timeouts.phase("connect", "P1", KIND_INCREMENTAL) == timeouts.minimum
+
+
+def test_unlearned_kind_keeps_the_default():
+    metrics = PhaseMetrics()
+    timeouts = AdaptiveTimeouts(metrics, min_samples=10)
+    for _ in range(20):
+        metrics.observe_run("P1", {"program": 0.4}, KIND_INCREMENTAL)
+    assert timeouts.phase("program", "P1", KIND_FULL) == timeouts.default
+
+
+def test_seeded_history_keeps_kinds_apart(tmp_path):
+    history = FlashHistory(os.path.join(str(tmp_path), "history.db"))
+    started = [1000.0]
+
+    def record(durations, kind):
+        started[0] += 60
+        history.record(probe_id="P1", started_at=started[0], status="passed",
+                       phases=durations, kind=kind)
+
+    _mixed_runs(record)
+    history.flush()
+    metrics = PhaseMetrics()
+    assert seed_metrics(metrics, history) == 40
+    history.close()
+
+    timeouts = AdaptiveTimeouts(metrics, min_samples=10)
+    assert timeouts.phase("program", "P1", KIND_FULL) >= 30.0
+    assert timeouts.phase("program", "P1", KIND_INCREMENTAL) == timeouts.minimum
+
+
+def test_station_learns_timeouts_on_its_first_scheduler(tmp_path):
+    history = FlashHistory(os.path.join(str(tmp_path), "history.db"))
+    for index in range(5):
+        history.record(probe_id="P1", started_at=1000.0 + index, status="passed",
+                       phases={"program": 10.0}, kind=KIND_FULL)
+    history.flush()
+    station = FlashStation(history=history, post_workers=0)
+    try:
+        assert station.learned_runs is None
+        station.scheduler().shutdown()
+        assert station.learned_runs == 5
+        assert station.metrics.samples("program", "P1", KIND_FULL) == 5
+        # Later schedulers on the same station do not feed the history in again
+        station.scheduler().shutdown()
+        assert station.metrics.samples("program", "P1", KIND_FULL) == 5
+    finally:
+        station.close()
+        history.close()
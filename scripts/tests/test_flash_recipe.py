@@ -0,0 +1,67 @@
+import os
+import stat
+
+import pytest
+
+from fake_dslite import make_package
+from flash_recipe import (PACKAGE_TOOL, RecipeCache, is_package, package_error, resolve,
+                          tool_platform)
+
+
+def _executable(path, text="#!/bin/sh\n"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+    return path
+
+
+@pytest.fixture
+def package(tmp_path):
+    folder = make_package(str(tmp_path / "pkg"))
+    os.remove(os.path.join(folder, "flash_recipe.json"))
+    return folder
+
+
+def test_package_dslite_gets_the_flash_argv(package):
+    tool = _executable(os.path.join(package, PACKAGE_TOOL.format(platform=tool_platform())))
+    recipe = resolve(package)
+    command = recipe.command("probe.ccxml")
+    assert command[:4] == [tool, "flash", "-c", "probe.ccxml"]
+    assert command[-1].endswith("combined_firmware.bin")
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX launcher rules")
+def test_batch_launcher_is_never_run_on_posix(package):
+    # A Windows export on a Linux station: dslite.bat is there but cannot run
+    os.remove(os.path.join(package, "dslite.sh"))
+    _executable(os.path.join(package, "dslite.bat"), "@echo off\r\n")
+    with pytest.raises(FileNotFoundError, match="No DSLite executable"):
+        resolve(package)
+    assert not is_package(package)
+    assert "No DSLite executable" in package_error(package)
+
+
+def test_package_without_batch_file(tmp_path):
+    folder = make_package(str(tmp_path / "pkg"))
+    for name in ("dslite.bat", "dslite_session.bat"):
+        if os.path.exists(os.path.join(folder, name)):
+            os.remove(os.path.join(folder, name))
+    # The recipe's tool is all it takes
+    assert is_package(folder)
+    assert is_package(folder, RecipeCache())
+    assert not is_package(str(tmp_path))
+    assert "No target configuration" in package_error(str(tmp_path))
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX launcher rules")
+def test_launcher_only_flashes_package_defaults(package):
+    launcher = _executable(os.path.join(package, "dslite.sh"))
+    recipe = resolve(package)
+    assert recipe.command() == [launcher]
+    with pytest.raises(FileNotFoundError, match="needs the DSLite executable"):
+        recipe.command("probe.ccxml")
+    with pytest.raises(FileNotFoundError):
+        recipe.command(files=["chunk.bin,0x0"])
+    with pytest.raises(FileNotFoundError):
+        recipe.readback_command(None, 0, 16, "out.bin")
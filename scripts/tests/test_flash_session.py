@@ -0,0 +1,48 @@
+import json
+import os
+import shutil
+
+from fake_dslite import make_package
+from flash_session import SessionPool
+
+
+def _package(tmp_path):
+    folder = make_package(str(tmp_path / "pkg"))
+    configs = os.path.join(folder, "user_files", "configs")
+    shutil.copy(os.path.join(configs, "cc2650f128.ccxml"), os.path.join(configs, "line2.ccxml"))
+    recipe = os.path.join(folder, "flash_recipe.json")
+    with open(recipe) as f:
+        spec = json.load(f)
+    spec.update(ccxml="user_files/configs/line2.ccxml", options={"FlashVerificationSelection": "1"})
+    with open(recipe, "w") as f:
+        json.dump(spec, f)
+    return folder
+
+
+def test_session_uses_the_resolved_recipe(tmp_path):
+    pool = SessionPool(work_root=str(tmp_path / "sessions"))
+    try:
+        session = pool.get(_package(tmp_path), "L4100001")
+        ccxml = session.command[1]
+        assert os.path.basename(ccxml) == "line2.ccxml"
+        assert os.path.dirname(ccxml) == str(tmp_path / "sessions" / "L4100001")
+        assert session.command[-2:] == ["-s", "FlashVerificationSelection=1"]
+    finally:
+        pool.close_all()
+
+
+def test_broken_session_is_closed_before_replacing_it(tmp_path):
+    folder = _package(tmp_path)
+    pool = SessionPool(work_root=str(tmp_path / "sessions"))
+    try:
+        session = pool.get(folder, "L4100001")
+        # Lost track of the protocol, but the tool is still running
+        session.broken = True
+        assert session.process.poll() is None
+
+        replacement = pool.get(folder, "L4100001")
+        assert replacement is not session and replacement.alive
+        assert session.process.poll() is not None
+        assert pool.started == 2
+    finally:
+        pool.close_all()
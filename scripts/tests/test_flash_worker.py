@@ -0,0 +1,130 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from fake_dslite import make_package
+from flash_worker import FlashWorker, WorkerServer
+
+
+class StubWorker:
+    """Answers every accepted job with a result shortly after"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, request, listener=None):
+        if request.get("reject"):
+            raise ValueError("rejected")
+        self.submitted.append(request["id"])
+        threading.Timer(0.05, listener, args=({"event": "result", "job": request["id"]},)).start()
+        return request["id"]
+
+    def status(self):
+        return {"event": "status", "completed": len(self.submitted)}
+
+
+@pytest.fixture
+def server():
+    worker = StubWorker()
+    server = WorkerServer(worker, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _exchange(server, lines):
+    with socket.create_connection(server.server_address, timeout=5) as sock:
+        sock.sendall(b"".join(line + b"\n" for line in lines))
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile("rb") as f:
+            return [json.loads(line) for line in f]
+
+
+def test_invalid_first_line_is_an_error_not_a_crash(server):
+    events = _exchange(server, [b"not json", b'{"id": "a"}'])
+    assert events[0]["event"] == "error"
+    assert {"event": "result", "job": "a"} in events
+
+
+def test_failed_line_keeps_earlier_job_with_same_id(server):
+    events = _exchange(server, [b'{"id": "a"}', b"{broken", b'{"id": "a", "reject": true}'])
+    assert [e["event"] for e in events].count("error") == 2
+    # The connection waited for job a although later lines failed
+    assert events[-1] == {"event": "result", "job": "a"}
+
+
+def test_non_object_and_status_lines(server):
+    events = _exchange(server, [b"[1, 2]", b'{"cmd": "status"}', b'{"id": "b", "reject": 1}'])
+    assert events[0]["event"] == "error"
+    assert events[1]["event"] == "status"
+    assert events[2] == {"event": "error", "error": "rejected"}
+    assert server.worker.submitted == []
+
+
+def test_jobs_without_id_get_one(server):
+    events = _exchange(server, [b'{"folder": "x"}'])
+    assert events[0]["event"] == "result" and events[0]["job"] == server.worker.submitted[0]
+
+
+def _wait(predicate, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def flash_worker(tmp_path):
+    worker = FlashWorker(max_parallel=2, default_folder=make_package(str(tmp_path / "pkg")))
+    yield worker
+    worker.shutdown()
+
+
+def test_slow_listener_does_not_block_dispatch(flash_worker):
+    release = threading.Event()
+    results = []
+
+    def slow(event):
+        if event["event"] == "accepted" and event["job"] == "a":
+            release.wait(10)
+        if event["event"] == "result":
+            results.append(event["job"])
+
+    flash_worker.add_listener(slow)
+    blocked = threading.Thread(target=flash_worker.submit, args=({"id": "a", "serial": "P1"},))
+    blocked.start()
+    assert _wait(flash_worker._delivery.locked)
+
+    # Delivery is stuck in a client, yet another probe's job is taken and started
+    started = time.monotonic()
+    flash_worker.submit({"id": "b", "serial": "P2"})
+    assert time.monotonic() - started < 1
+    assert _wait(lambda: "P2" in flash_worker.status()["running"] or
+                 flash_worker.completed)
+
+    release.set()
+    blocked.join(10)
+    assert _wait(lambda: sorted(results) == ["a", "b"])
+
+
+def test_unit_serial_must_be_safe(flash_worker):
+    for bad in ("../../etc/passwd", "a/b", "", ".hidden", "x" * 65):
+        with pytest.raises(ValueError):
+            flash_worker.submit({"unit_serial": bad})
+    assert flash_worker.submit({"id": "c", "unit_serial": "CC-000042.1"}) == "c"
+    assert _wait(flash_worker.idle)
+
+
+def test_submit_checks_the_package_recipe(flash_worker, tmp_path):
+    with pytest.raises(ValueError, match="No target configuration"):
+        flash_worker.submit({"folder": str(tmp_path)})
+    # The default package has no dslite.bat on POSIX, only its recipe and dslite.sh
+    assert flash_worker.submit({"id": "d"}) == "d"
+    assert _wait(flash_worker.idle)
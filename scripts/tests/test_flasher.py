@@ -0,0 +1,32 @@
+import sys
+
+import pytest
+
+import flasher
+from fake_dslite import make_package
+from image_check import FlashRecords
+
+
+def _main(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["flasher.py", *argv])
+    with pytest.raises(SystemExit) as exit_info:
+        flasher.main()
+    return exit_info.value.code
+
+
+def test_provision_needs_field_and_value(monkeypatch, capsys):
+    assert _main(monkeypatch, "--provision", "ble_mac") == 2
+    assert "expected FIELD=VALUE, got 'ble_mac'" in capsys.readouterr().err
+    assert _main(monkeypatch, "--provision", "=00:12") == 2
+
+
+def test_unit_options_need_a_single_probe(monkeypatch, capsys):
+    assert _main(monkeypatch, "--serial", "P1", "--serial", "P2", "--unit-serial", "CC-1") == 2
+    assert "--unit-serial flash a single unit" in capsys.readouterr().err
+    assert _main(monkeypatch, "--worker", "--verify-dump", "dump.bin") == 2
+
+
+def test_gang_with_one_probe_keeps_the_unit_serial(monkeypatch, tmp_path):
+    folder = make_package(str(tmp_path / "pkg"))
+    assert _main(monkeypatch, "--folder", folder, "--serial", "P1", "--unit-serial", "CC-7") == 0
+    assert FlashRecords().get("CC-7") is not None
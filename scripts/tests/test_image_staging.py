@@ -0,0 +1,60 @@
+import os
+import threading
+
+from fake_dslite import make_package
+from flash_core import SLOT_PASSED, FlashStation
+from image_staging import ImageCache
+from uniflash_package import find_image, package_images
+
+TI_TXT = "@0000\n01 02 03 04\n@0010\nAA BB\nq\n"
+
+
+def _images(folder):
+    return os.path.join(folder, "user_files", "images")
+
+
+def test_readme_in_images_is_not_an_image(tmp_path):
+    folder = make_package(str(tmp_path / "pkg"))
+    with open(os.path.join(_images(folder), "README.txt"), "w") as f:
+        f.write("Combined BLE stack + app, build 42\n")
+
+    assert [os.path.basename(p) for p in package_images(folder)] == ["combined_firmware.bin"]
+    assert os.path.basename(find_image(folder)) == "combined_firmware.bin"
+    staged = ImageCache(str(tmp_path / "staged")).stage(folder)
+    assert not staged.converted
+
+
+def test_ti_txt_is_recognised_by_content(tmp_path):
+    folder = make_package(str(tmp_path / "pkg"))
+    os.remove(os.path.join(_images(folder), "combined_firmware.bin"))
+    with open(os.path.join(_images(folder), "firmware.txt"), "w") as f:
+        f.write(TI_TXT)
+
+    staged = ImageCache(str(tmp_path / "staged")).stage(folder)
+    data = staged.read()
+    assert data[:4] == b"\x01\x02\x03\x04" and data[0x10:0x12] == b"\xaa\xbb"
+
+
+def test_unstageable_image_still_flashes_with_skip_identical(tmp_path):
+    folder = make_package(str(tmp_path / "pkg"))
+    os.remove(os.path.join(_images(folder), "combined_firmware.bin"))
+    with open(os.path.join(_images(folder), "firmware.hex"), "w") as f:
+        f.write("this is not intel hex\n")
+
+    station = FlashStation(post_workers=0)
+    done = threading.Event()
+    finished = {}
+
+    def on_status(slot, status, job):
+        if job.finished:
+            finished["status"] = status
+            done.set()
+
+    scheduler = station.scheduler(on_status=on_status)
+    try:
+        scheduler.submit(1, folder, skip_identical=True)
+        assert done.wait(30)
+        assert finished["status"] == SLOT_PASSED
+    finally:
+        scheduler.shutdown()
+        station.close()
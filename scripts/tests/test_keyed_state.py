@@ -0,0 +1,120 @@
+import os
+
+from flash_backend import FLASH_BASE, FakeBackend
+from image_check import FlashRecords, check_identical, image_digest
+from incremental_flash import SECTOR_SIZE, LastImages, plan_incremental
+
+IMAGE = bytes((i * 7) & 0xFF for i in range(2 * SECTOR_SIZE))
+
+
+def _package(tmp_path, data=IMAGE):
+    images = tmp_path / "pkg" / "user_files" / "images"
+    images.mkdir(parents=True)
+    (images / "firmware.bin").write_bytes(data)
+    return str(tmp_path / "pkg"), str(images / "firmware.bin")
+
+
+def test_probe_record_never_skips_a_new_board(tmp_path):
+    folder, image = _package(tmp_path)
+    records = FlashRecords(str(tmp_path / "records.json"))
+    # Whatever the probe flashed last, the board now on it is unknown
+    records.update("L1000A", image_digest(image))
+
+    identical, _, _ = check_identical(folder, "L1000A", FakeBackend(), records)
+    assert not identical
+    identical, _, _ = check_identical(folder, "L1000A", None, records, unit_serial="CC000002")
+    assert not identical
+
+
+def test_unit_record_skips_that_unit(tmp_path):
+    folder, image = _package(tmp_path)
+    records = FlashRecords(str(tmp_path / "records.json"))
+    records.update("CC000001", image_digest(image))
+    records.update(None, image_digest(image))
+
+    identical, reason, _ = check_identical(folder, "L1000A", None, records,
+                                           unit_serial="CC000001")
+    assert identical and "CC000001" in reason
+    assert FlashRecords(records.path).get(None) is None
+
+
+def test_readback_decides_before_records(tmp_path):
+    folder, image = _package(tmp_path)
+    backend = FakeBackend()
+    backend.program("L1000A", IMAGE)
+    assert check_identical(folder, "L1000A", backend)[0]
+
+    backend.program("L1000A", b"\x00" * 16)
+    records = FlashRecords(str(tmp_path / "records.json"))
+    records.update("CC000001", image_digest(image))
+    assert not check_identical(folder, "L1000A", backend, records, unit_serial="CC000001")[0]
+
+
+def test_incremental_needs_unit_archive_and_device_match(tmp_path):
+    archive = LastImages(str(tmp_path / "last"))
+    backend = FakeBackend()
+    new = IMAGE[:SECTOR_SIZE] + bytes(SECTOR_SIZE)
+
+    plan, _ = plan_incremental(None, None, archive, backend, "L1000A", new=new)
+    assert plan is None
+    plan, _ = plan_incremental(None, "CC000001", archive, backend, "L1000A", new=new)
+    assert plan is None
+
+    archive.save("CC000001", IMAGE)
+    # Archived, but the device was never read: full flash
+    plan, _ = plan_incremental(None, "CC000001", archive, backend, "L1000A", new=new)
+    assert plan is None
+    plan, _ = plan_incremental(None, "CC000001", archive, None, "L1000A", new=new)
+    assert plan is None
+
+    backend.program("L1000A", IMAGE)
+    plan, _ = plan_incremental(None, "CC000001", archive, backend, "L1000A", new=new)
+    assert plan.sectors == [1]
+
+
+def test_incremental_new_board_on_same_probe_is_full_flash(tmp_path):
+    archive = LastImages(str(tmp_path / "last"))
+    archive.save("CC000001", IMAGE)
+    backend = FakeBackend()
+    backend.erase("L1000A")
+
+    # A blank board must never come out as "no sectors changed"
+    plan, reason = plan_incremental(None, "CC000001", archive, backend, "L1000A", new=IMAGE)
+    assert plan is None and "full flash" in reason
+
+
+def test_incremental_checks_stale_data_past_the_old_image(tmp_path):
+    archive = LastImages(str(tmp_path / "last"))
+    archive.save("CC000001", IMAGE[:SECTOR_SIZE])
+    backend = FakeBackend()
+    backend.program("L1000A", IMAGE)
+
+    new = IMAGE[:SECTOR_SIZE] + b"\xff" * SECTOR_SIZE
+    plan, _ = plan_incremental(None, "CC000001", archive, backend, "L1000A", new=new)
+    assert plan is None
+
+
+def test_archive_forget_and_missing_unit(tmp_path):
+    archive = LastImages(str(tmp_path / "last"))
+    archive.save(None, IMAGE)
+    assert not os.path.exists(archive.folder)
+    archive.save("CC000001", IMAGE)
+    assert archive.load("CC000001") == IMAGE
+    archive.forget("CC000001")
+    assert archive.load("CC000001") is None
+
+
+def test_plan_uses_staged_base():
+    archive_base = FLASH_BASE + 0x1000
+    backend = FakeBackend()
+    backend.program("L1000A", IMAGE, archive_base)
+
+    class Archive:
+        def load(self, unit_serial):
+            return IMAGE
+
+    new = bytes(SECTOR_SIZE) + IMAGE[SECTOR_SIZE:]
+    plan, _ = plan_incremental(None, "CC000001", Archive(), backend, "L1000A", new=new,
+                               base=archive_base)
+    assert plan.sectors == [0]
+    assert plan.chunks()[0][0] == archive_base
@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+
+import pytest
+
+from fake_dslite import make_package
+from flash_worker import FlashWorker
+from line_coordinator import (JOB_DONE, JOB_FAILED, JOB_QUEUED, SERIAL_USED, SERIAL_VOID,
+                              CoordinatorClient, CoordinatorServer, JobQueue, LineStation)
+
+
+def _wait(predicate, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def coordinator(tmp_path):
+    jobs = JobQueue(os.path.join(str(tmp_path), "line_queue.db"), "T-", lease_seconds=30)
+    server = CoordinatorServer(jobs, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    jobs.close()
+
+
+@pytest.fixture
+def clients(coordinator):
+    opened = []
+
+    def connect():
+        client = CoordinatorClient(coordinator.server_address)
+        opened.append(client)
+        return client
+
+    yield connect
+    for client in opened:
+        client.close()
+
+
+def _serials(jobs):
+    with jobs._lock:
+        return {row["serial"]: row["state"]
+                for row in jobs._conn.execute("SELECT serial, state FROM serials")}
+
+
+def test_expired_lease_is_requeued_under_a_fresh_serial(coordinator, clients):
+    jobs = coordinator.jobs
+    station_a, station_b = clients(), clients()
+    station_a.request("submit", folder="pkg", count=1)
+
+    lost = station_a.request("lease", station="A", limit=2)["jobs"]
+    assert len(lost) == 1 and lost[0]["unit_serial"] == "T-000001"
+    # Station A went quiet; its lease runs out
+    assert jobs.requeue_expired(now=time.time() + 31) == [lost[0]["id"]]
+    assert jobs.status()["jobs"][JOB_QUEUED] == 1
+
+    taken = station_b.request("lease", station="B", limit=1)["jobs"]
+    assert [job["id"] for job in taken] == [lost[0]["id"]]
+    assert taken[0]["unit_serial"] == "T-000002"
+    assert station_a.request("heartbeat", station="A", tokens=[lost[0]["token"]])["lost"] == \
+        [lost[0]["token"]]
+
+    # A's late result is rejected, B's counts
+    assert not station_a.request("complete", token=lost[0]["token"],
+                                 result={"status": "passed"})["accepted"]
+    assert station_b.request("complete", token=taken[0]["token"],
+                             result={"status": "passed"})["accepted"]
+    assert jobs.status()["jobs"][JOB_DONE] == 1
+    assert _serials(jobs) == {"T-000001": SERIAL_VOID, "T-000002": SERIAL_USED}
+
+
+def test_voided_serial_is_never_issued_again(coordinator, clients):
+    jobs = coordinator.jobs
+    station_a, station_b = clients(), clients()
+    station_a.request("submit", folder="pkg", count=3)
+
+    first = station_a.request("lease", station="A", limit=1)["jobs"][0]
+    assert station_a.request("complete", token=first["token"],
+                             result={"status": "failed", "error": "verify"})["accepted"]
+    # A stopped job goes back to the queue but gives up its serial
+    second = station_b.request("lease", station="B", limit=1)["jobs"][0]
+    assert station_b.request("complete", token=second["token"],
+                             result={"status": "stopped"})["accepted"]
+    assert station_a.request("release", station="A")["requeued"] == 0
+
+    issued = [job["unit_serial"] for job in station_a.request("lease", station="A", limit=3)["jobs"]]
+    assert first["unit_serial"] not in issued and second["unit_serial"] not in issued
+    assert jobs.status()["jobs"][JOB_FAILED] == 1
+
+    # The counter survives a coordinator restart
+    reopened = JobQueue(jobs.path, "T-")
+    try:
+        reopened.submit(folder="pkg")
+        serial = reopened.lease("C")[0]["unit_serial"]
+    finally:
+        reopened.close()
+    assert issued == ["T-000003", "T-000004"] and serial == "T-000005"
+
+
+def test_job_lost_by_every_station_fails(coordinator):
+    jobs = coordinator.jobs
+    jobs.submit(folder="pkg")
+    for station in ("A", "B", "C"):
+        assert len(jobs.lease(station)) == 1
+        jobs.requeue_expired(now=time.time() + 31)
+    assert jobs.status()["jobs"][JOB_FAILED] == 1
+    assert jobs.lease("D") == []
+
+
+def test_two_stations_flash_every_job_once(coordinator, clients, tmp_path):
+    folder = make_package(str(tmp_path / "pkg"))
+    coordinator.jobs.submit(folder=folder, count=6, lot="LOT1")
+    workers = [FlashWorker(max_parallel=2) for _ in range(2)]
+    # Both stations share this PC's records and staging cache, like a GUI and a worker would
+    stations = [LineStation(clients(), worker, [f"P{index}1", f"P{index}2"], f"S{index}")
+                for index, worker in enumerate(workers)]
+    stop = threading.Event()
+    threads = [threading.Thread(target=station.run, args=(stop,), daemon=True)
+               for station in stations]
+    for thread in threads:
+        thread.start()
+    try:
+        assert _wait(lambda: coordinator.jobs.status()["jobs"][JOB_DONE] == 6)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(10)
+        for worker in workers:
+            worker.shutdown()
+
+    assert sum(station.completed for station in stations) == 6
+    assert sum(station.rejected for station in stations) == 0
+    assert sorted(_serials(coordinator.jobs).values()) == [SERIAL_USED] * 6
@@ -0,0 +1,24 @@
+from log_store import CHECKPOINT_LINES, LogStore
+
+
+def test_pages_match_full_history_across_rotation(tmp_path):
+    store = LogStore("output", max_lines=50, spill_dir=str(tmp_path), max_bytes=4096,
+                     backup_count=2)
+    lines = [f"line {i} " + "x" * (i % 17) for i in range(3000)]
+    store.extend(lines)
+
+    assert store.discarded > 0
+    assert list(store.iter_lines()) == lines[store.discarded:]
+    for start in (0, store.discarded, store.discarded + CHECKPOINT_LINES - 1, 2000, 2940, 2990):
+        for size in (1, 10, CHECKPOINT_LINES + 3, 500):
+            assert store.lines_between(start, start + size) == \
+                lines[max(start, store.discarded):start + size]
+
+
+def test_pages_after_clear(tmp_path):
+    store = LogStore("log", max_lines=5, spill_dir=str(tmp_path))
+    store.extend(["a"] * 20)
+    store.clear()
+    store.extend(["b", "c"])
+    assert store.lines_between(0, 10) == ["b", "c"]
+    assert store.lines_between(5, 3) == []
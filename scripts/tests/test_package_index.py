@@ -0,0 +1,46 @@
+import glob
+import os
+
+from fake_dslite import make_package
+from package_index import PackageIndex
+
+
+def test_default_scope_is_the_usual_package_folders(tmp_path, monkeypatch):
+    make_package(str(tmp_path / "single_flash"))
+    make_package(str(tmp_path / "archive" / "old" / "sensor_1.0"))
+    monkeypatch.chdir(tmp_path)
+
+    index = PackageIndex(None, str(tmp_path / "index.json"))
+    index.refresh()
+    assert [p["name"] for p in index.packages()] == ["single_flash"]
+    # Nothing outside the usual folders was listed
+    assert not any("archive" in folder for folder in index._dirs)
+
+    library = PackageIndex(str(tmp_path), str(tmp_path / "library.json"))
+    library.refresh()
+    assert sorted(p["name"] for p in library.packages()) == ["sensor_1.0", "single_flash"]
+    assert os.path.isfile(library.path)
+
+
+def test_packages_are_found_by_their_recipe_not_a_batch_file(tmp_path):
+    package = make_package(str(tmp_path / "sensor_2.0"))
+    # No launcher at all: the recipe's tool flashes it
+    for launcher in glob.glob(os.path.join(package, "dslite*")):
+        os.remove(launcher)
+    # Looks like a package, but has nothing to flash with
+    broken = make_package(str(tmp_path / "broken_1.0"))
+    for name in glob.glob(os.path.join(broken, "dslite*")):
+        os.remove(name)
+    os.remove(os.path.join(broken, "flash_recipe.json"))
+
+    library = PackageIndex(str(tmp_path), str(tmp_path / "library.json"))
+    library.refresh()
+    assert [p["name"] for p in library.packages()] == ["sensor_2.0"]
+
+    # Once it gets a recipe, the next refresh indexes it
+    with open(os.path.join(package, "flash_recipe.json")) as f:
+        recipe = f.read()
+    with open(os.path.join(broken, "flash_recipe.json"), "w") as f:
+        f.write(recipe)
+    library.refresh()
+    assert sorted(p["name"] for p in library.packages()) == ["broken_1.0", "sensor_2.0"]
@@ -0,0 +1,106 @@
+import os
+import shutil
+import threading
+
+from fake_dslite import make_sysfs
+from probe_inventory import ProbeInventory
+
+
+def _unplug(sysfs, name):
+    shutil.rmtree(os.path.join(sysfs, name))
+    shutil.rmtree(os.path.join(sysfs, name + ":1.0"))
+
+
+def test_enumerates_probes_from_sysfs(tmp_path):
+    sysfs = make_sysfs(str(tmp_path / "usb"), ["L2000B", "L1000A"])
+    os.makedirs(os.path.join(sysfs, "usb1"))
+    inventory = ProbeInventory(sysfs_root=sysfs, use_uevents=False)
+
+    assert inventory.available
+    assert inventory.serials() == ["L1000A", "L2000B"]
+    assert "L1000A" in inventory
+    assert inventory.get("L2000B").location == "1-1"
+
+
+def test_missing_sysfs_is_not_available(tmp_path):
+    inventory = ProbeInventory(sysfs_root=str(tmp_path / "none"), use_uevents=False)
+    assert not inventory.available
+    assert inventory.serials() == []
+
+
+def test_refresh_reports_hotplug_add_and_remove(tmp_path):
+    sysfs = make_sysfs(str(tmp_path / "usb"), ["L1000A"])
+    changes = []
+    inventory = ProbeInventory(sysfs_root=sysfs, use_uevents=False,
+                               on_change=lambda added, removed: changes.append(
+                                   ([p.serial for p in added], [p.serial for p in removed])))
+
+    make_sysfs(sysfs, ["L1000A", "L2000B"])
+    assert inventory.refresh() and changes[-1] == (["L2000B"], [])
+
+    _unplug(sysfs, "1-1")
+    inventory.refresh()
+    assert changes[-1] == ([], ["L1000A"])
+    assert inventory.serials() == ["L2000B"]
+
+    # Nothing changed: no event
+    count = len(changes)
+    assert inventory.refresh() == ([], [])
+    assert len(changes) == count
+
+
+def test_replug_on_same_port_is_reread(tmp_path):
+    sysfs = make_sysfs(str(tmp_path / "usb"), ["L1000A"])
+    inventory = ProbeInventory(sysfs_root=sysfs, use_uevents=False)
+    _unplug(sysfs, "1-1")
+    make_sysfs(sysfs, ["L3000C"])
+    # The kernel numbers every new plug afresh
+    with open(os.path.join(sysfs, "1-1", "devnum"), "w") as f:
+        f.write("7\n")
+
+    added, removed = inventory.refresh()
+    assert [p.serial for p in added] == ["L3000C"]
+    assert [p.serial for p in removed] == ["L1000A"]
+
+
+def test_watcher_thread_picks_up_hotplug(tmp_path):
+    sysfs = make_sysfs(str(tmp_path / "usb"), [])
+    seen = threading.Event()
+    inventory = ProbeInventory(sysfs_root=sysfs, use_uevents=False, poll_interval=0.02,
+                               on_change=lambda added, removed: seen.set())
+    inventory.start()
+    try:
+        make_sysfs(sysfs, ["L1000A"])
+        assert seen.wait(5)
+        assert inventory.serials() == ["L1000A"]
+    finally:
+        inventory.close()
+
+
+def test_assign_slots_keeps_existing_assignments(tmp_path):
+    sysfs = make_sysfs(str(tmp_path / "usb"), ["L1000A", "L2000B", "L3000C"])
+    inventory = ProbeInventory(sysfs_root=sysfs, use_uevents=False)
+
+    first = inventory.assign_slots([0, 1, 2])
+    assert sorted(first.values()) == ["L1000A", "L2000B", "L3000C"]
+    current = {0: "L3000C", 1: "L1000A", 2: "L2000B"}
+    assert inventory.assign_slots([0, 1, 2], current) == current
+
+    # Unplugging one probe frees only its slot
+    _unplug(sysfs, "1-1")
+    inventory.refresh()
+    assert inventory.assign_slots([0, 1, 2], current) == {0: "L3000C", 1: None, 2: "L2000B"}
+
+    # A new probe fills the free slot without moving the others
+    make_sysfs(sysfs, ["L4000D"], bus=2)
+    inventory.refresh()
+    assert inventory.assign_slots([0, 1, 2], current) == {0: "L3000C", 1: "L4000D", 2: "L2000B"}
+
+
+def test_first_scan_can_be_deferred(tmp_path):
+    sysfs = make_sysfs(str(tmp_path / "usb"), ["L1000A"])
+    inventory = ProbeInventory(sysfs_root=sysfs, use_uevents=False, scan=False)
+    assert inventory.serials() == [] and not inventory.available
+
+    added, _ = inventory.refresh()
+    assert [p.serial for p in added] == ["L1000A"] and inventory.available
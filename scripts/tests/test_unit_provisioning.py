@@ -0,0 +1,110 @@
+import argparse
+import binascii
+import zlib
+
+import pytest
+
+from flash_backend import FLASH_BASE
+from unit_provisioning import Provisioner, ProvisionLayout, field_value
+
+TEMPLATE = bytes((i * 7) & 0xFF for i in range(0x4000))
+
+
+def _layout(checksums):
+    return ProvisionLayout.from_dict({
+        "fields": [
+            {"name": "serial", "address": FLASH_BASE + 0x2000, "size": 16, "type": "ascii"},
+            {"name": "ble_mac", "address": FLASH_BASE + 0x3F00, "size": 6, "type": "mac",
+             "base": "00:12:4B:00:00:00"},
+            {"name": "calibration", "address": FLASH_BASE + 0x2010, "size": 8, "type": "hex",
+             "required": False},
+        ],
+        "checksums": checksums,
+    })
+
+
+def _provisioner(tmp_path, checksums):
+    return Provisioner(TEMPLATE, _layout(checksums), folder=str(tmp_path))
+
+
+def _int(data):
+    return int.from_bytes(data, "little")
+
+
+def test_crc32_over_patched_fields(tmp_path):
+    provisioner = _provisioner(tmp_path, [
+        {"address": FLASH_BASE + 0x2030, "start": FLASH_BASE + 0x2000, "end": FLASH_BASE + 0x2030},
+    ])
+    image = provisioner.unit({"calibration": "0102030405060708"}, unit_serial="CC000042")
+    data = image.read()
+
+    assert data[0x2000:0x2010] == b"CC000042".ljust(16, b"\0")
+    assert data[0x2010:0x2018] == bytes(range(1, 9))
+    assert _int(data[0x2030:0x2034]) == zlib.crc32(data[0x2000:0x2030])
+    # Bytes no field or checksum covers are the template's
+    assert data[:0x2000] == TEMPLATE[:0x2000]
+    assert data[0x2034:0x3F00] == TEMPLATE[0x2034:0x3F00]
+
+
+def test_long_range_checksums_resume_from_prefix(tmp_path):
+    provisioner = _provisioner(tmp_path, [
+        {"address": FLASH_BASE + 0x3FF0, "start": FLASH_BASE, "end": FLASH_BASE + 0x3FF0},
+        {"address": FLASH_BASE + 0x3FF4, "start": FLASH_BASE, "end": FLASH_BASE + 0x3FF0,
+         "algorithm": "crc16"},
+        {"address": FLASH_BASE + 0x3FF8, "start": FLASH_BASE, "end": FLASH_BASE + 0x3FF0,
+         "algorithm": "sum"},
+    ])
+    for serial in ("CC000001", "CC000002"):
+        data = provisioner.unit(unit_serial=serial).read()
+        covered = data[:0x3FF0]
+        assert _int(data[0x3FF0:0x3FF4]) == zlib.crc32(covered)
+        assert _int(data[0x3FF4:0x3FF6]) == binascii.crc_hqx(covered, 0xFFFF)
+        assert _int(data[0x3FF8:0x3FFC]) == sum(covered) & 0xFFFFFFFF
+
+
+def test_mac_from_unit_serial_and_digest(tmp_path):
+    provisioner = _provisioner(tmp_path, [])
+    image = provisioner.unit(unit_serial="CC000042")
+    data = image.read()
+
+    assert data[0x3F00:0x3F06] == (0x00124B000000 + 42).to_bytes(6, "little")
+    assert image.values["ble_mac"] == "00:12:4B:00:00:2A"
+    assert image.digest()["crc32"] == zlib.crc32(data)
+    assert provisioner.unit(unit_serial="CC000043").digest() != image.digest()
+
+
+def test_patched_chunks_match_the_full_image(tmp_path):
+    provisioner = _provisioner(tmp_path, [
+        {"address": FLASH_BASE + 0x2030, "start": FLASH_BASE + 0x2000, "end": FLASH_BASE + 0x2030},
+    ])
+    image = provisioner.unit(unit_serial="CC000007")
+    data = image.read()
+    rebuilt = bytearray(len(TEMPLATE))
+    for path, address in image.flash_chunks(str(tmp_path / "unit")):
+        with open(path, "rb") as f:
+            chunk = f.read()
+        rebuilt[address - FLASH_BASE:address - FLASH_BASE + len(chunk)] = chunk
+    assert bytes(rebuilt) == data
+
+
+def test_layout_errors(tmp_path):
+    with pytest.raises(ValueError):
+        _provisioner(tmp_path, [
+            {"address": FLASH_BASE + 0x2004, "start": FLASH_BASE + 0x2000,
+             "end": FLASH_BASE + 0x2030},
+        ])
+    provisioner = _provisioner(tmp_path, [])
+    with pytest.raises(ValueError):
+        provisioner.unit()
+    with pytest.raises(ValueError):
+        provisioner.unit({"unknown": 1}, unit_serial="CC000001")
+    with pytest.raises(ValueError):
+        provisioner.unit({"serial": "X" * 17})
+
+
+def test_field_value_parses_and_rejects():
+    assert field_value("ble_mac=00:12:4B:00:00:2A") == ("ble_mac", "00:12:4B:00:00:2A")
+    assert field_value("note=a=b") == ("note", "a=b")
+    for bad in ("ble_mac", "=1", ""):
+        with pytest.raises(argparse.ArgumentTypeError):
+            field_value(bad)
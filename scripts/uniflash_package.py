@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+UniFlash Standalone Package Helpers
+Locating files inside an exported UniFlash package and preparing per-probe configs
+
+Expected layout:
+- dslite.bat (Windows) or dslite.sh launcher, a DSLite executable under deskdb/,
+  or a flash_recipe.json naming the tool
+- user_files/configs/*.ccxml
+- user_files/settings/generated.ufsettings
+- user_files/images/* (.bin, Intel HEX, TI-TXT or ELF; other files such as a
+  README are not images)
+- flash_recipe.json / .toml (optional, see flash_recipe.py)
+"""
+
+import glob
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+
+IMAGE_EXTENSIONS = (".bin", ".hex", ".ihex", ".txt", ".out", ".elf", ".axf")
+
+# TI-TXT opens with an "@ADDR" line; any other .txt is documentation
+_TI_TXT_START = re.compile(rb"^\s*@[0-9A-Fa-f]+\s*$", re.MULTILINE)
+
+
+def find_package_file(flash_folder, subdir, pattern):
+    """Return the first file matching pattern in a user_files subfolder"""
+    matches = sorted(glob.glob(os.path.join(flash_folder, "user_files", subdir, pattern)))
+    return matches[0] if matches else None
+
+
+def write_serial_ccxml(src_ccxml, dst_ccxml, serial):
+    """Copy a target configuration, selecting the XDS110 probe by serial number"""
+    tree = ET.parse(src_ccxml)
+    root = tree.getroot()
+
+    selection = root.find(".//property[@id='Debug Probe Selection']")
+    if selection is None:
+        connection = root.find(".//connection")
+        if connection is None:
+            raise ValueError(f"No debug probe connection in {src_ccxml}")
+        selection = ET.SubElement(connection, "property",
+                                  {"Type": "choicelist", "id": "Debug Probe Selection"})
+    selection.set("Value", "1")
+
+    choice = selection.find("choice[@Name='Select by serial number']")
+    if choice is None:
+        choice = ET.SubElement(selection, "choice",
+                               {"Name": "Select by serial number", "value": "0"})
+
+    serial_prop = choice.find("property[@id='-- Enter the serial number']")
+    if serial_prop is None:
+        serial_prop = ET.SubElement(choice, "property",
+                                    {"Type": "stringfield", "id": "-- Enter the serial number"})
+    serial_prop.set("Value", serial)
+
+    tree.write(dst_ccxml, encoding="utf-8", xml_declaration=True)
+
+
+def is_ti_txt(path):
+    """True when a file starts like a TI-TXT image"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(256)
+    except OSError:
+        return False
+    return _TI_TXT_START.match(head.lstrip()) is not None
+
+
+def is_image_file(path):
+    """True for a firmware image in user_files/images, judged by extension (and
+    content for .txt)"""
+    if not os.path.isfile(path) or not path.lower().endswith(IMAGE_EXTENSIONS):
+        return False
+    return not path.lower().endswith(".txt") or is_ti_txt(path)
+
+
+def package_images(flash_folder):
+    """Image files in a package's user_files/images, sorted by name"""
+    folder = os.path.join(flash_folder, "user_files", "images")
+    try:
+        names = sorted(os.listdir(folder))
+    except OSError:
+        return []
+    return [os.path.join(folder, name) for name in names
+            if is_image_file(os.path.join(folder, name))]
+
+
+def find_image(flash_folder):
+    """Firmware image shipped in the package, or None"""
+    images = package_images(flash_folder)
+    return images[0] if images else None
+
+
+def read_ufsettings(path):
+    """Scalar settings from generated.ufsettings (JSON), flattened to name: value"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    settings = {}
+
+    def walk(node, prefix):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                walk(value, f"{prefix}{key}" if not prefix else f"{prefix}.{key}")
+        elif isinstance(node, (str, int, float, bool)) and prefix:
+            settings[prefix] = node
+
+    walk(data, "")
+    return settings
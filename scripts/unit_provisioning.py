@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+CC2650 Unit Provisioning
+Patches per-unit data (serial, BLE MAC, calibration) into the staged image
+
+A package that needs unique data per unit carries a provisioning.json in its
+folder describing fixed-offset fields and the checksums that cover them:
+
+    {
+      "fields": [
+        {"name": "serial", "address": "0x1E000", "size": 16, "type": "ascii"},
+        {"name": "ble_mac", "address": "0x1FFC8", "size": 6, "type": "mac",
+         "base": "00:12:4B:00:00:00"},
+        {"name": "calibration", "address": "0x1E010", "size": 32, "type": "hex",
+         "required": false}
+      ],
+      "checksums": [
+        {"address": "0x1E030", "algorithm": "crc32", "start": "0x1E000", "end": "0x1E030"}
+      ]
+    }
+
+Field types: ascii (NUL padded), hex (raw bytes), uint and mac, little-endian
+unless "byteorder" says otherwise. A "serial" field defaults to the job's
+unit serial; a mac field with a "base" defaults to base + the number in the
+unit serial. Checksums are crc32, crc16 (CCITT) or sum, applied in order.
+
+Features:
+- The staged image is read once per image and layout; each unit copies only the
+  4 KB sectors its fields and checksums touch (copy-on-write), everything else
+  is a view of the shared template
+- Checksums over long ranges resume from a cached prefix value
+- The unchanged sectors are written once as cached chunk files; per unit only the
+  patched sectors are written, so no full image is written per unit
+- Benchmark: python unit_provisioning.py --bench
+
+Usage:
+    python unit_provisioning.py --folder single_flash --set serial=CC000042
+    python unit_provisioning.py --bench
+"""
+
+import argparse
+import binascii
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+
+from flash_backend import FLASH_BASE
+from incremental_flash import SECTOR_SIZE, FlashPlan
+
+LAYOUT_FILE = "provisioning.json"
+DEFAULT_PROVISION_DIR = os.path.join(os.path.expanduser("~"), ".cc2650_jig", "provisioning")
+
+FIELD_TYPES = ("ascii", "hex", "uint", "mac")
+# algorithm: (update(data, value) -> value, initial value)
+CHECKSUMS = {
+    "crc32": (zlib.crc32, 0),
+    "crc16": (binascii.crc_hqx, 0xFFFF),
+    "sum": (lambda data, value: value + sum(data), 0),
+}
+CHECKSUM_SIZES = {"crc32": 4, "crc16": 2, "sum": 4}
+
+_SERIAL_NUMBER = re.compile(r"(\d+)\D*$")
+
+
+def _int(value):
+    return int(value, 0) if isinstance(value, str) else int(value)
+
+
+def _mac_bytes(text):
+    digits = re.sub(r"[^0-9a-fA-F]", "", text)
+    if len(digits) != 12:
+        raise ValueError(f"Not a 48-bit MAC address: {text}")
+    return int(digits, 16)
+
+
+class ProvisionField:
+    """One per-unit value at a fixed flash address"""
+
+    def __init__(self, name, address, size, type="hex", byteorder="little", required=True,
+                 base=None, pad=0):
+        if type not in FIELD_TYPES:
+            raise ValueError(f"Field {name}: unknown type {type}")
+        self.name = name
+        self.address = _int(address)
+        self.size = int(size)
+        self.type = type
+        self.byteorder = byteorder
+        self.required = required
+        self.base = _mac_bytes(base) if base else None
+        self.pad = int(pad)
+
+    def default(self, unit_serial):
+        """Value for a unit without an explicit one, or None"""
+        if self.name == "serial":
+            return unit_serial
+        if self.type == "mac" and self.base is not None and unit_serial:
+            match = _SERIAL_NUMBER.search(unit_serial)
+            if match:
+                return self.base + int(match.group(1))
+        return None
+
+    def encode(self, value):
+        """Field bytes for a value"""
+        if self.type == "ascii":
+            data = str(value).encode("ascii")
+        elif self.type == "hex":
+            data = bytes.fromhex(value) if isinstance(value, str) else bytes(value)
+        elif self.type == "mac":
+            number = _mac_bytes(value) if isinstance(value, str) else int(value)
+            if not 0 <= number < 1 << 48:
+                raise ValueError(f"Field {self.name}: MAC out of range")
+            # CC2650 keeps BLE addresses least significant byte first
+            return number.to_bytes(6, self.byteorder).ljust(self.size, bytes((self.pad,)))
+        else:
+            return _int(value).to_bytes(self.size, self.byteorder)
+        if len(data) > self.size:
+            raise ValueError(f"Field {self.name}: {len(data)} bytes, room for {self.size}")
+        return data.ljust(self.size, bytes((self.pad,)))
+
+
+class ChecksumField:
+    """A checksum over [start, end) stored at address"""
+
+    def __init__(self, address, start, end, algorithm="crc32", byteorder="little", size=None):
+        if algorithm not in CHECKSUMS:
+            raise ValueError(f"Unknown checksum algorithm {algorithm}")
+        self.address = _int(address)
+        self.start = _int(start)
+        self.end = _int(end)
+        self.algorithm = algorithm
+        self.byteorder = byteorder
+        self.size = int(size or CHECKSUM_SIZES[algorithm])
+        if self.start <= self.address < self.end:
+            raise ValueError(f"Checksum at 0x{self.address:x} lies inside its own range")
+
+    def encode(self, value):
+        return (value & ((1 << (8 * self.size)) - 1)).to_bytes(self.size, self.byteorder)
+
+
+class ProvisionLayout:
+    """Fields and checksums of one package's provisioning.json"""
+
+    def __init__(self, fields, checksums=(), source=None):
+        self.fields = list(fields)
+        self.checksums = list(checksums)
+        self.source = source
+        spans = sorted((item.address, item.address + item.size)
+                       for item in self.fields + self.checksums)
+        for (_, end), (start, _) in zip(spans, spans[1:]):
+            if start < end:
+                raise ValueError(f"Provisioning fields overlap at 0x{start:x}")
+
+    @classmethod
+    def from_dict(cls, spec, source=None):
+        fields = [ProvisionField(**field) for field in spec.get("fields", [])]
+        checksums = [ChecksumField(**checksum) for checksum in spec.get("checksums", [])]
+        return cls(fields, checksums, source)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f), path)
+
+    @property
+    def key(self):
+        """Identity of the layout for caches"""
+        spec = [(f.name, f.address, f.size, f.type, f.byteorder, f.pad) for f in self.fields]
+        spec += [(c.address, c.start, c.end, c.algorithm, c.byteorder, c.size)
+                 for c in self.checksums]
+        return hashlib.sha256(repr(spec).encode()).hexdigest()[:16]
+
+
+class UnitImage:
+    """A provisioned image: the shared template plus this unit's patched sectors"""
+
+    def __init__(self, provisioner, sectors, values):
+        self.provisioner = provisioner
+        self.sectors = sectors
+        self.values = values
+        self.base = provisioner.base
+        self.size = len(provisioner.template)
+        self._digest = None
+
+    def pieces(self, start=0, end=None):
+        """Memoryviews covering image offsets [start, end)"""
+        template = self.provisioner.view
+        end = self.size if end is None else end
+        sector_size = self.provisioner.sector_size
+        offset = start
+        while offset < end:
+            index, within = divmod(offset, sector_size)
+            stop = min(end, (index + 1) * sector_size)
+            sector = self.sectors.get(index)
+            if sector is None:
+                # Runs of shared sectors come out as one view
+                while stop < end and stop // sector_size not in self.sectors:
+                    stop = min(end, stop + sector_size)
+                yield template[offset:stop]
+            else:
+                yield memoryview(sector)[within:within + stop - offset]
+            offset = stop
+
+    def read(self):
+        """Full image bytes, e.g. for a readback compare"""
+        return b"".join(self.pieces())
+
+    def digest(self):
+        """Same fields as StagedImage.digest, for this unit's image"""
+        if self._digest is None:
+            sha256 = hashlib.sha256()
+            crc32 = 0
+            for piece in self.pieces():
+                sha256.update(piece)
+                crc32 = zlib.crc32(piece, crc32)
+            self._digest = {"name": self.provisioner.name, "size": self.size,
+                            "sha256": sha256.hexdigest(), "crc32": crc32}
+        return self._digest
+
+    def chunks(self):
+        """(address, bytes) for every patched range"""
+        sector_size = self.provisioner.sector_size
+        return [(self.base + start,
+                 b"".join(self.sectors[index] for index in range(start // sector_size,
+                                                                 (start + length) // sector_size)))
+                for start, length in self.provisioner.patched_ranges]
+
+    def flash_chunks(self, workdir):
+        """(path, address) of every file to program: cached shared chunks plus this
+        unit's patched sectors written to workdir"""
+        files = list(self.provisioner.shared_files())
+        os.makedirs(workdir, exist_ok=True)
+        for address, data in self.chunks():
+            path = os.path.join(workdir, f"unit_0x{address:05x}.bin")
+            with open(path, "wb") as f:
+                f.write(data)
+            files.append((path, address))
+        return sorted(files, key=lambda item: item[1])
+
+    def flash_files(self, workdir):
+        """DSLite "path,0xaddress" arguments for flash_chunks"""
+        return [f"{path},0x{address:x}" for path, address in self.flash_chunks(workdir)]
+
+    def describe(self):
+        """One-line summary for logs"""
+        values = ", ".join(f"{name}={value}" for name, value in self.values.items())
+        return f"{values} ({len(self.sectors)} sector(s) patched)"
+
+
+class Provisioner:
+    """Stamps units from one staged image and layout"""
+
+    def __init__(self, template, layout, base=FLASH_BASE, name=None, sha256=None,
+                 folder=DEFAULT_PROVISION_DIR, sector_size=SECTOR_SIZE):
+        self.template = bytes(template)
+        self.view = memoryview(self.template)
+        self.layout = layout
+        self.base = base
+        self.name = name
+        self.sector_size = sector_size
+        sha256 = sha256 or hashlib.sha256(self.template).hexdigest()
+        self.folder = os.path.join(folder, f"{sha256[:16]}_{layout.key}")
+        self._lock = threading.Lock()
+        self._shared = None
+
+        patched = set()
+        for item in layout.fields + layout.checksums:
+            if item.address < base or item.address + item.size > base + len(self.template):
+                raise ValueError(f"Provisioning address 0x{item.address:x} is outside the image")
+            first = (item.address - base) // sector_size
+            last = (item.address + item.size - 1 - base) // sector_size
+            patched.update(range(first, last + 1))
+        self.patched_sectors = sorted(patched)
+        self.patched_ranges = FlashPlan(self.template, self.patched_sectors, sector_size).ranges
+
+        # Checksum value over each range up to the first byte a unit can change
+        self._prefixes = []
+        for checksum in layout.checksums:
+            start, end = checksum.start - base, checksum.end - base
+            dirty = [item.address - base for item in layout.fields + layout.checksums
+                     if start <= item.address - base < end]
+            stop = min(dirty, default=end)
+            update, initial = CHECKSUMS[checksum.algorithm]
+            self._prefixes.append((stop, update(self.view[start:stop], initial)))
+
+    def unit(self, values=None, unit_serial=None):
+        """UnitImage with the given field values patched in"""
+        values = dict(values or {})
+        sectors = {index: bytearray(self.view[index * self.sector_size:
+                                              (index + 1) * self.sector_size])
+                   for index in self.patched_sectors}
+        applied = {}
+        for field in self.layout.fields:
+            value = values.pop(field.name, None)
+            if value is None:
+                value = field.default(unit_serial)
+            if value is None:
+                if field.required:
+                    raise ValueError(f"No value for provisioning field {field.name}")
+                continue
+            data = field.encode(value)
+            self._write(sectors, field.address, data)
+            applied[field.name] = (_format_mac(data[:6], field.byteorder) if field.type == "mac"
+                                   else value)
+        if values:
+            raise ValueError(f"Unknown provisioning fields: {', '.join(sorted(values))}")
+
+        image = UnitImage(self, sectors, applied)
+        for checksum, (stop, value) in zip(self.layout.checksums, self._prefixes):
+            update = CHECKSUMS[checksum.algorithm][0]
+            for piece in image.pieces(stop, checksum.end - self.base):
+                value = update(piece, value)
+            self._write(sectors, checksum.address, checksum.encode(value))
+        return image
+
+    def _write(self, sectors, address, data):
+        offset = address - self.base
+        for i, byte in enumerate(data):
+            index, within = divmod(offset + i, self.sector_size)
+            sectors[index][within] = byte
+
+    def shared_files(self):
+        """(path, address) of the template ranges no unit changes, written once"""
+        with self._lock:
+            if self._shared is None:
+                sectors = (len(self.template) + self.sector_size - 1) // self.sector_size
+                shared = [index for index in range(sectors) if index not in self.patched_sectors]
+                plan = FlashPlan(self.template, shared, self.sector_size, self.base)
+                os.makedirs(self.folder, exist_ok=True)
+                files = []
+                for address, data in plan.chunks():
+                    path = os.path.join(self.folder, f"shared_0x{address:05x}.bin")
+                    if not os.path.exists(path) or os.path.getsize(path) != len(data):
+                        tmp_path = path + ".tmp"
+                        with open(tmp_path, "wb") as f:
+                            f.write(data)
+                        os.replace(tmp_path, path)
+                    files.append((path, address))
+                self._shared = files
+            return self._shared
+
+
+def _format_mac(data, byteorder):
+    number = int.from_bytes(data, byteorder)
+    return ":".join(f"{(number >> shift) & 0xFF:02X}" for shift in range(40, -8, -8))
+
+
+class ProvisioningCache:
+    """One Provisioner per (staged image, package layout), built on first use"""
+
+    def __init__(self, folder=DEFAULT_PROVISION_DIR):
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._provisioners = {}
+
+    def get(self, flash_folder, staged):
+        """Provisioner for a package's staged image, or None if it has no layout"""
+        path = os.path.join(flash_folder, LAYOUT_FILE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        key = (path, mtime, staged.sha256)
+        with self._lock:
+            provisioner = self._provisioners.get(key)
+            if provisioner is None:
+                provisioner = Provisioner(staged.read(), ProvisionLayout.load(path), staged.base,
+                                          staged.name, staged.sha256, self.folder)
+                # Only the latest image per package stays in memory
+                self._provisioners = {k: p for k, p in self._provisioners.items()
+                                      if k[0] != path}
+                self._provisioners[key] = provisioner
+            return provisioner
+
+
+def field_value(text):
+    """argparse type for FIELD=VALUE; returns (field, value)"""
+    name, sep, value = text.partition("=")
+    if not sep or not name.strip():
+        raise argparse.ArgumentTypeError(f"expected FIELD=VALUE, got {text!r}")
+    return name.strip(), value
+
+
+def benchmark(units=2000, image_size=128 * 1024):
+    """Units per hour for patch + checksum + per-unit chunk files on a synthetic layout"""
+    import tempfile
+
+    template = bytes((i * 7) & 0xFF for i in range(image_size))
+    layout = ProvisionLayout.from_dict({
+        "fields": [
+            {"name": "serial", "address": FLASH_BASE + 0x1E000, "size": 16, "type": "ascii"},
+            {"name": "calibration", "address": FLASH_BASE + 0x1E010, "size": 32, "type": "hex"},
+            {"name": "ble_mac", "address": FLASH_BASE + 0x1FFC8, "size": 6, "type": "mac",
+             "base": "00:12:4B:00:00:00"},
+        ],
+        "checksums": [
+            {"address": FLASH_BASE + 0x1E030, "start": FLASH_BASE + 0x1E000,
+             "end": FLASH_BASE + 0x1E030},
+            {"address": FLASH_BASE + 0x1FFF0, "start": FLASH_BASE,
+             "end": FLASH_BASE + 0x1FFF0},
+        ],
+    })
+    calibration = bytes(range(32)).hex()
+    with tempfile.TemporaryDirectory(prefix="cc2650_provision_") as folder:
+        provisioner = Provisioner(template, layout, folder=folder)
+        provisioner.shared_files()
+        start = time.perf_counter()
+        for n in range(units):
+            image = provisioner.unit({"calibration": calibration}, unit_serial=f"CC{n:06d}")
+            image.flash_chunks(os.path.join(folder, "unit"))
+        elapsed = time.perf_counter() - start
+    return {"units": units, "ms_per_unit": round(1000 * elapsed / units, 3),
+            "units_per_hour": round(units * 3600 / elapsed),
+            "patched_bytes_per_unit": len(provisioner.patched_sectors) * provisioner.sector_size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provision per-unit data into a CC2650 image")
+    parser.add_argument("--folder", help="UniFlash package folder with a provisioning.json")
+    parser.add_argument("--unit-serial", help="unit serial for the serial and MAC defaults")
+    parser.add_argument("--set", action="append", default=[], metavar="FIELD=VALUE",
+                        type=field_value, help="value for a provisioning field; repeatable")
+    parser.add_argument("--output", help="write the full provisioned image here")
+    parser.add_argument("--bench", action="store_true", help="run the provisioning benchmark")
+    args = parser.parse_args()
+
+    if args.bench:
+        for key, value in benchmark().items():
+            print(f"{key:24} {value}")
+        return 0
+    if not args.folder:
+        parser.print_help()
+        return 2
+
+    from image_staging import ImageCache
+
+    staged = ImageCache().stage(args.folder)
+    provisioner = ProvisioningCache().get(args.folder, staged)
+    if provisioner is None:
+        print(f"ERROR: No {LAYOUT_FILE} in {args.folder}")
+        return 1
+    values = dict(args.set)
+    image = provisioner.unit(values, args.unit_serial)
+    print(f"Provisioned: {image.describe()}")
+    print(f"SHA-256 {image.digest()['sha256']}  CRC32 0x{image.digest()['crc32']:08x}")
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(image.read())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())